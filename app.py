@@ -4,13 +4,26 @@ import traceback
 import os
 
 from light_runner import analyze_website  # uses MongoDB logic
+from jobs import JobManager, QueueFullError, validate_max_pages
+from batch import start_batch, batch_status
+from result_cache import default_cache
+from llm_memo import default_memo
+import llm
 
 app = Flask(__name__)
 CORS(app)
 
+# Analyses run in the background; /analyze only enqueues them. Jobs are
+# kept in this process's memory, so run one gunicorn worker (see jobs.py).
+job_manager = JobManager(
+    analyze_website,
+    max_workers=int(os.environ.get("JOB_WORKERS", 2)),
+    max_pending=int(os.environ.get("JOB_MAX_PENDING", 50))
+)
+
 @app.route('/')
 def home():
-    return "✅ API is up! Use POST /analyze with JSON: { url: string, max_pages: number (optional) }"
+    return "✅ API is up! Use POST /analyze with JSON: { url: string, max_pages: number (optional), refresh: boolean (optional) }, then poll GET /jobs/<id>. For many sites, POST /batch with { urls: [string], ... } and poll GET /batches/<id>"
 
 @app.route('/analyze', methods=['POST'])
 def analyze():
@@ -20,12 +33,23 @@ def analyze():
         return jsonify({"error": "Missing 'url' in request body"}), 400
 
     url = data['url']
-    max_pages = data.get('max_pages', 20)
+    refresh = bool(data.get('refresh', False))
+    try:
+        max_pages = validate_max_pages(data.get('max_pages', 20))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     try:
-        print(f"🚀 Starting analysis for: {url} with max_pages={max_pages}")
-        result = analyze_website(url, max_pages)
-        return jsonify(result)
+        job, created = job_manager.submit(url, max_pages, refresh=refresh)
+        if created:
+            print(f"🚀 Queued analysis {job['id']} for: {url} with max_pages={max_pages}")
+        return jsonify({
+            "jobId": job["id"],
+            "status": job["status"],
+            "statusUrl": f"/jobs/{job['id']}"
+        }), 202
+    except QueueFullError as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         trace = traceback.format_exc()
         print("❌ Exception in /analyze route:", e)
@@ -35,6 +59,60 @@ def analyze():
             "trace": trace
         }), 500
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({"error": "Unknown job ID"}), 404
+    return jsonify(job)
+
+@app.route('/batch', methods=['POST'])
+def batch():
+    data = request.get_json()
+
+    if not data or not isinstance(data.get('urls'), list) or not data['urls']:
+        return jsonify({"error": "Missing 'urls' list in request body"}), 400
+
+    try:
+        batch_id = start_batch(data['urls'], validate_max_pages(data.get('max_pages', 20)),
+                               bool(data.get('refresh', False)), batch_id=data.get('id'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    print(f"📦 Started batch {batch_id} with {len(data['urls'])} sites")
+    return jsonify({"batchId": batch_id, "statusUrl": f"/batches/{batch_id}"}), 202
+
+@app.route('/batches/<batch_id>', methods=['GET'])
+def batch_progress(batch_id):
+    try:
+        status = batch_status(batch_id)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if status is None:
+        return jsonify({"error": "Unknown batch ID"}), 404
+    return jsonify(status)
+
+@app.route('/batches/<batch_id>/resume', methods=['POST'])
+def batch_resume(batch_id):
+    # Picks up a batch interrupted by a crash or restart; finished sites are skipped.
+    try:
+        start_batch(batch_id=batch_id)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except KeyError:
+        return jsonify({"error": "Unknown batch ID"}), 404
+    return jsonify({"batchId": batch_id, "statusUrl": f"/batches/{batch_id}"}), 202
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify({
+        "results": default_cache().stats(),
+        "llmMemo": default_memo().stats()
+    })
+
+@app.route('/llm/stats', methods=['GET'])
+def llm_stats():
+    return jsonify(llm.latency.stats())
+
 if __name__ == '__main__':
     port = int(os.environ.get("PORT", 5000))
     print(f"🚀 Flask server is starting on http://127.0.0.1:{port}")
@@ -0,0 +1,283 @@
+import os
+import re
+import json
+import time
+import uuid
+import asyncio
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+
+from pipeline import Pipeline, default_sink
+from crawl import DEFAULT_HEADERS, CRAWL_PARSE_WORKERS, CRAWL_PARSE_MODE, make_parse_executor
+from light_runner import analysis_result
+from result_cache import default_cache, cache_key
+from page_history import PageHistory, default_history
+from politeness import Politeness
+
+# Where API-submitted batches keep their URL list and results.
+BATCH_DIR = os.getenv("BATCH_DIR", "batches")
+# Sites analyzed at once; their page fetches interleave on one pool.
+BATCH_SITE_CONCURRENCY = int(os.getenv("BATCH_SITE_CONCURRENCY", 8))
+BATCH_MAX_CONNECTIONS = int(os.getenv("BATCH_MAX_CONNECTIONS", 100))
+# Every site of a batch shares one event loop, so pages are always
+# extracted off it: in CRAWL_PARSE_WORKERS workers if set, else one per CPU.
+BATCH_PARSE_WORKERS = int(os.getenv("BATCH_PARSE_WORKERS", CRAWL_PARSE_WORKERS or os.cpu_count() or 1))
+BATCH_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def read_url_file(path):
+    """URLs from a text file, one per line; blank lines and # comments are skipped."""
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+class BatchOutput:
+    """Results of a batch as JSON lines, one per site, appended as each site
+    finishes.
+
+    The file doubles as the checkpoint: sites with a result in it are done,
+    so a batch restarted after a crash picks up where it stopped. Sites
+    that failed are tried again; their newer line supersedes the old one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def records(self):
+        if not os.path.exists(self.path):
+            return []
+        records = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # A line cut short by a crash.
+                    continue
+        return records
+
+    def latest(self):
+        latest = {}
+        for record in self.records():
+            latest[cache_key(record["url"], record["maxPages"])] = record
+        return latest
+
+    def completed(self):
+        return {key for key, record in self.latest().items() if "error" not in record}
+
+    def append(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+
+class BatchScheduler:
+    """Runs the sites of every batch on one event loop.
+
+    All sites share one aiohttp connection pool, one Politeness (so a host
+    gets the same per-host limits whichever site or batch the request is
+    for), the result cache, the page history and the database client. Up
+    to ``site_concurrency`` sites are analyzed at once and their fetches
+    interleave on the pool. The loop runs in a background thread, so the
+    CLI and the API submit to it the same way; database, cache, history
+    and result file calls run on a thread pool beside it, and HTML
+    extraction on ``parse_executor``.
+    """
+
+    def __init__(self, site_concurrency=BATCH_SITE_CONCURRENCY, max_connections=BATCH_MAX_CONNECTIONS,
+                 sink=None, cache=None, parse_executor=None, concurrency=5):
+        self.site_concurrency = site_concurrency
+        self.max_connections = max_connections
+        self.sink = sink
+        self.cache = cache
+        self.parse_executor = parse_executor
+        self.concurrency = concurrency
+        self.history = PageHistory(sink.db) if sink else default_history()
+        self.io_executor = None
+        self.loop = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.running = {}  # batch output path -> Future
+
+    def start(self):
+        with self.lock:
+            if self.loop is None:
+                self.io_executor = ThreadPoolExecutor(max_workers=2 * self.site_concurrency,
+                                                      thread_name_prefix="batch-io")
+                self.loop = asyncio.new_event_loop()
+                self.thread = threading.Thread(target=self.loop.run_forever, name="batch-scheduler", daemon=True)
+                self.thread.start()
+                asyncio.run_coroutine_threadsafe(self.open(), self.loop).result()
+
+    async def open(self):
+        connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.concurrency)
+        self.session = aiohttp.ClientSession(headers=DEFAULT_HEADERS, connector=connector)
+        self.politeness = Politeness(max_concurrency=self.concurrency)
+        self.sites = asyncio.Semaphore(self.site_concurrency)
+
+    def close(self):
+        with self.lock:
+            if self.loop is None:
+                return
+            asyncio.run_coroutine_threadsafe(self.session.close(), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.loop = None
+            self.io_executor.shutdown(wait=True)
+
+    def submit(self, urls, output, max_pages=20, refresh=False):
+        """Queue a batch; returns a concurrent.futures.Future of its summary.
+
+        Resubmitting a batch that is still running returns its Future.
+        """
+        self.start()
+        with self.lock:
+            future = self.running.get(output.path)
+            if future is None or future.done():
+                future = asyncio.run_coroutine_threadsafe(self.run_batch(urls, output, max_pages, refresh), self.loop)
+                self.running[output.path] = future
+            return future
+
+    def is_running(self, output):
+        with self.lock:
+            future = self.running.get(output.path)
+            return future is not None and not future.done()
+
+    async def run_batch(self, urls, output, max_pages, refresh):
+        loop = asyncio.get_running_loop()
+        done = await loop.run_in_executor(self.io_executor, output.completed)
+        pending, seen = [], set()
+        for url in urls:
+            key = cache_key(url, max_pages)
+            if key not in done and key not in seen:
+                seen.add(key)
+                pending.append(url)
+        print(f"📦 Batch {output.path}: {len(pending)} sites to analyze, {len(urls) - len(pending)} already done")
+        results = await asyncio.gather(*(self.run_site(url, output, max_pages, refresh) for url in pending))
+        return {"sites": len(pending), "failed": sum(1 for ok in results if not ok)}
+
+    async def run_site(self, url, output, max_pages, refresh):
+        async with self.sites:
+            started = time.time()
+            pipeline = Pipeline(sink=self.sink, cache=self.cache, refresh=refresh, concurrency=self.concurrency,
+                                parse_executor=self.parse_executor, history=self.history,
+                                session=self.session, politeness=self.politeness, io_executor=self.io_executor)
+            record = {"url": url, "maxPages": max_pages}
+            try:
+                result = await pipeline.run_async(url, max_pages)
+                crawl = result["crawl"]
+                record.update(crawlId=result["crawlId"], totalPages=result["totalPages"],
+                              sitemap=crawl.get("sitemap"), crawlStats=crawl.get("crawlStats"))
+                record.update(analysis_result(result))
+            except Exception as e:
+                traceback.print_exc()
+                record["error"] = str(e)
+            record.update(startedAt=started, finishedAt=time.time())
+            await asyncio.get_running_loop().run_in_executor(self.io_executor, output.append, record)
+            return "error" not in record
+
+
+def batch_parse_executor():
+    return make_parse_executor(BATCH_PARSE_WORKERS, CRAWL_PARSE_MODE) if BATCH_PARSE_WORKERS > 0 else None
+
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+
+def default_scheduler():
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = BatchScheduler(sink=default_sink(), cache=default_cache(),
+                                                parse_executor=batch_parse_executor())
+        return _default_scheduler
+
+
+# ---------------------- API Batches ----------------------
+# A batch submitted over the API lives in BATCH_DIR as <id>.json (what to
+# run) and <id>.jsonl (results so far), so it can be resumed by ID.
+def batch_paths(batch_id):
+    if not BATCH_ID_RE.match(batch_id):
+        raise ValueError("Invalid batch ID")
+    return os.path.join(BATCH_DIR, f"{batch_id}.json"), BatchOutput(os.path.join(BATCH_DIR, f"{batch_id}.jsonl"))
+
+
+def start_batch(urls=None, max_pages=20, refresh=False, batch_id=None, scheduler=None):
+    """Start a new batch, or resume batch ``batch_id`` (``urls`` may then be
+    omitted). Returns the batch ID."""
+    batch_id = batch_id or uuid.uuid4().hex
+    manifest_path, output = batch_paths(batch_id)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    elif urls:
+        os.makedirs(BATCH_DIR, exist_ok=True)
+        manifest = {"id": batch_id, "urls": urls, "maxPages": max_pages, "refresh": refresh, "createdAt": time.time()}
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+    else:
+        raise KeyError(batch_id)
+    (scheduler or default_scheduler()).submit(manifest["urls"], output, manifest["maxPages"], manifest["refresh"])
+    return batch_id
+
+
+def batch_status(batch_id, scheduler=None):
+    scheduler = scheduler or _default_scheduler
+    manifest_path, output = batch_paths(batch_id)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    latest = output.latest()
+    keys = {cache_key(url, manifest["maxPages"]) for url in manifest["urls"]}
+    results = [record for key, record in latest.items() if key in keys]
+    return {
+        "id": batch_id,
+        "running": scheduler is not None and scheduler.is_running(output),
+        "total": len(keys),
+        "done": sum(1 for r in results if "error" not in r),
+        "failed": sum(1 for r in results if "error" in r),
+        "results": results
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Analyze many sites in one run")
+    parser.add_argument("urls", nargs="*", help="Site URLs (or use --file)")
+    parser.add_argument("--file", help="Text file with one URL per line")
+    parser.add_argument("--output", default="batch_results.jsonl",
+                        help="JSON lines file results are appended to; rerun with the same file to resume")
+    parser.add_argument("--max-pages", type=int, default=20, help="Pages to crawl per site (default: 20)")
+    parser.add_argument("--sites", type=int, default=BATCH_SITE_CONCURRENCY,
+                        help=f"Sites analyzed at once (default: {BATCH_SITE_CONCURRENCY})")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached results")
+    args = parser.parse_args()
+
+    urls = list(args.urls)
+    if args.file:
+        urls += read_url_file(args.file)
+    if not urls:
+        print("❌ No URLs given. Pass them as arguments or with --file.")
+        sys.exit(1)
+
+    parse_executor = batch_parse_executor()
+    scheduler = BatchScheduler(site_concurrency=args.sites, sink=default_sink(), cache=default_cache(),
+                               parse_executor=parse_executor)
+    try:
+        summary = scheduler.submit(urls, BatchOutput(args.output), args.max_pages, args.refresh).result()
+    finally:
+        scheduler.close()
+        if parse_executor is not None:
+            parse_executor.shutdown()
+    print(f"✅ Batch finished: {summary['sites']} sites analyzed, {summary['failed']} failed. Results in {args.output}")
@@ -0,0 +1,70 @@
+"""Crawler extraction throughput: inline vs. a pool of parse workers.
+
+Run from the repo root:
+
+    python -m benchmarks.crawl_parse [--pages DIR] [--count 200] [--workers 1 2 4 8] [--mode process]
+
+Feeds pre-fetched pages through SiteCrawler's extraction the way a crawl does
+(extract_page_job on the executor, at most --backlog pages queued) and reports
+pages per second for each worker count, so the scaling with cores is visible
+without network noise.
+"""
+import argparse
+import asyncio
+import time
+
+from crawl import SiteCrawler, extract_page_job, make_parse_executor
+from benchmarks.fixtures import load_pages
+
+BASE_URL = "https://shop.example.com/"
+
+
+async def run_pool(executor, pages, backlog):
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(backlog)
+
+    async def one(name, html):
+        try:
+            await loop.run_in_executor(executor, extract_page_job, BASE_URL, None, BASE_URL + name, html, 200)
+        finally:
+            slots.release()
+
+    tasks = []
+    for name, html in pages:
+        await slots.acquire()
+        tasks.append(asyncio.create_task(one(name, html)))
+    await asyncio.gather(*tasks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", help="directory of saved .html pages")
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--products", type=int, default=200, help="products per synthetic page")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--mode", choices=["process", "thread"], default="process")
+    parser.add_argument("--backlog", type=int, default=16)
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages, args.count, args.products)
+    crawler = SiteCrawler(BASE_URL)
+    start = time.perf_counter()
+    for name, html in pages:
+        crawler.extract_page(BASE_URL + name, html)
+    inline = len(pages) / (time.perf_counter() - start)
+    print(f"{len(pages)} pages")
+    print(f"{'inline':<14} {inline:8.1f} pages/s")
+
+    for workers in args.workers:
+        executor = make_parse_executor(workers, args.mode)
+        # Warm up the workers (process start, imports) outside the timing.
+        asyncio.run(run_pool(executor, pages[:workers], args.backlog))
+        start = time.perf_counter()
+        asyncio.run(run_pool(executor, pages, args.backlog))
+        rate = len(pages) / (time.perf_counter() - start)
+        executor.shutdown()
+        print(f"{args.mode} x{workers:<6} {rate:8.1f} pages/s ({rate / inline:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""DOM traversals per page: one query per feature vs. a single scan.
+
+Run from the repo root:
+
+    python -m benchmarks.extract_passes [--pages DIR] [--count 20] [--parser lxml]
+
+The "per-selector" column runs every query the crawler and scraper need as
+its own walk over the document (a removal pass per remove selector, one
+select per feature selector, separate get_text and link passes), which is
+how extraction used to work; "single scan" collects the same features with
+one Document.scan(). Both start from an already parsed document.
+"""
+import argparse
+import time
+
+from html_parser import parse_html, default_parser
+import crawl
+import scrape
+from benchmarks.fixtures import load_pages
+
+WORKLOADS = {
+    "crawl": (crawl.PRODUCT_SELECTORS, ['script, style, noscript'], 2),
+    "scrape": (scrape.SCAN_SELECTORS, scrape.REMOVE_SELECTORS, 3),
+}
+
+
+def per_selector(doc, selectors, remove, text_passes):
+    passes = 0
+    for selector in remove:
+        doc.remove(selector)
+        passes += 1
+    for selector in selectors:
+        doc.select(selector)
+        passes += 1
+    for _ in range(text_passes):
+        doc.text()
+        passes += 1
+    doc.links()
+    return passes + 1
+
+
+def single_scan(doc, selectors, remove, text_passes):
+    scan = doc.scan(selectors, remove=remove)
+    for _ in range(text_passes):
+        scan.text()
+    scan.links()
+    return 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", help="directory of saved .html pages")
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--products", type=int, default=200, help="products per synthetic page")
+    parser.add_argument("--parser", default=None, help="HTML parser backend (default: fastest installed)")
+    args = parser.parse_args()
+
+    backend = args.parser or default_parser()
+    pages = load_pages(args.pages, args.count, args.products)
+    print(f"{len(pages)} pages, {backend} backend")
+    print(f"{'workload':<8} {'method':<13} {'passes/page':>11} {'ms/page':>9}")
+    for name, (selectors, remove, text_passes) in WORKLOADS.items():
+        for label, fn in [("per-selector", per_selector), ("single scan", single_scan)]:
+            # Parse outside the timing; per_selector mutates its document.
+            docs = [parse_html(html, backend) for _, html in pages]
+            start = time.perf_counter()
+            passes = [fn(doc, selectors, remove, text_passes) for doc in docs]
+            per_page = (time.perf_counter() - start) / len(docs)
+            print(f"{name:<8} {label:<13} {passes[0]:>11} {per_page * 1000:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
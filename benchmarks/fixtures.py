@@ -0,0 +1,75 @@
+"""Synthetic merchant pages for the benchmarks, or saved pages from disk."""
+import os
+import random
+
+PRODUCT = """
+<div class="product-card" data-product="{sku}">
+  <a href="/product/{slug}"><img src="/img/{slug}.jpg" alt="{name}"></a>
+  <h3 class="product-title"><a href="/product/{slug}?utm_source=grid">{name}</a></h3>
+  <span class="price">Rs. {price}</span> <span class="sku">SKU-{sku}</span>
+  <button class="add-to-cart">Add to cart</button>
+</div>"""
+
+PAGE = """<!DOCTYPE html>
+<html><head><title>{title}</title>
+<meta name="description" content="Buy {category} online at the best price.">
+<link rel="canonical" href="https://shop.example.com/{category}">
+<script>window.dataLayer = [];{script}</script><style>.product-card{{margin:0}}</style></head>
+<body>
+<header class="header"><nav class="navbar menu">
+  <a href="/">Home</a><a href="/about-us">About us</a><a href="/contact">Contact</a>
+  <a href="/shipping-policy">Shipping</a><a href="/refund-policy">Refunds</a>
+  {nav}
+</nav></header>
+<div class="cookie-banner">We use cookies.</div>
+<main class="main-content"><h1>{title}</h1>
+<section class="hero banner"><h2 class="section-title">New arrivals in {category}</h2></section>
+<div class="products">{products}</div>
+<article><h2>About our {category}</h2><p>{prose}</p></article>
+</main>
+<aside class="sidebar"><form><input name="q"></form></aside>
+<footer class="footer"><a href="/privacy-policy">Privacy policy</a> <a href="/terms">Terms of service</a>
+<a href="https://facebook.com/shop">Facebook</a> <a href="https://twitter.com/shop">Twitter</a>
+<p>Contact us: support@example.com, +91 98765 43210</p></footer>
+</body></html>"""
+
+WORDS = "organic cotton premium handmade classic slim fit summer winter kids women men".split()
+
+
+def product_page(n_products, seed=0):
+    rng = random.Random(seed)
+    category = rng.choice(["shirts", "seeds", "shoes", "jewellery", "furniture"])
+    products = []
+    for i in range(n_products):
+        name = " ".join(rng.choice(WORDS) for _ in range(3)).title()
+        products.append(PRODUCT.format(
+            sku=f"{seed:02d}{i:05d}AB", slug=f"{category}-{seed}-{i}", name=name, price=rng.randint(99, 9999)
+        ))
+    return PAGE.format(
+        title=f"{category.title()} | Example Shop",
+        category=category,
+        script="var x = 1;" * 200,
+        nav="".join(f'<a href="/collections/{w}">{w.title()}</a>' for w in WORDS),
+        products="".join(products),
+        prose=" ".join(rng.choice(WORDS) for _ in range(400)),
+    )
+
+
+def load_pages(directory=None, count=20, n_products=200):
+    """Return [(name, html)]: saved *.html files from ``directory`` if given,
+    otherwise ``count`` generated product-listing pages."""
+    if directory:
+        pages = []
+        for name in sorted(os.listdir(directory)):
+            if name.endswith((".html", ".htm")):
+                with open(os.path.join(directory, name), encoding="utf-8", errors="replace") as f:
+                    pages.append((name, f.read()))
+        return pages
+    return [(f"synthetic-{i}.html", product_page(n_products, seed=i)) for i in range(count)]
+
+
+def save_pages(directory, pages):
+    os.makedirs(directory, exist_ok=True)
+    for name, html in pages:
+        with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+            f.write(html)
@@ -0,0 +1,69 @@
+"""Page-type keyword detection: a text scan per classifier vs. one shared scan.
+
+Run from the repo root:
+
+    python -m benchmarks.keywords [--pages DIR] [--count 20] [--big-kb 1024]
+
+Classifies each page's extracted text the way the crawler does, with
+detect_page_type() and analyze_metadata() each scanning the text themselves
+and with both sharing one CONTENT_KEYWORDS scan, plus one large text that
+contains none of the keywords (the worst case: every check reads all of it).
+Both ways must give the same results.
+"""
+import argparse
+import random
+import time
+
+from crawl import SiteCrawler, CONTENT_KEYWORDS
+from html_parser import parse_html
+from benchmarks.fixtures import load_pages
+
+FILLER = "lorem ipsum dolor sit amet consectetur adipiscing elit sed eiusmod tempor incididunt".split()
+URL = "https://example.com/page"
+
+
+def timed(fn, texts, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [fn(t) for t in texts]
+        best = min(best, time.perf_counter() - start)
+    return best / len(texts), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", help="directory of saved .html pages")
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--products", type=int, default=200, help="products per synthetic page")
+    parser.add_argument("--big-kb", type=int, default=1024, help="size of the keyword-free text")
+    args = parser.parse_args()
+
+    crawler = SiteCrawler(URL)
+    pages = load_pages(args.pages, args.count, args.products)
+    docs = [parse_html(html) for _, html in pages]
+    samples = [(doc, doc.scan([]).text(separator=' ', strip=True)) for doc in docs]
+    random.seed(0)
+    big = " ".join(random.choice(FILLER) for _ in range(args.big_kb * 1024 // 6))
+
+    def separate(sample):
+        doc, text = sample
+        return crawler.detect_page_type(URL, doc, text), crawler.analyze_metadata(URL, text)
+
+    def shared(sample):
+        doc, text = sample
+        hits = CONTENT_KEYWORDS.scan(text)
+        return crawler.detect_page_type(URL, doc, text, hits), crawler.analyze_metadata(URL, text, hits)
+
+    print(f"{len(CONTENT_KEYWORDS.keywords)} keywords")
+    print(f"{'text':<22} {'method':<16} {'ms/text':>9}")
+    for label, sample in [(f"{len(samples)} pages", samples), (f"{len(big) // 1024} KiB, no hits", [(docs[0], big)])]:
+        old, expected = timed(separate, sample)
+        new, found = timed(shared, sample)
+        assert found == expected, "shared scan disagrees with separate scans"
+        print(f"{label:<22} {'separate scans':<16} {old * 1000:9.3f}")
+        print(f"{label:<22} {'shared scan':<16} {new * 1000:9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Per-page parse and extraction time for each installed HTML parser backend.
+
+Run from the repo root:
+
+    python -m benchmarks.parsers [--pages DIR] [--count 20] [--products 200] [--repeat 3]
+
+--pages points at a directory of saved *.html pages; without it, synthetic
+product-listing pages are generated (--save-fixtures DIR writes them out).
+For every backend this reports the parse alone, the crawler's extraction
+(SiteCrawler.extract_page) and the scraper's (scrape.extract_page), as
+milliseconds per page and pages per second.
+"""
+import argparse
+import statistics
+import time
+
+from html_parser import available_parsers, parse_html
+from crawl import SiteCrawler
+import scrape
+from benchmarks.fixtures import load_pages, save_pages
+
+BASE_URL = "https://shop.example.com/"
+
+
+def measure(fn, pages, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for name, html in pages:
+            fn(name, html)
+        best = min(best, time.perf_counter() - start)
+    return best / len(pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", help="directory of saved .html pages")
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--products", type=int, default=200, help="products per synthetic page")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save-fixtures", metavar="DIR", help="write the synthetic pages to DIR and exit")
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages, args.count, args.products)
+    if args.save_fixtures:
+        save_pages(args.save_fixtures, pages)
+        print(f"saved {len(pages)} pages to {args.save_fixtures}")
+        return
+
+    size = statistics.mean(len(html) for _, html in pages) / 1024
+    print(f"{len(pages)} pages, mean {size:.0f} KiB, best of {args.repeat}")
+    print(f"{'backend':<12} {'stage':<18} {'ms/page':>9} {'pages/s':>9}")
+    baseline = {}
+    for backend in available_parsers():
+        crawler = SiteCrawler(BASE_URL, parser=backend)
+        stages = {
+            "parse": lambda name, html: parse_html(html, backend),
+            "crawl extract": lambda name, html: crawler.extract_page(BASE_URL + name, html),
+            "scrape extract": lambda name, html: scrape.extract_page(html, BASE_URL + name, parser=backend),
+        }
+        for stage, fn in stages.items():
+            per_page = measure(fn, pages, args.repeat)
+            baseline.setdefault(stage, {})[backend] = per_page
+            print(f"{backend:<12} {stage:<18} {per_page * 1000:9.2f} {1 / per_page:9.1f}")
+
+    if "html.parser" in available_parsers() and len(available_parsers()) > 1:
+        fastest = available_parsers()[0]
+        for stage, times in baseline.items():
+            print(f"{stage}: {fastest} is {times['html.parser'] / times[fastest]:.1f}x faster than html.parser")
+
+
+if __name__ == "__main__":
+    main()
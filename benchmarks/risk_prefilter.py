@@ -0,0 +1,144 @@
+"""Compare the full risk-matrix prompt with the local top-K pre-filter.
+
+Run from the repo root:
+
+    python -m benchmarks.risk_prefilter [--labeled sites.jsonl] [--k 5 10 25 50] [--llm 20 [--llm-k 25]]
+
+Accuracy needs --labeled: a file with one {"text": ..., "mcc": ...} object
+per line, taken from real crawls with the MCC set by hand. Reports recall@K
+(is the right MCC among the candidates sent to the LLM) and BM25 and
+offline-classifier (RISK_MODE=local) top-1 accuracy.
+
+Without --labeled, generic shop pages built from a fixed vocabulary (never
+from the risk matrix) stand in, and only latency and prompt size are
+reported: text made from an entry's own words would only measure overlap
+with its label.
+--llm N additionally sends N labeled sites to the configured LLMs twice
+(full list vs. the top --llm-k candidates) and compares accuracy and wall
+time; it needs API keys.
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from risk_index import load_risk_index, entry_line, tokenize
+from mcc_classifier import load_classifier
+from light import RISK_PROMPT, call_risk_models
+
+BOILERPLATE = (
+    "URL: https://{host}/\nTitle: {title}\nPage Type: General, Status: 200, SKU Count: 0\n"
+    'Metadata: {{"hasAboutUs": true, "hasTerms": false, "hasPrivacy": true, '
+    '"hasContact": true, "hasServices": false, "hasProducts": true}}\n'
+    "--------------------\n"
+    "URL: https://{host}/about\nTitle: About us | {title}\nPage Type: About, Status: 200, SKU Count: 0\n"
+)
+
+
+# Deliberately unrelated to the risk matrix's wording.
+SHOP_WORDS = ("new arrivals best sellers free shipping gift card sale collection spring summer "
+              "limited edition customer reviews sign up newsletter track order returns classic "
+              "everyday essentials handmade premium quality bundle starter kit").split()
+
+
+def synthetic_sites(count=200, seed=7):
+    """Unlabeled shop pages, for timing and prompt size only."""
+    rng = random.Random(seed)
+    sites = []
+    for _ in range(count):
+        title = " ".join(rng.sample(SHOP_WORDS, 4))
+        sites.append({"text": BOILERPLATE.format(host="example.com", title=title), "mcc": None})
+    return sites
+
+
+def approx_tokens(text):
+    return len(text) // 4
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--labeled", help="JSONL file of {text, mcc} objects")
+    parser.add_argument("--k", type=int, nargs="+", default=[5, 10, 25, 50])
+    parser.add_argument("--matrix", default="risk_matrix.json")
+    parser.add_argument("--llm", type=int, default=0, metavar="N", help="also compare live LLM calls on N sites")
+    parser.add_argument("--llm-k", type=int, default=25, help="candidates sent in the --llm comparison")
+    args = parser.parse_args()
+
+    index = load_risk_index(args.matrix)
+    classifier = load_classifier(args.matrix)
+    if args.labeled:
+        with open(args.labeled, encoding="utf-8") as f:
+            sites = [json.loads(line) for line in f if line.strip()]
+    else:
+        sites = synthetic_sites()
+    labeled = bool(args.labeled)
+
+    full_list = "\n".join(entry_line(e) for e in index.entries)
+    recall = {k: 0 for k in args.k}
+    top1 = classifier_top1 = 0
+    timings = []
+    classifier_timings = []
+    prompt_tokens = {k: [] for k in args.k}
+
+    for site in sites:
+        start = time.perf_counter()
+        ranked = index.top_k(site["text"], max(args.k))
+        timings.append(time.perf_counter() - start)
+
+        mccs = [entry["MCC_Code"] for entry, _ in ranked]
+        if mccs and mccs[0] == site["mcc"]:
+            top1 += 1
+        for k in args.k:
+            if site["mcc"] in mccs[:k]:
+                recall[k] += 1
+            candidates = "\n".join(index.candidate_lines(site["text"], k))
+            prompt_tokens[k].append(approx_tokens(RISK_PROMPT.format(website_text=site["text"], available_categories=candidates)))
+
+        start = time.perf_counter()
+        local = classifier.classify(site["text"])
+        classifier_timings.append(time.perf_counter() - start)
+        classifier_top1 += bool(local) and local["MCC_Code"] == site["mcc"]
+
+    n = len(sites)
+    full_tokens = statistics.mean(
+        approx_tokens(RISK_PROMPT.format(website_text=s["text"], available_categories=full_list)) for s in sites
+    )
+    print(f"sites: {n}  matrix entries: {len(index.entries)}  vocabulary: {len(index.postings)}")
+    print(f"ranking latency: mean {statistics.mean(timings) * 1000:.3f} ms, "
+          f"p95 {sorted(timings)[int(n * 0.95) - 1] * 1000:.3f} ms")
+    print(f"classifier latency: mean {statistics.mean(classifier_timings) * 1000:.3f} ms")
+    if labeled:
+        print(f"top-1 accuracy: BM25 {top1 / n:.1%}, classifier {classifier_top1 / n:.1%}")
+    else:
+        print("no --labeled file: accuracy not measured")
+    print(f"full-list prompt: ~{full_tokens:.0f} tokens")
+    for k in args.k:
+        recall_text = f"recall {recall[k] / n:6.1%}   " if labeled else ""
+        print(f"top-{k:<3} {recall_text}prompt ~{statistics.mean(prompt_tokens[k]):.0f} tokens "
+              f"({statistics.mean(prompt_tokens[k]) / full_tokens:.0%} of full)")
+
+    if args.llm and not labeled:
+        print("--llm needs --labeled sites to compare against")
+    elif args.llm:
+        compare_llm(index, random.Random(11).sample(sites, min(args.llm, n)), full_list, args.llm_k)
+
+
+def compare_llm(index, sites, full_list, k):
+    for label, categories_for in [
+        ("full list", lambda text: full_list),
+        (f"top-{k}", lambda text: "\n".join(index.candidate_lines(text, k))),
+    ]:
+        correct = 0
+        timings = []
+        for site in sites:
+            start = time.perf_counter()
+            result = call_risk_models(site["text"], categories_for(site["text"])) or {}
+            timings.append(time.perf_counter() - start)
+            correct += str(result.get("MCC_Code")) == str(site["mcc"])
+        print(f"LLM with {label:<10}: accuracy {correct / len(sites):.1%}, "
+              f"mean {statistics.mean(timings):.2f} s per call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import zlib
+from urlnorm import url_fingerprint
+
+
+class ContentStore:
+    """Raw HTML fetched by the crawler, zlib-compressed and keyed by URL.
+
+    The scrape stage reads pages from here instead of downloading them a
+    second time. It lives in memory and can be saved to / loaded from a
+    MongoDB collection (one document per page) to cross process boundaries.
+    """
+
+    def __init__(self):
+        self.pages = {}
+
+    def put(self, url, html, final_url=None):
+        self.pages[url_fingerprint(url)] = (url, final_url or url, zlib.compress(html.encode('utf-8')))
+
+    def get_page(self, url):
+        entry = self.pages.get(url_fingerprint(url))
+        if not entry:
+            return None, None
+        _, final_url, blob = entry
+        return final_url, zlib.decompress(blob).decode('utf-8')
+
+    def get(self, url):
+        return self.get_page(url)[1]
+
+    def __contains__(self, url):
+        return url_fingerprint(url) in self.pages
+
+    def __len__(self):
+        return len(self.pages)
+
+    def save_to_mongodb(self, collection, crawl_id):
+        # Saving again under a crawl ID replaces what was stored for it.
+        collection.delete_many({"crawl_id": crawl_id})
+        docs = [
+            {"crawl_id": crawl_id, "url": url, "final_url": final_url, "html": blob}
+            for url, final_url, blob in self.pages.values()
+        ]
+        if docs:
+            collection.insert_many(docs)
+        return len(docs)
+
+    @classmethod
+    def load_from_mongodb(cls, collection, crawl_id):
+        store = cls()
+        for doc in collection.find({"crawl_id": crawl_id}, {"_id": 0, "url": 1, "final_url": 1, "html": 1}):
+            store.pages[url_fingerprint(doc["url"])] = (doc["url"], doc.get("final_url") or doc["url"], bytes(doc["html"]))
+        return store
@@ -1,35 +1,109 @@
 import re
 import asyncio
+import contextlib
 import aiohttp
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from html_parser import parse_html
+from urllib.parse import urlparse
 from collections import defaultdict
 import time
-from pymongo import MongoClient
-from dotenv import load_dotenv
 import os
+from frontier import URLFrontier
+from urlnorm import canonicalize_url, url_fingerprint
+from keywords import KeywordMatcher
+from fetch import read_html_async, NotHTMLError, FETCH_MAX_BYTES
+from fetch_profiles import default_profiles, BLOCKED_STATUSES
+from politeness import Politeness, RobotsDisallowed
+from page_history import content_hash, site_digest
+from sitemap import SitemapSummary, read_sitemaps
+from content_store import ContentStore
+from db import default_repository
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                  "AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+    "Connection": "keep-alive",
+    "Referer": "https://google.com"
+}
+
+# Extraction off the event loop: 0 parses inline; N > 0 uses N worker
+# processes ("process") or threads ("thread", enough for GIL-releasing
+# parsers like lxml).
+CRAWL_PARSE_WORKERS = int(os.getenv("CRAWL_PARSE_WORKERS", 0))
+CRAWL_PARSE_MODE = os.getenv("CRAWL_PARSE_MODE", "process")
+# Seed the frontier from the site's sitemaps while following links.
+CRAWL_SITEMAPS = os.getenv("CRAWL_SITEMAPS", "1") != "0"
+
+PRODUCT_SELECTORS = [
+    '.product', '.product-item', '.product-card', '.shop-item',
+    '.store-item', '[data-product]', '.woocommerce-loop-product__title',
+    '.product-title', '.item-title'
+]
+KEY_PAGE_PATTERNS = KeywordMatcher([
+    'about', 'contact', 'privacy', 'terms', 'refund', 'shipping',
+    'careers', 'faq', 'support', 'return', 'help', 'policy'
+])
+# Every phrase detect_page_type() and analyze_metadata() look for in the page
+# text, found with one scan of it.
+CONTENT_KEYWORDS = KeywordMatcher([
+    'about us', 'our story', 'our mission', 'contact us', 'get in touch',
+    'terms of service', 'terms and conditions', 'privacy policy',
+    'add to cart', 'buy now', 'product', 'price', 'shop', 'store',
+    'our services', 'consulting', 'solutions'
+])
+
 class SiteCrawler:
-    def __init__(self, base_url, max_pages=10, concurrency=5):
+    def __init__(self, base_url, max_pages=10, concurrency=5, content_store=None, parser=None,
+                 parse_executor=None, parse_backlog=None, profiles=None, politeness=None, history=None,
+                 sitemaps=CRAWL_SITEMAPS, page_sink=None):
         self.base_url = self.normalize_url(base_url)
         self.domain = urlparse(self.base_url).netloc
         self.merchant_path = urlparse(self.base_url).path.rstrip('/')
-        self.visited_urls = set()
-        self.url_queue = [self.base_url]
+        self.frontier = URLFrontier([self.base_url])
+        self.crawled = set()
         self.pages = []
         self.max_pages = max_pages
         self.successful = 0
         self.failed = 0
+        self.duplicates = 0
+        self.skipped = 0
+        self.unchanged = 0
         self.total_time = 0
         self.concurrency = concurrency
+        self.parser = parser
+        # Which headers each host accepts, shared with the scraper.
+        self.profiles = profiles or default_profiles()
+        # robots.txt, Crawl-delay, per-host rate control and retries.
+        self.politeness = politeness or Politeness(max_concurrency=concurrency)
+        # With an executor, fetch workers hand pages off for extraction and move
+        # on; at most parse_backlog fetched pages wait for it at once.
+        self.parse_executor = parse_executor
+        self.parse_backlog = parse_backlog or 2 * max(concurrency, os.cpu_count() or 1)
+        # Raw HTML of every crawled page, so the scraper doesn't fetch it again.
+        self.content_store = content_store if content_store is not None else ContentStore()
+        # What earlier crawls of this site saw: pages are fetched conditionally
+        # and unchanged ones are not extracted again.
+        self.history = history.site(self.base_url) if history is not None else None
+        self.page_hashes = {}
+        self.sitemaps = sitemaps
+        self.sitemap = None
+        # Gets each page record as it is produced (db.PageWriter).
+        self.page_sink = page_sink
 
     def normalize_url(self, url):
         if not url.startswith("http"):
-            return "https://" + url
-        return url
+            url = "https://" + url
+        return canonicalize_url(url)
 
     def is_internal_url(self, url):
         try:
-            parsed = urlparse(url)
+            parsed = urlparse(canonicalize_url(url))
             return (
                 parsed.netloc == self.domain and
                 parsed.path.startswith(self.merchant_path)
@@ -37,32 +111,27 @@ class SiteCrawler:
         except:
             return False
 
-    def extract_links(self, soup):
+    def extract_links(self, scan, page_url=None):
         internal = []
         external = []
         key_pages = []
-        key_patterns = [
-            'about', 'contact', 'privacy', 'terms', 'refund', 'shipping',
-            'careers', 'faq', 'support', 'return', 'help', 'policy'
-        ]
-
-        for a in soup.find_all('a', href=True):
-            href = a['href']
-            link_text = a.get_text(strip=True).lower()
-            resolved = urljoin(self.base_url, href)
+
+        for href, link_text in scan.links():
+            link_text = link_text.lower()
+            resolved = canonicalize_url(href, base=page_url or self.base_url)
             if self.is_internal_url(resolved):
                 internal.append(resolved)
-                if any(p in resolved.lower() or p in link_text for p in key_patterns):
+                if KEY_PAGE_PATTERNS.search(resolved) or KEY_PAGE_PATTERNS.search(link_text):
                     key_pages.append(resolved)
             else:
                 external.append(resolved)
 
         return internal, external, key_pages
 
-    def detect_page_type(self, url, soup, content):
+    def detect_page_type(self, url, doc, content, hits=None):
         u = url.lower()
-        c = content.lower()
-        t = (soup.title.string if soup.title else "").lower()
+        c = hits if hits is not None else CONTENT_KEYWORDS.scan(content)
+        t = (doc.title or "").lower()
 
         if any(x in u for x in ['/about', 'about-us']): return 'About'
         if any(x in u for x in ['/contact', 'contact-us']): return 'Contact'
@@ -71,30 +140,25 @@ class SiteCrawler:
         if any(x in u for x in ['/terms', '/tos']): return 'Terms'
         if any(x in u for x in ['/privacy', '/policy']): return 'Privacy'
 
-        if 'about us' in c or 'our story' in c or 'our mission' in c or 'about' in t: return 'About'
-        if 'contact us' in c or 'get in touch' in c or 'contact' in t: return 'Contact'
-        if 'terms of service' in c or 'terms and conditions' in c or 'terms' in t: return 'Terms'
+        if c.any(['about us', 'our story', 'our mission']) or 'about' in t: return 'About'
+        if c.any(['contact us', 'get in touch']) or 'contact' in t: return 'Contact'
+        if c.any(['terms of service', 'terms and conditions']) or 'terms' in t: return 'Terms'
         if 'privacy policy' in c or 'privacy' in t: return 'Privacy'
 
-        if any(x in c for x in ['add to cart', 'buy now', 'product', 'price', 'shop']): return 'Product'
-        if any(x in c for x in ['our services', 'consulting', 'solutions']): return 'Service'
+        if c.any(['add to cart', 'buy now', 'product', 'price', 'shop']): return 'Product'
+        if c.any(['our services', 'consulting', 'solutions']): return 'Service'
 
         return 'General'
 
-    def count_products(self, soup):
-        selectors = [
-            '.product', '.product-item', '.product-card', '.shop-item',
-            '.store-item', '[data-product]', '.woocommerce-loop-product__title',
-            '.product-title', '.item-title'
-        ]
+    def count_products(self, scan):
         max_count = 0
-        for sel in selectors:
-            elements = soup.select(sel)
-            if len(elements) > max_count:
-                max_count = len(elements)
+        for sel in PRODUCT_SELECTORS:
+            count = scan.count(sel)
+            if count > max_count:
+                max_count = count
 
         if max_count == 0:
-            text = soup.get_text()
+            text = scan.text()
             pattern = re.compile(r'(?=\S*[A-Za-z])(?=\S*\d)[A-Za-z\d\-_]{6,}')
             matches = pattern.findall(text)
             unique_matches = set(matches)
@@ -102,64 +166,189 @@ class SiteCrawler:
 
         return max_count
 
-    def analyze_metadata(self, url, content):
+    def analyze_metadata(self, url, content, hits=None):
         u = url.lower()
-        c = content.lower()
+        c = hits if hits is not None else CONTENT_KEYWORDS.scan(content)
         return {
             'hasAboutUs': 'about' in u or 'about us' in c,
             'hasTerms': 'terms' in u or 'terms of service' in c,
             'hasPrivacy': 'privacy' in u or 'privacy policy' in c,
             'hasContact': 'contact' in u or 'contact us' in c,
             'hasServices': 'services' in u or 'our services' in c,
-            'hasProducts': any(x in c for x in ['product', 'shop', 'store']),
+            'hasProducts': c.any(['product', 'shop', 'store']),
         }
 
-    async def crawl_page(self, session, url):
+    def canonical_link(self, doc, url):
+        href = doc.canonical()
+        if not href:
+            return None
+        canonical = canonicalize_url(href, base=url)
+        if canonical == url or not self.is_internal_url(canonical):
+            return None
+        return canonical
+
+    def extract_page(self, url, html, status=200):
+        doc = parse_html(html, self.parser)
+        canonical = self.canonical_link(doc, url)
+        # One walk over the page collects the text, links and product counts.
+        scan = doc.scan(PRODUCT_SELECTORS, remove=['script, style, noscript'])
+        content = scan.text(separator=' ', strip=True)
+        title = doc.title.strip() if doc.title is not None else 'Untitled'
+        hits = CONTENT_KEYWORDS.scan(content)
+        page_type = self.detect_page_type(url, doc, content, hits)
+        product_count = self.count_products(scan)
+        internal, external, key_pages = self.extract_links(scan, page_url=url)
+        metadata = self.analyze_metadata(url, content, hits)
+
+        page = {
+            "url": url,
+            "title": title,
+            "pageType": page_type,
+            "status": status,
+            "contentLength": len(content),
+            "hasProducts": product_count > 0,
+            "productCount": product_count,
+            "links": {
+                "internal": len(internal),
+                "external": len(external)
+            },
+            "metadata": metadata
+        }
+        return page, canonical, internal, key_pages
+
+    async def fetch_page(self, session, url):
+        """Returns (html, status, final_url, validators), or None if the page
+        failed. validators holds the ETag, Last-Modified and content hash."""
+        conditional = self.history.conditional_headers(url) if self.history else {}
         try:
-            async with session.get(url, timeout=10) as res:
-                if res.status != 200:
-                    self.failed += 1
-                    return None
-                html = await res.text()
-                soup = BeautifulSoup(html, 'html.parser')
-                for tag in soup(['script', 'style', 'noscript']):
-                    tag.decompose()
-                content = soup.get_text(separator=' ', strip=True)
-                title = soup.title.string.strip() if soup.title else 'Untitled'
-                page_type = self.detect_page_type(url, soup, content)
-                product_count = self.count_products(soup)
-                internal, external, key_pages = self.extract_links(soup)
-                metadata = self.analyze_metadata(url, content)
-
-                for link in key_pages:
-                    if link not in self.visited_urls and link not in self.url_queue:
-                        self.url_queue.insert(0, link)
-                for link in internal:
-                    if link not in self.visited_urls and link not in self.url_queue:
-                        self.url_queue.append(link)
-
-                self.successful += 1
-
-                return {
-                    "url": url,
-                    "title": title,
-                    "pageType": page_type,
-                    "status": res.status,
-                    "contentLength": len(content),
-                    "hasProducts": product_count > 0,
-                    "productCount": product_count,
-                    "links": {
-                        "internal": len(internal),
-                        "external": len(external)
-                    },
-                    "metadata": metadata
-                }
+            for index in self.profiles.order(url):
+                headers = dict(self.profiles.headers(index), **conditional)
+                async with self.politeness.get(session, url, timeout=10, headers=headers) as res:
+                    if res.status in BLOCKED_STATUSES:
+                        self.profiles.failed(url, index)
+                        continue
+                    if res.status == 304 and self.history is not None and self.history.get(url):
+                        # Not modified: the copy from the last crawl is current.
+                        self.profiles.succeeded(url, index)
+                        html, final_url = self.history.page(url)
+                        record = self.history.get(url)
+                        validators = {"etag": record["etag"], "last_modified": record["last_modified"],
+                                      "hash": record["hash"]}
+                        return html, 200, final_url, validators
+                    if res.status != 200:
+                        break
+                    self.profiles.succeeded(url, index)
+                    html, truncated = await read_html_async(res)
+                    if truncated:
+                        print(f"Truncated: {url} (body over {FETCH_MAX_BYTES} bytes)")
+                    validators = {"etag": res.headers.get("ETag"), "last_modified": res.headers.get("Last-Modified"),
+                                  "hash": content_hash(html)}
+                    return html, res.status, str(res.url), validators
+            self.failed += 1
+            return None
+        except (NotHTMLError, RobotsDisallowed) as e:
+            # PDFs, images and other downloads linked from the site, and
+            # pages the site asks crawlers to leave alone.
+            print(f"Skipped: {url} ({e})")
+            self.skipped += 1
+            return None
+        except Exception as e:
+            print(f"Failed: {url} ({e})")
+            self.failed += 1
+            return None
+
+    def known_extraction(self, url, fetched):
+        # A page whose HTML hashes the same as last time (volatile markup
+        # aside) extracts the same.
+        if self.history is None:
+            return None
+        extracted = self.history.extraction(url, fetched[3]["hash"])
+        if extracted is not None:
+            self.unchanged += 1
+        return extracted
+
+    def record_page(self, url, fetched, extracted):
+        html, status, final_url, validators = fetched
+        page, canonical, internal, key_pages = extracted
+        if canonical:
+            # Another URL already produced (or will produce) this page.
+            if url_fingerprint(canonical) in self.crawled:
+                self.duplicates += 1
+                return None
+            self.crawled.add(url_fingerprint(canonical))
+            self.frontier.mark_seen(canonical)
+        self.content_store.put(url, html, final_url=final_url)
+        self.page_hashes[url] = validators["hash"]
+        if self.history is not None:
+            self.history.record(url, final_url, html, validators, extracted)
+
+        for link in key_pages:
+            self.frontier.add(link, priority=True)
+        for link in internal:
+            self.frontier.add(link)
+
+        self.successful += 1
+        return page
 
+    async def crawl_page(self, session, url):
+        fetched = await self.fetch_page(session, url)
+        if fetched is None:
+            return None
+        html, status, _, _ = fetched
+        try:
+            extracted = self.known_extraction(url, fetched) or self.extract_page(url, html, status)
+            return self.record_page(url, fetched, extracted)
         except Exception as e:
             print(f"Failed: {url} ({e})")
             self.failed += 1
             return None
 
+    async def parse_page(self, url, fetched):
+        html, status, _, _ = fetched
+        result = None
+        try:
+            loop = asyncio.get_running_loop()
+            extracted = await loop.run_in_executor(
+                self.parse_executor, extract_page_job, self.base_url, self.parser, url, html, status
+            )
+            result = self.record_page(url, fetched, extracted)
+        except Exception as e:
+            print(f"Failed: {url} ({e})")
+            self.failed += 1
+        finally:
+            self.parse_slots.release()
+            await self.finish_page(result)
+
+    async def seed_from_sitemaps(self, session):
+        # Runs alongside the workers. Key pages listed in the sitemaps go in
+        # the priority lane as they are found, so they are crawled next
+        # instead of whenever links lead to them; at most half the page
+        # budget goes to them. Other listed pages are queued at the end.
+        self.sitemap = SitemapSummary(self.is_internal_url, KEY_PAGE_PATTERNS.search, self.max_pages)
+        self.sitemap_key_pages = 0
+        try:
+            await read_sitemaps(session, self.base_url, self.politeness, accept=self.is_internal_url,
+                                is_key=KEY_PAGE_PATTERNS.search, limit=self.max_pages,
+                                summary=self.sitemap, on_file=self.add_sitemap_key_pages)
+        except Exception as e:
+            print(f"Sitemaps failed: {self.base_url} ({e})")
+            self.sitemap.complete = False
+        async with self.frontier_changed:
+            for url in self.sitemap.ranked_pages():
+                self.frontier.add(url)
+            self.seeding = False
+            self.frontier_changed.notify_all()
+
+    async def add_sitemap_key_pages(self, summary):
+        budget = max(1, self.max_pages // 2)
+        async with self.frontier_changed:
+            for url in summary.ranked_key_pages(budget):
+                if self.sitemap_key_pages >= budget:
+                    break
+                if self.frontier.add(url, priority=True):
+                    self.sitemap_key_pages += 1
+            self.frontier_changed.notify_all()
+
     def generate_report(self):
         pages_by_type = defaultdict(int)
         total_skus = 0
@@ -190,9 +379,17 @@ class SiteCrawler:
             'pagesByType': dict(pages_by_type),
             'pages': self.pages,
             'summary': summary,
+            # Changes whenever the set of pages or any page's HTML does,
+            # volatile markup (see content_hash) aside.
+            'contentDigest': site_digest(self.page_hashes),
+            # Product URLs the sitemaps list, fetched or not.
+            'sitemap': self.sitemap.stats() if self.sitemap else None,
             'crawlStats': {
                 'successful': self.successful,
                 'failed': self.failed,
+                'duplicates': self.duplicates,
+                'skipped': self.skipped,
+                'unchanged': self.unchanged,
                 'totalTime': round(self.total_time, 2)
             }
         }
@@ -200,31 +397,119 @@ class SiteCrawler:
     def crawl(self):
         return asyncio.run(self.async_crawl())
 
-    async def async_crawl(self):
+    def claim_next_url(self):
+        # Check and reserve a page slot in one step (no await in between), so
+        # max_pages holds even with many workers racing for the frontier.
+        while self.frontier and len(self.pages) + self.in_flight < self.max_pages:
+            url = self.frontier.pop()
+            key = url_fingerprint(url)
+            if key not in self.crawled and self.is_internal_url(url):
+                self.crawled.add(key)
+                self.in_flight += 1
+                return url
+        return None
+
+    async def crawl_worker(self, session):
+        while True:
+            async with self.frontier_changed:
+                url = self.claim_next_url()
+                while url is None:
+                    # Nothing left to hand out and nobody can add more: done.
+                    if (self.in_flight == 0 and not self.seeding) or len(self.pages) >= self.max_pages:
+                        self.frontier_changed.notify_all()
+                        return
+                    await self.frontier_changed.wait()
+                    url = self.claim_next_url()
+
+            if self.parse_executor is None:
+                await self.finish_page(await self.crawl_page(session, url))
+                continue
+
+            fetched = await self.fetch_page(session, url)
+            if fetched is None:
+                await self.finish_page(None)
+                continue
+            extracted = self.known_extraction(url, fetched)
+            if extracted is not None:
+                await self.finish_page(self.record_page(url, fetched, extracted))
+                continue
+            # Backpressure: stop fetching while the parse backlog is full. The
+            # page stays in flight (and holds its max_pages slot) until parsed.
+            await self.parse_slots.acquire()
+            task = asyncio.create_task(self.parse_page(url, fetched))
+            self.parse_tasks.add(task)
+            task.add_done_callback(self.parse_tasks.discard)
+
+    async def finish_page(self, result):
+        async with self.frontier_changed:
+            self.in_flight -= 1
+            if result:
+                self.pages.append(result)
+                if self.page_sink is not None:
+                    self.page_sink.add(result)
+            self.frontier_changed.notify_all()
+
+    async def async_crawl(self, session=None):
         start = time.time()
-        async with aiohttp.ClientSession(headers={"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                  "AppleWebKit/537.36 (KHTML, like Gecko) "
-                  "Chrome/120.0.0.0 Safari/537.36",
-    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-    "Accept-Language": "en-US,en;q=0.5",
-    "Connection": "keep-alive",
-    "Referer": "https://google.com"}) as session:
-            while self.url_queue and len(self.pages) < self.max_pages:
-                batch = []
-                while self.url_queue and len(batch) < self.concurrency and len(self.pages) + len(batch) < self.max_pages:
-                    url = self.url_queue.pop(0)
-                    if url not in self.visited_urls and self.is_internal_url(url):
-                        self.visited_urls.add(url)
-                        batch.append(url)
-
-                tasks = [self.crawl_page(session, url) for url in batch]
-                results = await asyncio.gather(*tasks)
-                for result in results:
-                    if result:
-                        self.pages.append(result)
+        if session is None:
+            async with aiohttp.ClientSession(headers=DEFAULT_HEADERS) as session:
+                await self.run_workers(session)
+        else:
+            await self.run_workers(session)
         self.total_time = time.time() - start
         return self.generate_report()
 
+    async def run_workers(self, session):
+        self.in_flight = 0
+        self.frontier_changed = asyncio.Condition()
+        self.parse_slots = asyncio.Semaphore(self.parse_backlog)
+        self.parse_tasks = set()
+        self.seeding = self.sitemaps
+        seeder = asyncio.create_task(self.seed_from_sitemaps(session)) if self.sitemaps else None
+        workers = [asyncio.create_task(self.crawl_worker(session)) for _ in range(self.concurrency)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            # The page budget can run out before the sitemaps are read.
+            if seeder is not None and not seeder.done():
+                seeder.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await seeder
+
+
+# ---------------------- Parse Workers ----------------------
+@lru_cache(maxsize=32)
+def page_extractor(base_url, parser):
+    return SiteCrawler(base_url, parser=parser)
+
+
+def extract_page_job(base_url, parser, url, html, status):
+    # Runs in a parse worker: only picklable arguments go in, and the crawler
+    # used for extraction is rebuilt there once per site.
+    return page_extractor(base_url, parser).extract_page(url, html, status)
+
+
+def make_parse_executor(workers=None, mode="process"):
+    workers = workers or os.cpu_count() or 1
+    if mode == "thread":
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="parse")
+    # spawn: forking a process that already runs threads (Flask, job workers)
+    # can deadlock the children.
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+_default_parse_executor = None
+_default_parse_executor_lock = threading.Lock()
+
+
+def default_parse_executor():
+    global _default_parse_executor
+    if CRAWL_PARSE_WORKERS <= 0:
+        return None
+    with _default_parse_executor_lock:
+        if _default_parse_executor is None:
+            _default_parse_executor = make_parse_executor(CRAWL_PARSE_WORKERS, CRAWL_PARSE_MODE)
+        return _default_parse_executor
 
 
 if __name__ == "__main__":
@@ -235,6 +520,12 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Website crawler for detailed site analysis")
     parser.add_argument("url", nargs="?", help="The base URL to start crawling from (e.g., https://example.com)")
     parser.add_argument("--max", type=int, help="Maximum number of pages to crawl (default: 10)")
+    parser.add_argument("--crawl-id", type=int, help="Crawl ID to store the result under (default: allocate a new one)")
+    parser.add_argument("--concurrency", type=int, default=5, help="Concurrent page fetches (default: 5)")
+    parser.add_argument("--parse-workers", type=int, default=CRAWL_PARSE_WORKERS,
+                        help="Extract pages in N worker processes instead of the event loop (default: 0, inline)")
+    parser.add_argument("--parse-mode", choices=["process", "thread"], default=CRAWL_PARSE_MODE,
+                        help="Kind of parse workers (default: process)")
     args = parser.parse_args()
 
     if not args.url:
@@ -250,8 +541,12 @@ if __name__ == "__main__":
             print("❌ Invalid number entered. Using default = 10.")
             args.max = 10
 
-    crawler = SiteCrawler(base_url=args.url, max_pages=args.max)
+    parse_executor = make_parse_executor(args.parse_workers, args.parse_mode) if args.parse_workers > 0 else None
+    crawler = SiteCrawler(base_url=args.url, max_pages=args.max, concurrency=args.concurrency,
+                          parse_executor=parse_executor)
     crawl_result = crawler.crawl()
+    if parse_executor:
+        parse_executor.shutdown()
     if crawl_result["totalPages"] == 0:
        print("❌ Unable to crawl any pages. Please check the URL or site restrictions.")
        sys.exit(1)
@@ -268,37 +563,8 @@ if __name__ == "__main__":
 
     # print("\n✅ Crawl complete. Results saved to result.txt.")
     # ==== SAVE TO MONGODB ====
-    load_dotenv()
-mongo_uri = os.getenv("MONGO_URI")  # No fallback to localhost
-client = MongoClient(mongo_uri)
-db = client["website_crawler"]
-collection = db["crawl_results"]
-
-# Find the last used result number
-last_doc = collection.find_one(sort=[("result_id", -1)])
-last_id = last_doc.get("result_id", 0) if last_doc else 0
-next_id = last_id + 1
-
-# Wrap your crawl result inside a key like "result_1", "result_2", etc.
-wrapped_result = {
-    "result_id": next_id,
-    f"result_{next_id}": {
-        "baseUrl": crawl_result["baseUrl"],
-        "pages": [
-            {
-                "url": p["url"],
-                "title": p["title"],
-                "pageType": p["pageType"],
-                "status": p["status"],
-                "productCount": p["productCount"],
-                "metadata": p["metadata"]
-            }
-            for p in crawl_result["pages"]
-        ],
-        "summary": crawl_result["summary"],
-        "crawlStats": crawl_result["crawlStats"]
-    }
-}
+    repository = default_repository()
+    next_id = args.crawl_id if args.crawl_id is not None else repository.new_crawl_id()
 
-collection.insert_one(wrapped_result)
-print(f"\n✅ Crawl complete. Stored as result_{next_id} in MongoDB.")
\ No newline at end of file
+    repository.save_crawl(next_id, crawl_result, crawler.content_store)
+    print(f"\n✅ Crawl complete. Stored as crawl ID {next_id} in MongoDB.")
@@ -0,0 +1,308 @@
+import os
+import time
+import threading
+from concurrent.futures import Executor
+from typing import Iterator, List, Optional
+
+from dotenv import load_dotenv
+from pymongo import ASCENDING, MongoClient, ReturnDocument
+
+from content_store import ContentStore
+
+load_dotenv()
+
+MONGO_URI = os.getenv("MONGO_URI")
+DB_NAME = "website_crawler"
+# One pool per process serves every request thread, batch and pipeline.
+MONGO_POOL_OPTIONS = {
+    "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", 20)),
+    "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", 0)),
+    "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_MS", 60000)),
+    "connectTimeoutMS": 5000,
+    "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 10000)),
+    "retryWrites": True,
+}
+# Page documents per insert_many round trip.
+PAGE_BATCH_SIZE = 500
+# What is kept of each crawled page; the crawl's summary goes in crawl_results.
+CRAWL_PAGE_FIELDS = ["url", "title", "pageType", "status", "productCount", "metadata"]
+CRAWL_SUMMARY_FIELDS = ["baseUrl", "totalPages", "totalSKUs", "pagesByType", "summary", "sitemap",
+                        "contentDigest", "crawlStats"]
+
+
+# ---------------------- Client ----------------------
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The process's MongoClient, created on first use.
+
+    A MongoClient must not be used across fork(): a worker forked from a
+    process that already had one (gunicorn --preload, multiprocessing)
+    gets a fresh client of its own.
+    """
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            if not MONGO_URI:
+                raise RuntimeError("MONGO_URI is not set")
+            _client = MongoClient(MONGO_URI, **MONGO_POOL_OPTIONS)
+            _client_pid = os.getpid()
+        return _client
+
+
+def _forget_client():
+    # The child inherits the parent's sockets; it must never touch them.
+    global _client, _client_pid
+    _client, _client_pid = None, None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_client)
+
+
+# ---------------------- Crawl IDs ----------------------
+def next_crawl_id(db):
+    # Atomic counter: concurrent workers can never be handed the same ID.
+    # The counter is seeded from the highest existing result_id the first time.
+    counters = db["counters"]
+    if not counters.find_one({"_id": "crawl_id"}):
+        last = db["crawl_results"].find_one(sort=[("result_id", -1)], projection={"result_id": 1})
+        seed = last.get("result_id", 0) if last else 0
+        counters.update_one({"_id": "crawl_id"}, {"$setOnInsert": {"seq": seed}}, upsert=True)
+    doc = counters.find_one_and_update(
+        {"_id": "crawl_id"},
+        {"$inc": {"seq": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return doc["seq"]
+
+
+def ensure_indexes(db):
+    db["crawl_results"].create_index([("result_id", ASCENDING)])
+    db["scrape_results"].create_index([("crawl_id", ASCENDING)])
+    db["crawl_pages"].create_index([("crawl_id", ASCENDING), ("n", ASCENDING)])
+    db["crawl_pages"].create_index([("crawl_id", ASCENDING), ("url", ASCENDING)])
+    db["scrape_pages"].create_index([("crawl_id", ASCENDING), ("n", ASCENDING)])
+    db["scrape_pages"].create_index([("crawl_id", ASCENDING), ("url", ASCENDING)])
+    ensure_unique_page_content(db)
+    db["page_history"].create_index([("site", ASCENDING), ("url", ASCENDING)], unique=True)
+
+
+def ensure_unique_page_content(db):
+    """One page_content document per (crawl_id, url).
+
+    The index was not unique at first, and crawl IDs saved more than once
+    kept every copy; those extra copies (all but the newest) go before the
+    index is made unique.
+    """
+    collection = db["page_content"]
+    index = collection.index_information().get("crawl_id_1_url_1")
+    if index and index.get("unique"):
+        return
+    if index:
+        collection.drop_index("crawl_id_1_url_1")
+    duplicates = collection.aggregate([
+        {"$group": {"_id": {"crawl_id": "$crawl_id", "url": "$url"}, "ids": {"$push": "$_id"}, "n": {"$sum": 1}}},
+        {"$match": {"n": {"$gt": 1}}}
+    ], allowDiskUse=True)
+    for group in duplicates:
+        collection.delete_many({"_id": {"$in": sorted(group["ids"])[:-1]}})
+    collection.create_index([("crawl_id", ASCENDING), ("url", ASCENDING)], unique=True)
+
+
+# ---------------------- Page Records ----------------------
+# Each crawled and each scraped page is its own document (crawl_pages,
+# scrape_pages) tagged with the crawl ID and its position n, so no crawl
+# runs into the 16 MB document limit and readers can stream pages.
+class PageWriter:
+    """Writes page documents for one crawl ID as they come in, buffered into
+    insert_many batches of ``batch_size``.
+
+    Any pages already stored under the crawl ID are replaced. With an
+    ``executor``, batches are inserted on it and add() never blocks on the
+    database; close() waits for them.
+    """
+
+    def __init__(self, collection, crawl_id, batch_size=PAGE_BATCH_SIZE, fields=None, executor=None):
+        self.collection = collection
+        self.crawl_id = crawl_id
+        self.batch_size = batch_size
+        self.fields = fields
+        self.executor = executor
+        self.buffer = []
+        self.pending = []
+        self.count = 0
+        collection.delete_many({"crawl_id": crawl_id})
+
+    def add(self, page, n=None):
+        doc = {k: page[k] for k in self.fields if k in page} if self.fields else dict(page)
+        doc.pop("_id", None)
+        doc.update(crawl_id=self.crawl_id, n=self.count if n is None else n)
+        self.count += 1
+        self.buffer.append(doc)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        batch, self.buffer = self.buffer, []
+        if self.executor is None:
+            self.collection.insert_many(batch, ordered=False)
+        else:
+            self.pending.append(self.executor.submit(self.collection.insert_many, batch, ordered=False))
+
+    def close(self):
+        self.flush()
+        pending, self.pending = self.pending, []
+        for future in pending:
+            future.result()
+
+
+def crawl_page_writer(db, crawl_id, executor=None):
+    return PageWriter(db["crawl_pages"], crawl_id, fields=CRAWL_PAGE_FIELDS, executor=executor)
+
+
+def scrape_page_writer(db, crawl_id, executor=None):
+    return PageWriter(db["scrape_pages"], crawl_id, executor=executor)
+
+
+def save_crawl(db, crawl_id, crawl_result, content_store=None, pages_written=False):
+    """Store a crawl: its summary in crawl_results, its pages in crawl_pages
+    (unless a crawl_page_writer already wrote them) and its raw HTML."""
+    if not pages_written:
+        writer = crawl_page_writer(db, crawl_id)
+        for page in crawl_result["pages"]:
+            writer.add(page)
+        writer.close()
+    doc = {k: crawl_result.get(k) for k in CRAWL_SUMMARY_FIELDS}
+    doc.update(result_id=crawl_id, createdAt=time.time())
+    db["crawl_results"].replace_one({"result_id": crawl_id}, doc, upsert=True)
+    if content_store is not None:
+        content_store.save_to_mongodb(db["page_content"], crawl_id)
+
+
+def save_scrape(db, crawl_id, scrape_results):
+    writer = scrape_page_writer(db, crawl_id)
+    for result in scrape_results:
+        writer.add(result)
+    writer.close()
+
+
+def latest_crawl_id(db):
+    last = db["crawl_results"].find_one(sort=[("result_id", -1)], projection={"result_id": 1})
+    return last["result_id"] if last else None
+
+
+def find_crawl(db, crawl_id):
+    """The crawl's summary document (without its pages), or None."""
+    return db["crawl_results"].find_one({"result_id": crawl_id}, {"_id": 0})
+
+
+def projection(fields):
+    if fields:
+        return dict({f: 1 for f in fields}, _id=0)
+    return {"_id": 0, "crawl_id": 0, "n": 0}
+
+
+def iter_crawl_pages(db, crawl_id, fields=None):
+    """Stream a crawl's pages in crawl order, only ``fields`` if given."""
+    cursor = db["crawl_pages"].find({"crawl_id": crawl_id}, projection(fields)).sort("n", ASCENDING)
+    found = False
+    for page in cursor:
+        found = True
+        yield page
+    if not found:
+        # Crawls stored before per-page records keep their pages in one
+        # document, under result_<id>.
+        legacy = db["crawl_results"].find_one({"result_id": crawl_id}, {f"result_{crawl_id}.pages": 1})
+        for page in ((legacy or {}).get(f"result_{crawl_id}") or {}).get("pages", []):
+            yield {k: page[k] for k in fields if k in page} if fields else page
+
+
+def iter_scrape_pages(db, crawl_id, fields=None):
+    """Stream a crawl's scrape results in URL order, only ``fields`` if given."""
+    cursor = db["scrape_pages"].find({"crawl_id": crawl_id}, projection(fields)).sort("n", ASCENDING)
+    found = False
+    for result in cursor:
+        found = True
+        yield result
+    if not found:
+        legacy = db["scrape_results"].find_one({"_id": crawl_id}, {"compliance_sections": 1})
+        for result in (legacy or {}).get("compliance_sections", []):
+            yield {k: result[k] for k in fields if k in result} if fields else result
+
+
+# ---------------------- Repository ----------------------
+class Repository:
+    """Every read and write of crawl and scrape results goes through here.
+
+    Uses the process-wide client unless given one (a mongomock client
+    works too). Indexes are created once per database.
+    """
+
+    _indexed = set()
+
+    def __init__(self, client=None, db_name=DB_NAME):
+        self.client = client
+        self.db_name = db_name
+
+    @property
+    def db(self):
+        # Looked up on each use, so a forked worker ends up on its own client.
+        db = (self.client or get_client())[self.db_name]
+        key = (id(db.client), self.db_name, os.getpid())
+        if key not in Repository._indexed:
+            ensure_indexes(db)
+            Repository._indexed.add(key)
+        return db
+
+    def new_crawl_id(self) -> int:
+        return next_crawl_id(self.db)
+
+    def latest_crawl_id(self) -> Optional[int]:
+        return latest_crawl_id(self.db)
+
+    def crawl_writer(self, crawl_id: int, executor: Optional[Executor] = None) -> PageWriter:
+        return crawl_page_writer(self.db, crawl_id, executor)
+
+    def scrape_writer(self, crawl_id: int, executor: Optional[Executor] = None) -> PageWriter:
+        return scrape_page_writer(self.db, crawl_id, executor)
+
+    def save_crawl(self, crawl_id: int, crawl_result: dict, content_store: Optional[ContentStore] = None,
+                   pages_written: bool = False) -> None:
+        save_crawl(self.db, crawl_id, crawl_result, content_store, pages_written)
+
+    def save_scrape(self, crawl_id: int, scrape_results: List[dict]) -> None:
+        save_scrape(self.db, crawl_id, scrape_results)
+
+    def find_crawl(self, crawl_id: int) -> Optional[dict]:
+        return find_crawl(self.db, crawl_id)
+
+    def crawl_pages(self, crawl_id: int, fields: Optional[List[str]] = None) -> Iterator[dict]:
+        return iter_crawl_pages(self.db, crawl_id, fields)
+
+    def crawl_urls(self, crawl_id: int) -> List[str]:
+        return [page["url"] for page in self.crawl_pages(crawl_id, ["url"]) if "url" in page]
+
+    def scrape_pages(self, crawl_id: int, fields: Optional[List[str]] = None) -> Iterator[dict]:
+        return iter_scrape_pages(self.db, crawl_id, fields)
+
+    def content_store(self, crawl_id: int) -> ContentStore:
+        return ContentStore.load_from_mongodb(self.db["page_content"], crawl_id)
+
+
+_default_repository = None
+_default_repository_lock = threading.Lock()
+
+
+def default_repository():
+    global _default_repository
+    with _default_repository_lock:
+        if _default_repository is None:
+            _default_repository = Repository()
+        return _default_repository
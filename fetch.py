@@ -0,0 +1,88 @@
+import os
+import re
+import codecs
+
+# Largest body read per page; longer pages are cut off at this many bytes.
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", 5 * 1024 * 1024))
+CHUNK_SIZE = 64 * 1024
+HTML_TYPES = {"text/html", "application/xhtml+xml"}
+
+CHARSET_RE = re.compile(r"""charset\s*=\s*["']?([\w.:-]+)""", re.IGNORECASE)
+META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([\w.:-]+)""", re.IGNORECASE)
+# Browsers look for <meta charset> in the first 1024 bytes.
+SNIFF_BYTES = 1024
+
+
+class NotHTMLError(Exception):
+    """The response is not an HTML page, so its body is not read at all."""
+
+
+def check_content_type(content_type):
+    # A missing Content-Type is let through; plenty of small sites omit it.
+    mimetype = (content_type or "").split(";")[0].strip().lower()
+    if mimetype and mimetype not in HTML_TYPES:
+        raise NotHTMLError(f"not an HTML page ({mimetype})")
+
+
+def header_charset(content_type):
+    m = CHARSET_RE.search(content_type or "")
+    return m.group(1) if m else None
+
+
+def known_codec(name):
+    try:
+        return codecs.lookup(name).name
+    except (LookupError, TypeError):
+        return None
+
+
+class BodyDecoder:
+    """Decodes a streamed body chunk by chunk, stopping at ``max_bytes``.
+
+    The charset comes from the Content-Type header, else from a <meta
+    charset> in the first chunk, else UTF-8; undecodable bytes are replaced
+    rather than failing the page.
+    """
+
+    def __init__(self, charset=None, max_bytes=None):
+        self.charset = known_codec(charset) if charset else None
+        self.max_bytes = max_bytes or FETCH_MAX_BYTES
+        self.decoder = None
+        self.parts = []
+        self.size = 0
+        self.truncated = False
+
+    def feed(self, chunk):
+        """Add a chunk; returns False once the size cap is reached."""
+        if self.decoder is None:
+            if self.charset is None:
+                m = META_CHARSET_RE.search(chunk[:SNIFF_BYTES])
+                sniffed = m and known_codec(m.group(1).decode("ascii"))
+                # A UTF-16 page could not have declared itself in ASCII.
+                self.charset = sniffed if sniffed and not sniffed.startswith("utf-16") else "utf-8"
+            self.decoder = codecs.getincrementaldecoder(self.charset)(errors="replace")
+        room = self.max_bytes - self.size
+        if len(chunk) > room:
+            chunk = chunk[:room]
+            self.truncated = True
+        self.size += len(chunk)
+        self.parts.append(self.decoder.decode(chunk))
+        return not self.truncated
+
+    def text(self):
+        if self.decoder is None:
+            return ""
+        self.parts.append(self.decoder.decode(b"", final=True))
+        return "".join(self.parts)
+
+
+async def read_html_async(response, max_bytes=None):
+    """Stream an aiohttp response body into text. Returns (html, truncated)."""
+    content_type = response.headers.get("Content-Type", "")
+    check_content_type(content_type)
+    decoder = BodyDecoder(header_charset(content_type), max_bytes)
+    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+        if not decoder.feed(chunk):
+            break
+    return decoder.text(), decoder.truncated
+
@@ -0,0 +1,92 @@
+import os
+import time
+import threading
+from urllib.parse import urlparse
+
+# Header sets tried against sites that block a request, in default order.
+PROFILES = [
+    {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'},
+    {'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'},
+    {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'},
+    {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0'},
+    {'User-Agent': 'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)'},
+    {'User-Agent': 'facebookexternalhit/1.1 (+http://www.facebook.com/externalhit_uatext.php)'}
+]
+# Statuses that mean "not with these headers"; anything else (404, 500, ...)
+# would come back the same whatever profile asked.
+BLOCKED_STATUSES = {401, 403, 406}
+FETCH_PROFILE_TTL = float(os.getenv("FETCH_PROFILE_TTL", 3600))
+
+
+def host_of(url):
+    return urlparse(url).netloc.lower()
+
+
+class FetchProfiles:
+    """Per-host memory of which header profile gets through.
+
+    order() puts the profile that last worked for the host first, then the
+    ones not tried yet, and leaves out the ones that were blocked; what is
+    learned expires after ``ttl`` seconds. One instance is shared by the
+    crawler and the scraper, so the scrape stage starts with what the crawl
+    found out.
+    """
+
+    def __init__(self, profiles=PROFILES, ttl=FETCH_PROFILE_TTL):
+        self.profiles = profiles
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.good = {}     # host -> (profile index, time)
+        self.blocked = {}  # host -> {profile index: time}
+
+    def order(self, url):
+        host = host_of(url)
+        now = time.time()
+        with self.lock:
+            good = self.good.get(host)
+            if good and now - good[1] > self.ttl:
+                del self.good[host]
+                good = None
+            blocked = {i: t for i, t in self.blocked.get(host, {}).items() if now - t <= self.ttl}
+            self.blocked[host] = blocked
+        first = [good[0]] if good else []
+        rest = [i for i in range(len(self.profiles)) if i not in first and i not in blocked]
+        if not first and not rest:
+            # Everything was blocked recently: retry only the longest-ago one.
+            rest = [min(blocked, key=blocked.get)]
+        return first + rest
+
+    def headers(self, index):
+        return self.profiles[index]
+
+    def succeeded(self, url, index):
+        host = host_of(url)
+        with self.lock:
+            self.good[host] = (index, time.time())
+            self.blocked.get(host, {}).pop(index, None)
+
+    def failed(self, url, index):
+        host = host_of(url)
+        with self.lock:
+            self.blocked.setdefault(host, {})[index] = time.time()
+            if self.good.get(host, (None,))[0] == index:
+                del self.good[host]
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hosts": len(set(self.good) | {h for h, b in self.blocked.items() if b}),
+                "known": {host: index for host, (index, _) in self.good.items()}
+            }
+
+
+_default_profiles = None
+_default_profiles_lock = threading.Lock()
+
+
+def default_profiles():
+    global _default_profiles
+    with _default_profiles_lock:
+        if _default_profiles is None:
+            _default_profiles = FetchProfiles()
+        return _default_profiles
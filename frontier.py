@@ -0,0 +1,46 @@
+from collections import deque
+from urlnorm import url_fingerprint
+
+
+class URLFrontier:
+    """Crawl frontier with O(1) enqueue, dequeue and "seen" checks.
+
+    Key pages (about, privacy, terms, ...) go into a priority lane that is
+    always drained before the normal lane. A URL is only ever queued once:
+    the seen set covers both queued and already-crawled URLs and holds 64-bit
+    fingerprints of the (canonical) URLs rather than the strings themselves.
+    """
+
+    def __init__(self, seeds=()):
+        self.priority = deque()
+        self.normal = deque()
+        self.seen = set()
+        for url in seeds:
+            self.add(url)
+
+    def add(self, url, priority=False):
+        key = url_fingerprint(url)
+        if key in self.seen:
+            return False
+        self.seen.add(key)
+        (self.priority if priority else self.normal).append(url)
+        return True
+
+    def pop(self):
+        if self.priority:
+            return self.priority.popleft()
+        if self.normal:
+            return self.normal.popleft()
+        return None
+
+    def mark_seen(self, url):
+        self.seen.add(url_fingerprint(url))
+
+    def __contains__(self, url):
+        return url_fingerprint(url) in self.seen
+
+    def __len__(self):
+        return len(self.priority) + len(self.normal)
+
+    def __bool__(self):
+        return bool(self.priority or self.normal)
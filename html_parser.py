@@ -0,0 +1,483 @@
+import os
+import re
+import importlib.util
+from collections import defaultdict
+from functools import lru_cache
+
+from bs4 import BeautifulSoup, Tag, NavigableString, CData
+
+# Fastest first. The lxml backend parses with lxml.html and evaluates CSS
+# selectors as compiled XPath, so no BeautifulSoup tree is built at all;
+# html.parser (pure Python, via BeautifulSoup) is always available as the
+# fallback.
+PARSER_MODULES = {
+    "lxml": ("lxml", "cssselect"),
+    "html.parser": (),
+}
+
+
+def available_parsers():
+    return [
+        name for name, modules in PARSER_MODULES.items()
+        if all(importlib.util.find_spec(m) is not None for m in modules)
+    ]
+
+
+@lru_cache(maxsize=None)
+def default_parser():
+    # HTML_PARSER pins a backend (e.g. for comparing outputs); otherwise the
+    # fastest installed one is used.
+    requested = os.getenv("HTML_PARSER")
+    parsers = available_parsers()
+    if requested:
+        if requested not in parsers:
+            raise ValueError(f"HTML_PARSER={requested!r} is not available (installed: {', '.join(parsers)})")
+        return requested
+    return parsers[0]
+
+
+def parse_html(html, parser=None):
+    parser = parser or default_parser()
+    if parser == "lxml":
+        return LxmlDocument(html)
+    return SoupDocument(html, parser)
+
+
+def join_strings(strings, separator, strip):
+    if strip:
+        strings = (s.strip() for s in strings)
+        strings = (s for s in strings if s)
+    return separator.join(strings)
+
+
+# ---------------------- Single-Pass Scan ----------------------
+COMPOUND_RE = re.compile(r"""
+    (?P<tag>[a-zA-Z][\w-]*|\*)?
+    (?P<rest>(?:[.#][\w-]+|\[[\w-]+(?:[~*^$|]?=(?:"[^"]*"|'[^']*'|[\w-]+))?\])*)$
+""", re.VERBOSE)
+PART_RE = re.compile(r"""([.#])([\w-]+)|\[([\w-]+)(?:([~*^$|]?=)(?:"([^"]*)"|'([^']*)'|([\w-]+)))?\]""")
+
+ATTR_TESTS = {
+    None: lambda value, want: True,
+    "=": lambda value, want: value == want,
+    "~=": lambda value, want: want in value.split(),
+    "*=": lambda value, want: bool(want) and want in value,
+    "^=": lambda value, want: bool(want) and value.startswith(want),
+    "$=": lambda value, want: bool(want) and value.endswith(want),
+    "|=": lambda value, want: value == want or value.startswith(want + "-"),
+}
+
+
+def parse_compound(text):
+    """'div.a#b[href*="x"]' -> (tag, ids, classes, ((attr, op, value), ...))."""
+    m = COMPOUND_RE.match(text)
+    if not m:
+        raise ValueError(f"Unsupported selector for scan(): {text!r}")
+    tag = (m.group("tag") or "*").lower()
+    ids, classes, attrs = [], [], []
+    for sigil, name, attr, op, dq, sq, bare in PART_RE.findall(m.group("rest")):
+        if sigil == "#":
+            ids.append(name)
+        elif sigil == ".":
+            classes.append(name)
+        else:
+            value = dq or sq or bare
+            attrs.append((attr.lower(), op or None, value))
+    return tag, tuple(ids), tuple(classes), tuple(attrs)
+
+
+MATCH_CACHE_SIZE = 4096
+
+
+class SelectorSet:
+    """Simple CSS selectors (compounds, at most one descendant combinator,
+    comma groups) matched against every element during a single walk.
+
+    Each compound is indexed under its most selective part (id, class, tag or
+    attribute name), so an element is only checked against the few
+    compounds that could possibly match it.
+    """
+
+    def __init__(self, selectors, remove=()):
+        self.compounds = []
+        self.compound_ids = {}
+        self.index = defaultdict(list)
+        # compound id -> [(selector, ancestor compound id or None)]
+        self.rules = defaultdict(list)
+        self.ancestors = set()
+        self.remove = set()
+        # Pages repeat the same element shapes (product cards, menu items), so
+        # match results are memoized on the parts of an element selectors see.
+        self.cache = {}
+        self.selectors = list(dict.fromkeys(selectors))
+        for selector in self.selectors:
+            for group in selector.split(","):
+                steps = group.split()
+                if not 1 <= len(steps) <= 2:
+                    raise ValueError(f"Unsupported selector for scan(): {group!r}")
+                target = self.compound(steps[-1])
+                ancestor = self.compound(steps[0]) if len(steps) == 2 else None
+                if ancestor is not None:
+                    self.ancestors.add(ancestor)
+                if (selector, ancestor) not in self.rules[target]:
+                    self.rules[target].append((selector, ancestor))
+        for selector in remove:
+            for group in selector.split(","):
+                self.remove.add(self.compound(group.strip()))
+        self.valued_attrs = {"class", "id"} | {
+            name for _, _, _, attrs in self.compounds for name, op, _ in attrs if op
+        }
+        self.named_attrs = {name for _, _, _, attrs in self.compounds for name, _, _ in attrs}
+
+    def compound(self, text):
+        spec = parse_compound(text)
+        if spec not in self.compound_ids:
+            tag, ids, classes, attrs = spec
+            if ids:
+                key = ("id", ids[0])
+            elif classes:
+                key = ("class", classes[0])
+            elif tag != "*":
+                key = ("tag", tag)
+            elif attrs:
+                key = ("attr", attrs[0][0])
+            else:
+                key = ("any",)
+            self.compound_ids[spec] = len(self.compounds)
+            self.compounds.append(spec)
+            self.index[key].append(len(self.compounds) - 1)
+        return self.compound_ids[spec]
+
+    def match(self, tag, attrs):
+        """Ids of the compounds matching an element (attrs: name -> str)."""
+        key = (tag,) + tuple(
+            (name, value if name in self.valued_attrs else None)
+            for name, value in attrs.items() if name in self.valued_attrs or name in self.named_attrs
+        )
+        matched = self.cache.get(key)
+        if matched is None:
+            if len(self.cache) >= MATCH_CACHE_SIZE:
+                self.cache.clear()
+            matched = self.cache[key] = self.match_uncached(tag, attrs)
+        return matched
+
+    def match_uncached(self, tag, attrs):
+        classes = attrs.get("class", "").split()
+        element_id = attrs.get("id")
+        keys = [("tag", tag), ("any",)]
+        keys += [("class", c) for c in classes]
+        keys += [("attr", name) for name in attrs]
+        if element_id is not None:
+            keys.append(("id", element_id))
+
+        matched = []
+        index = self.index
+        for key in keys:
+            for cid in index.get(key, ()):
+                if cid in matched:
+                    continue
+                want_tag, ids, want_classes, want_attrs = self.compounds[cid]
+                if want_tag != "*" and want_tag != tag:
+                    continue
+                if any(i != element_id for i in ids):
+                    continue
+                if any(c not in classes for c in want_classes):
+                    continue
+                if any(name not in attrs or not ATTR_TESTS[op](attrs[name], value)
+                       for name, op, value in want_attrs):
+                    continue
+                matched.append(cid)
+        return tuple(matched)
+
+
+class ScanNode:
+    __slots__ = ("scan", "attrs", "start", "end")
+
+    def __init__(self, scan, attrs, start):
+        self.scan = scan
+        self.attrs = attrs
+        self.start = start
+        self.end = start
+
+    def text(self, separator='', strip=False):
+        return join_strings(self.scan.strings[self.start:self.end], separator, strip)
+
+    def get(self, attr, default=None):
+        return self.attrs.get(attr, default)
+
+
+class PageScan:
+    """What one walk over a document collects: the text strings (in document
+    order, without removed subtrees, comments and script/style contents) and,
+    for every selector, its matching elements as ScanNodes whose text is a
+    slice of those strings.
+    """
+
+    def __init__(self, selectors):
+        self.selectors = selectors
+        self.strings = []
+        self.matches = {selector: [] for selector in selectors.selectors}
+        self.open = defaultdict(int)
+
+    def enter(self, tag, attrs):
+        """Called for each element before its children; returns its ScanNode,
+        or None if the element is removed (its subtree is then skipped)."""
+        matched = self.selectors.match(tag, attrs)
+        if any(cid in self.selectors.remove for cid in matched):
+            return None
+        node = ScanNode(self, attrs, len(self.strings))
+        for cid in matched:
+            for selector, ancestor in self.selectors.rules.get(cid, ()):
+                if ancestor is None or self.open[ancestor]:
+                    found = self.matches[selector]
+                    if not found or found[-1] is not node:
+                        found.append(node)
+        opened = [cid for cid in matched if cid in self.selectors.ancestors]
+        for cid in opened:
+            self.open[cid] += 1
+        return node, opened
+
+    def leave(self, node, opened):
+        node.end = len(self.strings)
+        for cid in opened:
+            self.open[cid] -= 1
+
+    def text(self, separator='', strip=False):
+        return join_strings(self.strings, separator, strip)
+
+    def select(self, selector):
+        return self.matches[selector]
+
+    def select_one(self, selector):
+        found = self.matches[selector]
+        return found[0] if found else None
+
+    def count(self, selector):
+        return len(self.matches[selector])
+
+    def exists(self, selector):
+        return bool(self.matches[selector])
+
+    def links(self):
+        return [(node.attrs["href"], node.text(strip=True)) for node in self.matches['a[href]']]
+
+
+# Elements whose contents never count as page text.
+RAW_TEXT_TAGS = {'script', 'style', 'template'}
+LINK_SELECTOR = 'a[href]'
+
+
+@lru_cache(maxsize=64)
+def selector_set(selectors, remove):
+    # links() works on every scan, so a[href] is always collected.
+    return SelectorSet(selectors + (LINK_SELECTOR,), remove)
+
+
+# ---------------------- BeautifulSoup Backend ----------------------
+class SoupNode:
+    def __init__(self, tag):
+        self.tag = tag
+
+    def text(self, separator='', strip=False):
+        return self.tag.get_text(separator=separator, strip=strip)
+
+    def get(self, attr, default=None):
+        return self.tag.get(attr, default)
+
+
+class SoupDocument:
+    def __init__(self, html, parser="html.parser"):
+        self.soup = BeautifulSoup(html, parser)
+
+    @property
+    def title(self):
+        return self.soup.title.get_text() if self.soup.title else None
+
+    def select(self, selector):
+        return [SoupNode(tag) for tag in self.soup.select(selector)]
+
+    def select_one(self, selector):
+        tag = self.soup.select_one(selector)
+        return SoupNode(tag) if tag else None
+
+    def count(self, selector):
+        return len(self.soup.select(selector))
+
+    def exists(self, selector):
+        return self.soup.select_one(selector) is not None
+
+    def remove(self, selector):
+        for tag in self.soup.select(selector):
+            tag.decompose()
+
+    def text(self, separator='', strip=False):
+        return self.soup.get_text(separator=separator, strip=strip)
+
+    def links(self):
+        return [(a['href'], a.get_text(strip=True)) for a in self.soup.find_all('a', href=True)]
+
+    def meta(self, name):
+        tag = self.soup.find('meta', attrs={'name': name})
+        return tag.get('content', '') if tag else None
+
+    def canonical(self):
+        link = self.soup.find('link', rel='canonical', href=True)
+        return link['href'] if link else None
+
+    def scan(self, selectors, remove=()):
+        scan = PageScan(selector_set(tuple(selectors), tuple(remove)))
+        strings = scan.strings
+        # (children still to visit, node, opened ancestor compounds, in_text)
+        stack = [(iter(self.soup.contents), None, (), True)]
+        while stack:
+            children, node, opened, in_text = stack[-1]
+            for child in children:
+                if isinstance(child, Tag):
+                    attrs = {k: ' '.join(v) if isinstance(v, list) else v for k, v in child.attrs.items()}
+                    entered = scan.enter(child.name, attrs)
+                    if entered is not None:
+                        stack.append((iter(child.contents), *entered, in_text and child.name not in RAW_TEXT_TAGS))
+                        break
+                elif in_text and type(child) in (NavigableString, CData):
+                    strings.append(child)
+            else:
+                stack.pop()
+                if node is not None:
+                    scan.leave(node, opened)
+        return scan
+
+
+# ---------------------- lxml Backend ----------------------
+@lru_cache(maxsize=512)
+def compile_selector(selector):
+    from lxml.cssselect import CSSSelector
+    return CSSSelector(selector, translator='html')
+
+
+@lru_cache(maxsize=None)
+def text_xpath():
+    # Like BeautifulSoup's get_text(): no comments, and no script, style or
+    # template contents.
+    from lxml.etree import XPath
+    return XPath('.//text()[not(ancestor::script or ancestor::style or ancestor::template)]')
+
+
+def element_strings(el):
+    return text_xpath()(el)
+
+
+class LxmlNode:
+    def __init__(self, el):
+        self.el = el
+
+    def text(self, separator='', strip=False):
+        return join_strings(element_strings(self.el), separator, strip)
+
+    def get(self, attr, default=None):
+        return self.el.get(attr, default)
+
+
+@lru_cache(maxsize=None)
+def lxml_parser():
+    # Plain etree elements: lxml.html's element class lookup costs more than
+    # the walk in scan() itself.
+    from lxml.etree import HTMLParser
+    return HTMLParser()
+
+
+def drop_tree(el):
+    # Remove an element and its subtree, keeping its tail text in place.
+    parent = el.getparent()
+    if el.tail:
+        previous = el.getprevious()
+        if previous is not None:
+            previous.tail = (previous.tail or '') + el.tail
+        else:
+            parent.text = (parent.text or '') + el.tail
+    parent.remove(el)
+
+
+class LxmlDocument:
+    def __init__(self, html):
+        from lxml.etree import fromstring
+        try:
+            root = fromstring(html, lxml_parser())
+        except ValueError:
+            # Unicode input that still carries an XML encoding declaration.
+            root = fromstring(html.encode('utf-8', 'replace'), lxml_parser())
+        # Empty documents parse to nothing.
+        self.root = root if root is not None else fromstring('<html></html>', lxml_parser())
+
+    @property
+    def title(self):
+        title = self.root.find('.//title')
+        return join_strings(element_strings(title), '', False) if title is not None else None
+
+    def select(self, selector):
+        return [LxmlNode(el) for el in compile_selector(selector)(self.root)]
+
+    def select_one(self, selector):
+        for el in compile_selector(selector)(self.root):
+            return LxmlNode(el)
+        return None
+
+    def count(self, selector):
+        return len(compile_selector(selector)(self.root))
+
+    def exists(self, selector):
+        return self.select_one(selector) is not None
+
+    def remove(self, selector):
+        for el in compile_selector(selector)(self.root):
+            if el.getparent() is not None:
+                drop_tree(el)
+
+    def text(self, separator='', strip=False):
+        return join_strings(element_strings(self.root), separator, strip)
+
+    def links(self):
+        return [
+            (a.get('href'), join_strings(element_strings(a), '', True))
+            for a in self.root.iter('a') if a.get('href') is not None
+        ]
+
+    def meta(self, name):
+        for el in self.root.iter('meta'):
+            if el.get('name') == name:
+                return el.get('content', '')
+        return None
+
+    def canonical(self):
+        for el in compile_selector('link[rel~="canonical"][href]')(self.root):
+            return el.get('href')
+        return None
+
+    def scan(self, selectors, remove=()):
+        from lxml.etree import iterwalk
+        scan = PageScan(selector_set(tuple(selectors), tuple(remove)))
+        strings = scan.strings
+        stack = []  # (node, opened ancestor compounds, in_text) per open element
+        walker = iterwalk(self.root, events=('start', 'end', 'comment', 'pi'))
+        for event, el in walker:
+            in_text = stack[-1][2] if stack else True
+            if event == 'start':
+                entered = scan.enter(el.tag, dict(el.attrib))
+                if entered is None:
+                    walker.skip_subtree()
+                    stack.append((None, (), in_text))
+                    continue
+                node, opened = entered
+                in_text = in_text and el.tag not in RAW_TEXT_TAGS
+                if in_text and el.text:
+                    strings.append(el.text)
+                stack.append((node, opened, in_text))
+            elif event == 'end':
+                node, opened, _ = stack.pop()
+                if node is not None:
+                    scan.leave(node, opened)
+                if stack and stack[-1][2] and el.tail:
+                    strings.append(el.tail)
+            elif in_text and el.tail:
+                # Comments and processing instructions: only the tail is text.
+                strings.append(el.tail)
+        return scan
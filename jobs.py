@@ -0,0 +1,125 @@
+import time
+import uuid
+import threading
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from urlnorm import canonicalize_url
+
+STAGES = ["crawl", "scrape", "summarize", "classify"]
+
+
+class QueueFullError(Exception):
+    pass
+
+
+def validate_max_pages(value):
+    """``value`` as a page count, or ValueError if it isn't a positive integer."""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError("'max_pages' must be a positive integer")
+    try:
+        pages = int(value)
+    except ValueError:
+        raise ValueError("'max_pages' must be a positive integer") from None
+    if pages < 1:
+        raise ValueError("'max_pages' must be a positive integer")
+    return pages
+
+
+class JobManager:
+    """Runs analyze_website jobs on a bounded local thread pool.
+
+    Jobs for a URL that is already queued or running are deduplicated onto
+    the existing job. Finished jobs are kept (up to ``max_finished``) so
+    their result can still be polled.
+
+    Job state lives in this process's memory only: it is lost on restart,
+    and with several gunicorn workers each has its own jobs, so a poll can
+    land on a worker that never saw the job. Run a single worker (scale with
+    JOB_WORKERS threads instead).
+    """
+
+    def __init__(self, runner, max_workers=2, max_pending=50, max_finished=500):
+        self.runner = runner
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analyze-job")
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self.jobs = OrderedDict()
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    def submit(self, url, max_pages=20, refresh=False):
+        """Queue an analysis; ValueError if ``max_pages`` is not a positive integer."""
+        max_pages = validate_max_pages(max_pages)
+        key = (canonicalize_url(url), max_pages)
+        with self.lock:
+            job_id = self.in_flight.get(key)
+            if job_id:
+                return self.snapshot(job_id), False
+            if len(self.in_flight) >= self.max_pending:
+                raise QueueFullError("Too many analyses in progress, try again later.")
+
+            job_id = uuid.uuid4().hex
+            self.jobs[job_id] = {
+                "id": job_id,
+                "url": url,
+                "maxPages": max_pages,
+                "refresh": refresh,
+                "status": "queued",
+                "stages": {stage: "pending" for stage in STAGES},
+                "createdAt": time.time(),
+                "startedAt": None,
+                "finishedAt": None,
+                "result": None,
+                "error": None,
+                "key": key
+            }
+            self.in_flight[key] = job_id
+            self.evict_finished()
+            job = self.snapshot(job_id)
+
+        self.executor.submit(self.run_job, job_id)
+        return job, True
+
+    def get(self, job_id):
+        with self.lock:
+            return self.snapshot(job_id) if job_id in self.jobs else None
+
+    def snapshot(self, job_id):
+        job = dict(self.jobs[job_id])
+        job["stages"] = dict(job["stages"])
+        del job["key"]
+        return job
+
+    def set_stage(self, job_id, stage, status):
+        with self.lock:
+            self.jobs[job_id]["stages"][stage] = status
+
+    def run_job(self, job_id):
+        with self.lock:
+            job = self.jobs[job_id]
+            job["status"] = "running"
+            job["startedAt"] = time.time()
+            url, max_pages, refresh = job["url"], job["maxPages"], job["refresh"]
+
+        def progress(stage, status):
+            self.set_stage(job_id, stage, status)
+
+        try:
+            result = self.runner(url, max_pages, progress=progress, refresh=refresh)
+            status, error = ("failed", result["error"]) if "error" in result else ("done", None)
+        except Exception as e:
+            traceback.print_exc()
+            result, status, error = None, "failed", str(e)
+
+        with self.lock:
+            job = self.jobs[job_id]
+            job.update(status=status, result=result, error=error, finishedAt=time.time())
+            self.in_flight.pop(job["key"], None)
+
+    def evict_finished(self):
+        finished = [jid for jid, j in self.jobs.items() if j["status"] in ("done", "failed")]
+        for jid in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[jid]
+
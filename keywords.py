@@ -0,0 +1,61 @@
+import re
+
+
+def trie_pattern(words):
+    """Regex matching any of ``words``, factored as a trie so the engine
+    follows one branch per character instead of trying every word; optional
+    tails are greedy, so the longest word starting at a position wins."""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def emit(node):
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return emit(trie)
+
+
+class KeywordHits:
+    """Which keywords occur in a scanned text, looked up as they are asked
+    for: each lookup is one ``in`` on the lowercased text, which stops at
+    the first occurrence, and callers that short-circuit skip the rest."""
+
+    def __init__(self, text):
+        self.text = text
+        self.found = {}
+
+    def __contains__(self, keyword):
+        hit = self.found.get(keyword)
+        if hit is None:
+            hit = self.found[keyword] = keyword in self.text
+        return hit
+
+    def any(self, keywords):
+        return any(k in self for k in keywords)
+
+
+class KeywordMatcher:
+    """Case-insensitive substring search for a fixed set of keywords.
+
+    scan() lowercases a text once for any number of presence checks on it;
+    search() asks whether any keyword occurs at all, with one trie-shaped
+    regex.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = sorted({k.lower() for k in keywords}, key=len, reverse=True)
+        self.pattern = re.compile(trie_pattern(self.keywords)) if self.keywords else None
+
+    def scan(self, text):
+        return KeywordHits(text.lower())
+
+    def search(self, text):
+        """Whether any keyword occurs in ``text``."""
+        return self.pattern is not None and self.pattern.search(text.lower()) is not None
@@ -1,20 +1,18 @@
 import os
 import json
-import subprocess
 from dotenv import load_dotenv
 import sys
 import re
 import time
 import hashlib
-from pymongo import MongoClient
-from openai import OpenAI
-import anthropic
+from db import CRAWL_PAGE_FIELDS, default_repository
+from llm_memo import default_memo, memo_key
+from risk_index import load_risk_index
+from mcc_classifier import load_classifier
+import llm
 
 load_dotenv()
 
-MONGO_URI = os.getenv("MONGO_URI")
-DB_NAME = "website_crawler"
-
 # ---------------------- Basic Cache for URL Repeats ----------------------
 url_cache = {}
 def is_repeated_url(url):
@@ -30,20 +28,13 @@ def is_repeated_url(url):
 
 # ---------------------- MongoDB Fetchers ----------------------
 def get_latest_crawl_id():
-    client = MongoClient(MONGO_URI)
-    db = client[DB_NAME]
-    collection = db["crawl_results"]
-    last = collection.find_one(sort=[("result_id", -1)])
-    return last["result_id"] if last else None
+    return default_repository().latest_crawl_id()
 
 def fetch_crawl_text(crawl_id):
-    client = MongoClient(MONGO_URI)
-    db = client[DB_NAME]
-    data = db["crawl_results"].find_one({"result_id": crawl_id})
-    if not data or f"result_{crawl_id}" not in data:
-        return ""
+    # Pages are streamed and formatted one at a time.
+    return format_crawl_text(default_repository().crawl_pages(crawl_id, CRAWL_PAGE_FIELDS))
 
-    pages = data[f"result_{crawl_id}"]["pages"]
+def format_crawl_text(pages):
     lines = []
     for page in pages:
         lines.append(f"URL: {page['url']}")
@@ -54,20 +45,9 @@ def fetch_crawl_text(crawl_id):
     return "\n".join(lines)
 
 def fetch_scrape_json(crawl_id):
-    client = MongoClient(MONGO_URI)
-    db = client[DB_NAME]
-    data = db["scrape_results"].find_one({"_id": crawl_id})
-    return data.get("compliance_sections", []) if data else []
+    return list(default_repository().scrape_pages(crawl_id))
 
 # ---------------------- Helpers ----------------------
-def run_crawler(url, max_pages):
-    print("🚀 Running crawl.py...")
-    subprocess.run([sys.executable, "crawl.py", url, "--max", str(max_pages)], check=True)
-
-def run_scraper(crawl_id):
-    print(f"🔍 Running scrape.py with crawl_id={crawl_id}")
-    subprocess.run([sys.executable, "scrape.py", str(crawl_id)], check=True)
-
 
 def extract_total_skus(crawl_text):
     sku_matches = re.findall(r'SKU Count:\s*(\d+)', crawl_text)
@@ -101,9 +81,27 @@ def extract_json(text):
         print(f"❌ JSON parsing failed: {e}")
         return None
 
-# ---------------------- LLM Summary ----------------------
-def summarize_with_openai_or_claude(crawl_text, scrape_json, total_skus, total_pages):
-    prompt = f"""
+# ---------------------- LLM Prompts ----------------------
+# Any edit to a template invalidates its memo entries automatically; bump
+# PROMPT_VERSION for changes that alter answers without touching the text.
+PROMPT_VERSION = 1
+OPENAI_MODEL = "gpt-4o"
+CLAUDE_MODEL = "claude-opus-4-20250514"
+
+# RISK_MODE: "llm" asks the LLM, "local" uses the offline classifier and
+# never calls an LLM. There is no mixed mode: the classifier's confidence is
+# not calibrated against labeled real sites (see benchmarks/risk_prefilter.py
+# --labeled), and uncalibrated it is as sure of itself on unrelated text as
+# on a match. Its answers also leave productTypes, businessModel and
+# targetMarket empty.
+# RISK_CANDIDATES is how many risk-matrix entries the LLM prompt gets, best
+# BM25 match first; 0 sends all of them. Site text often shares no words
+# with the right entry (a "dental clinic" and "Dentists and orthodontists"),
+# so the pre-filter stays off until its recall is measured on labeled sites.
+RISK_MODE = os.getenv("RISK_MODE", "llm")
+RISK_CANDIDATES = int(os.getenv("RISK_CANDIDATES", 0))
+
+SUMMARY_PROMPT = """
 You are an expert at analyzing eCommerce website data.
 
 Below is content collected from a merchant website. Your task is to **estimate the number of unique products** listed across all pages, even if SKU codes are missing.
@@ -151,54 +149,19 @@ Respond strictly in the following JSON format:
 Analyze the crawl and scrape output and fill in the fields accurately.
 
 ## CRAWL DATA:
-{crawl_text[:3500]}
+{crawl_data}
 
 ## SCRAPE DATA:
-{json.dumps(scrape_json)[:3500]}
+{scrape_data}
 """
-    try:
-        print("🤖 Sending to OpenAI GPT-4...")
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3
-        )
-        return extract_json(response.choices[0].message.content.strip())
-    except Exception as e:
-        print("⚠️ OpenAI failed:", e)
-        try:
-            print("🤖 Falling back to Claude...")
-            client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-            response = client.messages.create(
-                model="claude-opus-4-20250514",
-                max_tokens=1024,
-                temperature=0.1,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return extract_json(response.content[0].text.strip())
-        except Exception as ce:
-            print("❌ Claude also failed:", ce)
-            return {"error": "Summarization failed from all models."}
 
-# ---------------------- Category Classification ----------------------
-def run_risk_analysis(crawl_text, risk_matrix_path="risk_matrix.json"):
-    with open(risk_matrix_path, "r", encoding="utf-8") as f:
-        risk_matrix = json.load(f)
-
-    website_text = flatten_content(crawl_text)[:6000]
-    available_categories = "\n".join(
-        f"{normalize(e['Category'])} - {normalize(e['Sub_Category'])} (MCC: {e['MCC_Code']})"
-        for e in risk_matrix
-    )
-
-    prompt = f"""
+RISK_PROMPT = """
 Analyze the following website content and categorize it based on the available business categories provided.
 
 Website Content:
 {website_text}
 
-Available Categories (format: Category - Subcategory (MCC: code)):
+Candidate Categories, best lexical matches first (format: Category - Subcategory (MCC: code)):
 {available_categories}
 
 Please respond with JSON in this exact format:
@@ -220,31 +183,98 @@ Please respond with JSON in this exact format:
   "decisionProcess": "step-by-step explanation of how you arrived at this MCC"
 }}
 """
+
+def normalize_scrape_json(scrape_json):
+    # Scrape results follow the crawl's URL order, which varies from run to
+    # run with the crawl's concurrency; sort them so the memo key and the
+    # prompt depend only on their content.
+    return sorted(scrape_json, key=lambda r: json.dumps(r, sort_keys=True, ensure_ascii=False))
+
+# ---------------------- LLM Summary ----------------------
+def summarize_with_openai_or_claude(crawl_text, scrape_json, total_skus, total_pages):
+    # The prompt is built from the same order as the key, so a memo hit
+    # returns what this exact prompt produced.
+    scrape_json = normalize_scrape_json(scrape_json)
+    memo = default_memo()
+    key = memo_key(
+        "summary", [OPENAI_MODEL, CLAUDE_MODEL], SUMMARY_PROMPT, PROMPT_VERSION,
+        crawl_text=normalize(crawl_text),
+        scrape_json=scrape_json,
+        total_skus=total_skus,
+        total_pages=total_pages
+    )
+    cached = memo.get(key)
+    if cached is not None:
+        print("⚡ Summary served from LLM memo")
+        return cached
+
+    result = call_summary_models(crawl_text, scrape_json, total_skus, total_pages)
+    if result and "error" not in result:
+        memo.set(key, "summary", result)
+    return result
+
+def call_summary_models(crawl_text, scrape_json, total_skus, total_pages):
+    prompt = SUMMARY_PROMPT.format(
+        total_pages=total_pages,
+        total_skus=total_skus,
+        crawl_data=crawl_text[:3500],
+        scrape_data=json.dumps(scrape_json)[:3500]
+    )
+    try:
+        print("🤖 Sending to OpenAI GPT-4...")
+        provider, text = llm.complete([
+            ("openai", lambda: llm.call_openai(prompt, OPENAI_MODEL, temperature=0.3)),
+            ("claude", lambda: llm.call_claude(prompt, CLAUDE_MODEL, temperature=0.1)),
+        ])
+        return extract_json(text)
+    except llm.AllProvidersFailed as e:
+        print("❌ All models failed:", e)
+        return {"error": "Summarization failed from all models."}
+
+# ---------------------- Category Classification ----------------------
+def run_risk_analysis(crawl_text, risk_matrix_path="risk_matrix.json", mode=None):
+    mode = mode or RISK_MODE
+    website_text = flatten_content(crawl_text)[:6000]
+
+    if mode == "local":
+        local = load_classifier(risk_matrix_path).classify(website_text)
+        return local or {"error": "No risk matrix entry matched the site text."}
+
+    # All categories, or only the best-ranked RISK_CANDIDATES of them.
+    index = load_risk_index(risk_matrix_path)
+    available_categories = "\n".join(index.candidate_lines(website_text, RISK_CANDIDATES))
+
+    memo = default_memo()
+    key = memo_key(
+        "classification", [OPENAI_MODEL, CLAUDE_MODEL], RISK_PROMPT, PROMPT_VERSION,
+        website_text=normalize(website_text),
+        available_categories=available_categories
+    )
+    cached = memo.get(key)
+    if cached is not None:
+        print("⚡ Classification served from LLM memo")
+        return cached
+
+    result = call_risk_models(website_text, available_categories)
+    if result and "error" not in result:
+        memo.set(key, "classification", result)
+    return result
+
+def call_risk_models(website_text, available_categories):
+    prompt = RISK_PROMPT.format(
+        website_text=website_text,
+        available_categories=available_categories
+    )
     try:
         print("🏷️ Classifying via OpenAI...")
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.1,
-            response_format={"type": "json_object"}
-        )
-        return extract_json(response.choices[0].message.content.strip())
-    except Exception as e:
-        print("⚠️ OpenAI failed:", e)
-        try:
-            print("🏷️ Falling back to Claude...")
-            client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-            response = client.messages.create(
-                model="claude-opus-4-20250514",
-                max_tokens=1024,
-                temperature=0.1,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return extract_json(response.content[0].text.strip())
-        except Exception as ce:
-            print("❌ Claude also failed:", ce)
-            return {"error": "All model calls failed for classification."}
+        provider, text = llm.complete([
+            ("openai", lambda: llm.call_openai(prompt, OPENAI_MODEL, temperature=0.1, json_mode=True)),
+            ("claude", lambda: llm.call_claude(prompt, CLAUDE_MODEL, temperature=0.1)),
+        ])
+        return extract_json(text)
+    except llm.AllProvidersFailed as e:
+        print("❌ All models failed:", e)
+        return {"error": "All model calls failed for classification."}
 
 # ---------------------- Main Entry ----------------------
 def analyze_site(url, max_pages=50):
@@ -255,34 +285,20 @@ def analyze_site(url, max_pages=50):
     if is_repeated_url(url):
         return {"success": False, "error": "Too many requests for this URL.", "code": "TOO_MANY_REQUESTS"}
 
-    try:
-        run_crawler(url, max_pages)
-        crawl_id = get_latest_crawl_id()
-        run_scraper(crawl_id)
-
-        crawl_id = get_latest_crawl_id()
-        if not crawl_id:
-            return {"success": False, "error": "No crawl data found in MongoDB.", "code": "NO_CRAWL"}
+    from pipeline import Pipeline, default_sink
 
-        crawl_text = fetch_crawl_text(crawl_id)
-        scrape_json = fetch_scrape_json(crawl_id)
-        total_pages = count_total_pages(crawl_text)
-        total_skus = extract_total_skus(crawl_text)
+    try:
+        result = Pipeline(sink=default_sink()).run(url, max_pages)
 
-        if total_pages == 0:
+        if result["totalPages"] == 0:
             return {"success": False, "error": "No pages crawled. Site may be blocking bots.", "code": "CRAWL_EMPTY"}
 
-        summary = summarize_with_openai_or_claude(crawl_text, scrape_json, total_skus, total_pages)
-        classification = run_risk_analysis(crawl_text)
-
         return {
             "success": True,
-            "analysis": summary,
-            "classification": classification
+            "analysis": result["analysis"],
+            "classification": result["classification"]
         }
 
-    except subprocess.CalledProcessError:
-        return {"success": False, "error": "Crawler failed. Site might be blocking requests.", "code": "FETCH_FAILED"}
     except Exception as e:
         return {"success": False, "error": str(e), "code": "SERVER_ERROR"}
 
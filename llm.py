@@ -0,0 +1,177 @@
+import os
+import time
+import threading
+from collections import deque, defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from openai import OpenAI
+import anthropic
+
+# Per-provider deadline in seconds, and how long to wait on the primary
+# provider before also firing the fallback (0 disables hedging).
+PROVIDER_TIMEOUTS = {
+    "openai": float(os.getenv("OPENAI_TIMEOUT", 60)),
+    "claude": float(os.getenv("CLAUDE_TIMEOUT", 60)),
+}
+HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", 0))
+
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_WORKERS", 8)), thread_name_prefix="llm")
+
+
+class AllProvidersFailed(Exception):
+    pass
+
+
+# ---------------------- Latency Tracking ----------------------
+class LatencyTracker:
+    def __init__(self, window=200):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(lambda: deque(maxlen=window))
+        self.counts = defaultdict(lambda: {"ok": 0, "failed": 0, "hedged": 0, "won": 0})
+
+    def record(self, provider, seconds, ok):
+        with self.lock:
+            self.counts[provider]["ok" if ok else "failed"] += 1
+            if ok:
+                self.latencies[provider].append(seconds)
+
+    def count(self, provider, event):
+        with self.lock:
+            self.counts[provider][event] += 1
+
+    def stats(self):
+        with self.lock:
+            result = {}
+            for provider in set(self.counts) | set(self.latencies):
+                samples = sorted(self.latencies[provider])
+                result[provider] = dict(self.counts[provider])
+                if samples:
+                    result[provider].update(
+                        p50=round(samples[len(samples) // 2], 3),
+                        p95=round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+                        samples=len(samples)
+                    )
+            return result
+
+
+latency = LatencyTracker()
+
+
+# ---------------------- Providers ----------------------
+def call_openai(prompt, model, temperature, json_mode=False):
+    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=PROVIDER_TIMEOUTS["openai"], max_retries=0)
+    kwargs = {"response_format": {"type": "json_object"}} if json_mode else {}
+    response = client.chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=temperature,
+        **kwargs
+    )
+    return response.choices[0].message.content.strip()
+
+
+def call_claude(prompt, model, temperature, max_tokens=1024):
+    client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"), timeout=PROVIDER_TIMEOUTS["claude"], max_retries=0)
+    response = client.messages.create(
+        model=model,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        messages=[{"role": "user", "content": prompt}]
+    )
+    return response.content[0].text.strip()
+
+
+def timed(provider, fn, *args, **kwargs):
+    start = time.time()
+    try:
+        result = fn(*args, **kwargs)
+    except Exception:
+        latency.record(provider, time.time() - start, ok=False)
+        raise
+    latency.record(provider, time.time() - start, ok=True)
+    return result
+
+
+# ---------------------- Execution ----------------------
+# How often complete() looks again at calls still queued for a worker.
+QUEUE_POLL = 0.05
+
+
+def complete(attempts, hedge_after=None):
+    """Run ``attempts`` (a list of (provider, fn) pairs, primary first).
+
+    The fallback starts as soon as the primary fails or misses its deadline,
+    or, with hedging, once the primary has been running for ``hedge_after``
+    seconds; the first successful answer wins. Returns (provider, answer).
+
+    Deadlines and the hedge delay count from when a call starts running on
+    a worker, not from when it was queued: with the pool busy, time spent
+    waiting for a thread is not the provider being slow.
+    """
+    hedge_after = HEDGE_AFTER if hedge_after is None else hedge_after
+    pending = {}
+    errors = []
+    queue = list(attempts)
+
+    def launch():
+        provider, fn = queue.pop(0)
+        started = {}
+
+        def run():
+            started["at"] = time.time()
+            return timed(provider, fn)
+
+        future = _executor.submit(run)
+        pending[future] = (provider, started)
+        return provider
+
+    def deadline(provider, started):
+        return started["at"] + PROVIDER_TIMEOUTS.get(provider, 60) if "at" in started else None
+
+    def abandon(future):
+        # A call still queued is dropped; a running thread can't be killed,
+        # but the SDK timeout ends it and its answer is no longer awaited.
+        pending.pop(future)
+        future.cancel()
+
+    launch()
+    while pending:
+        now = time.time()
+        deadlines = [d for d in (deadline(*entry) for entry in pending.values()) if d is not None]
+        waits = [d - now for d in deadlines]
+        if len(deadlines) < len(pending):
+            waits.append(QUEUE_POLL)
+        primary_started = next(iter(pending.values()))[1].get("at")
+        hedging = hedge_after > 0 and queue and len(pending) == 1 and primary_started is not None
+        if hedging:
+            waits.append(primary_started + hedge_after - now)
+        done, _ = wait(list(pending), timeout=max(0, min(waits)), return_when=FIRST_COMPLETED)
+
+        for future in done:
+            provider, _ = pending.pop(future)
+            try:
+                answer = future.result()
+            except Exception as e:
+                print(f"⚠️ {provider} failed:", e)
+                errors.append(f"{provider}: {e}")
+                continue
+            latency.count(provider, "won")
+            for other in list(pending):
+                abandon(other)
+            return provider, answer
+
+        now = time.time()
+        for future, (provider, started) in list(pending.items()):
+            limit = deadline(provider, started)
+            if limit is not None and limit <= now:
+                abandon(future)
+                print(f"⚠️ {provider} missed its {PROVIDER_TIMEOUTS.get(provider, 60)}s deadline")
+                errors.append(f"{provider}: timed out")
+
+        hedge_due = hedging and not done and now >= primary_started + hedge_after
+        if queue and (not pending or hedge_due):
+            if pending:
+                latency.count(queue[0][0], "hedged")
+            print(f"🤖 Starting {launch()}...")
+
+    raise AllProvidersFailed("; ".join(errors))
@@ -0,0 +1,94 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+
+def memo_key(task, models, template, prompt_version, **inputs):
+    # Everything that determines the model's answer goes into the key, including
+    # the prompt template itself, so editing a template invalidates old entries.
+    payload = json.dumps({
+        "task": task,
+        "models": list(models),
+        "promptVersion": prompt_version,
+        "template": hashlib.sha256(template.encode("utf-8")).hexdigest(),
+        "inputs": inputs,
+    }, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PromptMemo:
+    """Persistent, size-bounded memo of LLM responses keyed by memo_key().
+
+    Least recently used entries are evicted once ``max_entries`` is exceeded.
+    """
+
+    def __init__(self, path, max_entries=5000):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS memo ("
+            "key TEXT PRIMARY KEY, task TEXT, response TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS memo_last_used ON memo (last_used)")
+        self.conn.commit()
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT response FROM memo WHERE key = ?", (key,)).fetchone()
+            if not row:
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE memo SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(self, key, task, response):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO memo (key, task, response, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, task, json.dumps(response, ensure_ascii=False), now, now)
+            )
+            count = self.conn.execute("SELECT COUNT(*) FROM memo").fetchone()[0]
+            if count > self.max_entries:
+                self.conn.execute(
+                    "DELETE FROM memo WHERE key IN (SELECT key FROM memo ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+                self.evictions += count - self.max_entries
+            self.conn.commit()
+
+    def stats(self):
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM memo").fetchone()[0]
+            return {
+                "entries": entries,
+                "maxEntries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+_default_memo = None
+_default_memo_lock = threading.Lock()
+
+
+def default_memo():
+    global _default_memo
+    with _default_memo_lock:
+        if _default_memo is None:
+            _default_memo = PromptMemo(
+                os.getenv("LLM_MEMO_PATH", "llm_memo.sqlite3"),
+                max_entries=int(os.getenv("LLM_MEMO_MAX_ENTRIES", 5000))
+            )
+        return _default_memo
@@ -0,0 +1,170 @@
+import sys
+import json
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+
+from risk_index import tokenize, normalize, classification_result
+
+# Words merchants actually use on their sites, for common MCCs whose
+# risk-matrix names are too formal to match on their own.
+KEYWORD_HINTS = {
+    822: "seed seeds sowing germination hybrid vegetable seeds",
+    820: "fertilizer fertiliser manure compost npk urea soil nutrient",
+    821: "pesticide insecticide herbicide fungicide weedkiller crop protection",
+    823: "tractor harvester plough irrigation sprayer farm equipment",
+    742: "vet veterinary pet clinic animal hospital vaccination",
+    780: "landscaping lawn care gardening horticulture tree trimming",
+    5261: "garden nursery plants planters pots gardening tools",
+    5411: "grocery groceries supermarket fresh produce vegetables fruits",
+    5462: "bakery cakes bread pastries cookies baked",
+    5441: "chocolate candy sweets confectionery nuts",
+    5812: "restaurant menu dine dining reservation table booking cuisine",
+    5814: "burger pizza fast food takeaway delivery fries",
+    5811: "catering caterer events banquet buffet",
+    5813: "bar pub nightclub cocktails brewery taproom",
+    5921: "liquor wine beer spirits whisky vodka",
+    5992: "florist flowers bouquet roses flower delivery",
+    5995: "pet food dog cat aquarium pet supplies",
+    5691: "clothing apparel fashion shirts dresses jeans tops",
+    5661: "shoes sneakers footwear boots sandals heels",
+    5944: "jewellery jewelry rings necklaces earrings diamond gold silver",
+    5977: "cosmetics makeup skincare lipstick beauty products serum",
+    7230: "salon haircut barber hair styling beauty parlour",
+    7298: "spa massage wellness facial body treatment",
+    5912: "pharmacy medicines prescription chemist drugstore",
+    8021: "dentist dental teeth orthodontist braces implants",
+    8011: "doctor physician clinic consultation medical",
+    8062: "hospital emergency inpatient surgery multispeciality",
+    8220: "university college admissions campus degree",
+    8299: "courses online classes tutoring coaching learning academy",
+    8111: "lawyer attorney legal advocate law firm litigation",
+    8931: "accounting bookkeeping audit chartered accountant",
+    7372: "software development saas web development app development it services",
+    5734: "software licence license download antivirus",
+    5817: "app subscription mobile application download",
+    5816: "game games gaming in-game",
+    5732: "electronics smartphones laptops televisions gadgets headphones",
+    5045: "computers laptops desktops peripherals monitors keyboards",
+    5712: "furniture sofa beds tables chairs wardrobe mattress",
+    5942: "books bookstore novels paperback hardcover",
+    5945: "toys games kids puzzles lego dolls",
+    5941: "sports equipment fitness gym cricket football",
+    5311: "department store",
+    5262: "marketplace sellers vendors multi-vendor",
+    7011: "hotel rooms resort stay booking check-in suites",
+    4722: "travel tours holidays packages itinerary tour operator",
+    4511: "flights airline airfare tickets",
+    4121: "taxi cab ride chauffeur limousine",
+    4215: "courier parcel shipping logistics freight delivery",
+    7995: "betting casino poker slots wager jackpot",
+    7801: "online casino gambling roulette blackjack",
+    7273: "dating singles matchmaking",
+    6211: "stocks trading brokerage demat securities",
+    6012: "bank loans credit banking",
+    6300: "insurance policy premium coverage claim",
+    6513: "real estate property rent apartments leasing",
+    7311: "advertising marketing agency seo campaigns",
+    7392: "consulting management consultancy strategy",
+    7361: "recruitment staffing jobs hiring placement",
+    8398: "charity donate donation ngo nonprofit",
+    8661: "church temple mosque worship religious",
+    4814: "mobile recharge telecom calls broadband",
+    4899: "cable tv dth channels streaming television",
+    5511: "car dealer cars vehicles test drive",
+    5571: "motorcycle bikes scooters",
+    5533: "auto parts car accessories spare parts",
+    7538: "car service garage mechanic servicing",
+    1520: "construction builder contractor renovation",
+    7349: "cleaning janitorial housekeeping",
+}
+
+SUBCATEGORY_WEIGHT = 2.0
+HINT_WEIGHT = 1.0
+CATEGORY_WEIGHT = 0.5
+
+
+class MCCClassifier:
+    """Offline TF-IDF classifier over risk_matrix.json entries.
+
+    Every entry becomes a weighted bag of words (sub-category, category and
+    KEYWORD_HINTS); site text is scored against all entries with one
+    matrix-vector product.
+    """
+
+    def __init__(self, entries, hints=KEYWORD_HINTS):
+        self.entries = entries
+        docs = []
+        for entry in entries:
+            terms = Counter()
+            for t in tokenize(entry['Sub_Category']):
+                terms[t] += SUBCATEGORY_WEIGHT
+            for t in tokenize(hints.get(entry['MCC_Code'], '')):
+                terms[t] += HINT_WEIGHT
+            for t in tokenize(entry['Category']):
+                terms[t] += CATEGORY_WEIGHT
+            docs.append(terms)
+
+        self.vocab = {t: i for i, t in enumerate(sorted({t for d in docs for t in d}))}
+        self.terms = np.array(sorted(self.vocab, key=self.vocab.get))
+        tf = np.zeros((len(entries), len(self.vocab)), dtype=np.float32)
+        for row, terms in enumerate(docs):
+            for t, weight in terms.items():
+                tf[row, self.vocab[t]] = weight
+
+        df = (tf > 0).sum(axis=0)
+        self.idf = np.log((1 + len(entries)) / (1 + df)).astype(np.float32) + 1.0
+        weights = np.log1p(tf) * self.idf
+        norms = np.linalg.norm(weights, axis=1, keepdims=True)
+        self.weights = weights / np.where(norms == 0, 1, norms)
+
+    def vectorize(self, text):
+        q = np.zeros(len(self.vocab), dtype=np.float32)
+        for t, n in Counter(tokenize(text)).items():
+            i = self.vocab.get(t)
+            if i is not None:
+                q[i] = n
+        q = np.log1p(q) * self.idf
+        norm = np.linalg.norm(q)
+        return q / norm if norm else q
+
+    def scores(self, text):
+        return self.weights @ self.vectorize(text)
+
+    def classify(self, text, top_indicators=8):
+        q = self.vectorize(text)
+        scores = self.weights @ q
+        if not scores.any():
+            return None
+        second, best = np.argsort(scores)[-2:]
+        s1, s2 = float(scores[best]), float(scores[second])
+        # Share of the top-two similarity mass held by the winner, 0.5..1.
+        confidence = round(s1 / (s1 + s2), 2) if s1 + s2 else 0.0
+
+        contributions = self.weights[best] * q
+        top = np.argsort(contributions)[::-1][:top_indicators]
+        indicators = [str(self.terms[i]) for i in top if contributions[i] > 0]
+
+        entry = self.entries[int(best)]
+        return classification_result(
+            entry,
+            confidence=confidence,
+            indicators=indicators,
+            reasoning=f"Offline keyword classifier matched {normalize(entry['Sub_Category'])} "
+                      f"on: {', '.join(indicators)}.",
+            decision_process=f"Scored the site text against all {len(self.entries)} risk matrix entries "
+                             f"(TF-IDF cosine); best {s1:.3f} vs runner-up {s2:.3f}."
+        ) | {"similarity": round(s1, 3)}
+
+
+@lru_cache(maxsize=None)
+def load_classifier(path="risk_matrix.json"):
+    with open(path, "r", encoding="utf-8") as f:
+        return MCCClassifier(json.load(f))
+
+
+if __name__ == "__main__":
+    # Standalone mode: classify text from a file argument or stdin, no network.
+    text = open(sys.argv[1], encoding="utf-8").read() if len(sys.argv) > 1 else sys.stdin.read()
+    print(json.dumps(load_classifier().classify(text), indent=2, ensure_ascii=False))
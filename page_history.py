@@ -0,0 +1,197 @@
+import os
+import re
+import zlib
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from pymongo import ReplaceOne
+
+from urlnorm import canonicalize_url, url_fingerprint
+
+HISTORY_MAX_SITES = int(os.getenv("HISTORY_MAX_SITES", 64))
+
+# Markup that changes on every fetch (CSRF tokens, nonces, inline scripts
+# with timestamps, rotating ad slots) but that the crawler's and scraper's
+# extraction never looks at: scripts, styles and noscript are dropped
+# before the page text is taken, and only the description and keywords
+# meta tags are read. Attributes are only stripped where the rest of the
+# tag follows, so the same words in the page text still count. Each
+# pattern starts with a literal and matches case-sensitively, so the regex
+# engine can skip ahead to candidates; markup it misses only makes the
+# hash less stable.
+ATTR_VALUE = r'\s*=\s*(?:"[^"]*"|\'[^\']*\'|[^\s<>]+)(?=[^<>]*>)'
+VOLATILE_PATTERNS = [re.compile(pattern, re.DOTALL) for pattern in (
+    r'<script\b.*?</script\s*>',
+    r'<style\b.*?</style\s*>',
+    r'<noscript\b.*?</noscript\s*>',
+    r'<!--.*?-->',
+    r'<meta\b(?![^>]*\bname\s*=\s*["\']?(?:description|keywords)\b)[^>]*>',
+    r'nonce' + ATTR_VALUE,
+    r'value' + ATTR_VALUE,
+    r'integrity' + ATTR_VALUE,
+    r'data-[\w-]*(?:token|csrf|nonce|timestamp)[\w-]*' + ATTR_VALUE,
+)]
+
+
+def content_hash(html):
+    """Hash of a page's HTML with the markup that changes on every fetch
+    taken out: pages that hash the same extract the same."""
+    for pattern in VOLATILE_PATTERNS:
+        html = pattern.sub('', html)
+    return hashlib.sha1(html.encode('utf-8')).hexdigest()
+
+
+def site_digest(hashes):
+    """One hash for a crawl: which pages it found and what each one's HTML
+    was, volatile markup aside (url -> content_hash)."""
+    h = hashlib.sha1()
+    for url in sorted(hashes):
+        h.update(f"{url}\0{hashes[url]}\n".encode('utf-8'))
+    return h.hexdigest()
+
+
+class SiteHistory:
+    """What earlier crawls of one site saw at each URL.
+
+    Per page: the ETag / Last-Modified validators, a hash of the HTML, the
+    HTML itself (zlib-compressed, so a 304 can still feed the scraper) and
+    the crawler's extraction of it. Per site: the digest of the last crawl
+    and the downstream results computed from it.
+    """
+
+    def __init__(self, site, pages=None, digest=None, results=None):
+        self.site = site
+        self.pages = pages or {}  # url fingerprint -> record
+        self.digest = digest
+        self.results = results
+        self.changed = set()
+
+    def get(self, url):
+        return self.pages.get(url_fingerprint(url))
+
+    def conditional_headers(self, url):
+        record = self.get(url)
+        headers = {}
+        if record and record.get("etag"):
+            headers["If-None-Match"] = record["etag"]
+        if record and record.get("last_modified"):
+            headers["If-Modified-Since"] = record["last_modified"]
+        return headers
+
+    def page(self, url):
+        """(html, final_url) stored for ``url``, or None."""
+        record = self.get(url)
+        if not record:
+            return None
+        return zlib.decompress(record["html"]).decode('utf-8'), record["final_url"]
+
+    def extraction(self, url, html_hash):
+        """The stored extraction if the page still hashes the same, else None."""
+        record = self.get(url)
+        if not record or record["hash"] != html_hash:
+            return None
+        e = record["extracted"]
+        return e["page"], e["canonical"], e["internal"], e["key_pages"]
+
+    def record(self, url, final_url, html, validators, extracted):
+        page, canonical, internal, key_pages = extracted
+        key = url_fingerprint(url)
+        self.pages[key] = {
+            "url": url,
+            "final_url": final_url,
+            "etag": validators.get("etag"),
+            "last_modified": validators.get("last_modified"),
+            "hash": validators["hash"],
+            "html": zlib.compress(html.encode('utf-8')),
+            "extracted": {"page": page, "canonical": canonical, "internal": internal, "key_pages": key_pages},
+            "crawled_at": time.time()
+        }
+        self.changed.add(key)
+
+    def results_for(self, digest):
+        """Downstream results of the last run, if its crawl had this digest."""
+        if digest and digest == self.digest and self.results:
+            return self.results
+        return {}
+
+    def remember(self, digest, results):
+        # Failed stages ({"error": ...}) are left out, as in the result cache.
+        self.digest = digest
+        self.results = {
+            stage: value for stage, value in results.items()
+            if value is not None and not (isinstance(value, dict) and "error" in value)
+        }
+        self.changed.add(None)
+
+
+class PageHistory:
+    """SiteHistory per site, kept in memory for the most recent
+    ``max_sites`` sites and, given a MongoDB database, in its
+    ``page_history`` and ``site_history`` collections.
+    """
+
+    def __init__(self, db=None, max_sites=HISTORY_MAX_SITES):
+        self.db = db
+        self.max_sites = max_sites
+        self.lock = threading.Lock()
+        self.sites = OrderedDict()
+
+    @staticmethod
+    def site_key(url):
+        if not url.startswith("http"):
+            url = "https://" + url
+        return canonicalize_url(url)
+
+    def site(self, url):
+        site = self.site_key(url)
+        with self.lock:
+            history = self.sites.get(site)
+            if history is None:
+                history = self.load(site)
+                self.sites[site] = history
+            self.sites.move_to_end(site)
+            while len(self.sites) > self.max_sites:
+                self.sites.popitem(last=False)
+            return history
+
+    def load(self, site):
+        if self.db is None:
+            return SiteHistory(site)
+        pages = {
+            url_fingerprint(doc["url"]): dict(doc, html=bytes(doc["html"]))
+            for doc in self.db["page_history"].find({"site": site}, {"_id": 0, "site": 0})
+        }
+        doc = self.db["site_history"].find_one({"_id": site}) or {}
+        return SiteHistory(site, pages, doc.get("digest"), doc.get("results"))
+
+    def save(self, history):
+        """Write what changed since the last save."""
+        changed, history.changed = history.changed, set()
+        if self.db is None or not changed:
+            return
+        ops = [
+            ReplaceOne({"site": history.site, "url": record["url"]}, dict(record, site=history.site), upsert=True)
+            for record in (history.pages[key] for key in changed if key is not None)
+        ]
+        if ops:
+            self.db["page_history"].bulk_write(ops, ordered=False)
+        if None in changed:
+            self.db["site_history"].replace_one(
+                {"_id": history.site},
+                {"_id": history.site, "digest": history.digest, "results": history.results},
+                upsert=True
+            )
+
+
+_default_history = None
+_default_history_lock = threading.Lock()
+
+
+def default_history():
+    global _default_history
+    with _default_history_lock:
+        if _default_history is None:
+            _default_history = PageHistory()
+        return _default_history
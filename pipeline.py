@@ -0,0 +1,220 @@
+import asyncio
+import aiohttp
+from functools import partial
+from db import MONGO_URI, default_repository
+from result_cache import cache_key
+
+from crawl import SiteCrawler, DEFAULT_HEADERS
+from scrape import scrape_all_async
+from fetch_profiles import default_profiles
+from politeness import Politeness
+from page_history import PageHistory, default_history
+from light import (
+    format_crawl_text,
+    extract_total_skus,
+    count_total_pages,
+    summarize_with_openai_or_claude,
+    run_risk_analysis
+)
+
+
+# ---------------------- Persistence Sink ----------------------
+# A sink is a db.Repository: page records are written while the crawl and
+# scrape run, save_crawl / save_scrape store what is left once a stage is
+# done.
+def default_sink():
+    # Persist only when a database is configured.
+    return default_repository() if MONGO_URI else None
+
+
+# ---------------------- Pipeline ----------------------
+class Pipeline:
+    """Crawl -> scrape -> summarize -> classify in a single process.
+
+    All stages share one event loop and one HTTP session; results are passed
+    along in memory and only written out if a sink is given. With a
+    ResultCache, each stage is skipped while its cached result is fresh.
+    """
+
+    def __init__(self, sink=None, concurrency=5, scrape_workers=10, progress=None, cache=None, refresh=False,
+                 parse_executor=None, profiles=None, history=None, session=None, politeness=None,
+                 io_executor=None):
+        self.sink = sink
+        self.progress = progress
+        self.cache = cache
+        self.refresh = refresh
+        self.concurrency = concurrency
+        self.scrape_workers = scrape_workers
+        # Shared across runs; None extracts crawled pages on the event loop.
+        self.parse_executor = parse_executor
+        # What the crawl learns about blocked headers carries over to the scrape.
+        self.profiles = profiles or default_profiles()
+        # Validators, hashes and extractions from earlier crawls of each site,
+        # kept next to the results when there is a database.
+        if history is None:
+            history = PageHistory(sink.db) if sink else default_history()
+        self.history = history
+        # A batch runs many pipelines on one HTTP pool and one set of per-host
+        # limits; on its own, a run opens its own session.
+        self.shared_session = session
+        self.shared_politeness = politeness
+        # Database, cache and history calls block; a batch runs them here so
+        # they don't stall the other sites on its loop.
+        self.io_executor = io_executor
+        self.session = None
+        self.politeness = None
+        self.previous = {}
+
+    def report(self, stage, status):
+        if self.progress:
+            self.progress(stage, status)
+
+    async def blocking(self, fn, *args, **kwargs):
+        if self.io_executor is None:
+            return fn(*args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self.io_executor, partial(fn, *args, **kwargs))
+
+    async def cached(self, stage, key):
+        # refresh=True skips lookups but still writes fresh results back.
+        if self.refresh:
+            return None
+        value = await self.blocking(self.cache.get, stage, key) if self.cache else None
+        if value is None and stage in self.previous:
+            # Past its TTL, a result still holds if the site hasn't changed
+            # since; it goes back in the cache for another TTL.
+            value = self.previous[stage]
+            await self.store(stage, key, value)
+        return value
+
+    async def store(self, stage, key, value):
+        if self.cache:
+            await self.blocking(self.cache.set, stage, key, value)
+
+    async def page_writer(self, stage, crawl_id):
+        if not self.sink or crawl_id is None:
+            return None
+        new_writer = self.sink.crawl_writer if stage == "crawl" else self.sink.scrape_writer
+        return await self.blocking(new_writer, crawl_id, self.io_executor)
+
+    async def crawl(self, url, max_pages, crawl_id=None):
+        writer = await self.page_writer("crawl", crawl_id)
+        # Loaded here so the crawler finds the site's history in memory.
+        await self.blocking(self.history.site, url)
+        crawler = SiteCrawler(url, max_pages=max_pages, concurrency=self.concurrency,
+                              parse_executor=self.parse_executor, profiles=self.profiles,
+                              politeness=self.politeness, history=self.history, page_sink=writer)
+        crawl_result = await crawler.async_crawl(session=self.session)
+        if writer:
+            await self.blocking(writer.close)
+        return crawl_result, crawler.content_store
+
+    async def scrape(self, crawl_result, content_store, crawl_id=None):
+        urls = [p["url"] for p in crawl_result["pages"]]
+        writer = await self.page_writer("scrape", crawl_id)
+        results = await scrape_all_async(urls, self.session, content_store, max_concurrency=self.scrape_workers,
+                                         profiles=self.profiles, politeness=self.politeness, page_sink=writer)
+        if writer:
+            await self.blocking(writer.close)
+        return results
+
+    async def summarize(self, crawl_text, scrape_results):
+        total_skus = extract_total_skus(crawl_text)
+        total_pages = count_total_pages(crawl_text)
+        print("🧠 Summarizing with OpenAI/Claude...")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, summarize_with_openai_or_claude, crawl_text, scrape_results, total_skus, total_pages
+        )
+
+    async def classify(self, crawl_text):
+        print("🏷️ Running risk classification...")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, run_risk_analysis, crawl_text)
+
+    async def run_async(self, url, max_pages=20, crawl_id=None):
+        if self.shared_session is not None:
+            self.session = self.shared_session
+            return await self.run_stages(url, max_pages, crawl_id)
+        async with aiohttp.ClientSession(headers=DEFAULT_HEADERS) as self.session:
+            return await self.run_stages(url, max_pages, crawl_id)
+
+    async def run_stages(self, url, max_pages, crawl_id):
+        key = cache_key(url, max_pages)
+        # Per-host pacing carries over from the crawl to the scrape, which
+        # hits the same site right after.
+        self.politeness = self.shared_politeness or Politeness(max_concurrency=self.concurrency)
+        self.previous = {}
+        self.report("crawl", "running")
+        crawl_result = await self.cached("crawl", key)
+        content_store = None
+        if crawl_result is None:
+            # The crawl ID is fixed before any work starts and carried through
+            # every stage, so concurrent runs never pick up each other's data.
+            if crawl_id is None and self.sink:
+                crawl_id = await self.blocking(self.sink.new_crawl_id)
+            print(f"🔍 Crawling: {url} (crawl ID {crawl_id})")
+            crawl_result, content_store = await self.crawl(url, max_pages, crawl_id)
+            site = await self.blocking(self.history.site, crawl_result["baseUrl"])
+            await self.blocking(self.history.save, site)
+            # Same pages with the same HTML as last run: the scrape and LLM
+            # stages would only reproduce what they returned then.
+            self.previous = site.results_for(crawl_result.get("contentDigest"))
+            if self.previous:
+                print("♻️ Site unchanged since the last run, reusing its results")
+            if crawl_result["totalPages"] > 0:
+                await self.store("crawl", key, crawl_result)
+                if self.sink:
+                    await self.blocking(self.sink.save_crawl, crawl_id, crawl_result, content_store,
+                                        pages_written=True)
+        self.report("crawl", "done")
+
+        result = {
+            "crawlId": crawl_id,
+            "totalPages": crawl_result["totalPages"],
+            "crawl": crawl_result,
+            "scrape": [],
+            "analysis": None,
+            "classification": None
+        }
+        if crawl_result["totalPages"] == 0:
+            return result
+
+        self.report("scrape", "running")
+        result["scrape"] = await self.cached("scrape", key)
+        if result["scrape"] is None:
+            print("🧹 Scraping crawled pages...")
+            result["scrape"] = await self.scrape(crawl_result, content_store, crawl_id)
+            await self.store("scrape", key, result["scrape"])
+        elif content_store is not None and self.sink and crawl_id is not None:
+            # A new crawl reusing an earlier scrape still gets it saved.
+            await self.blocking(self.sink.save_scrape, crawl_id, result["scrape"])
+        self.report("scrape", "done")
+
+        # Summary and classification are independent: run them side by side.
+        crawl_text = format_crawl_text(crawl_result["pages"])
+        result["analysis"], result["classification"] = await asyncio.gather(
+            self.cached_stage("summarize", "summary", key, self.summarize(crawl_text, result["scrape"])),
+            self.cached_stage("classify", "classification", key, self.classify(crawl_text))
+        )
+        # Only a crawl made in this run says what the site looks like now.
+        if content_store is not None:
+            latest = {"scrape": result["scrape"], "summary": result["analysis"],
+                      "classification": result["classification"]}
+            if latest != self.previous:
+                site.remember(crawl_result.get("contentDigest"), latest)
+                await self.blocking(self.history.save, site)
+        return result
+
+    async def cached_stage(self, stage, cache_stage, key, coro):
+        self.report(stage, "running")
+        value = await self.cached(cache_stage, key)
+        if value is None:
+            value = await coro
+            await self.store(cache_stage, key, value)
+        else:
+            coro.close()
+        self.report(stage, "done")
+        return value
+
+    def run(self, url, max_pages=20, crawl_id=None):
+        return asyncio.run(self.run_async(url, max_pages, crawl_id))
@@ -0,0 +1,309 @@
+import os
+import time
+import random
+import asyncio
+import threading
+import contextlib
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import aiohttp
+
+RESPECT_ROBOTS = os.getenv("RESPECT_ROBOTS", "1") != "0"
+ROBOTS_USER_AGENT = os.getenv("ROBOTS_USER_AGENT", "*")
+ROBOTS_TTL = float(os.getenv("ROBOTS_TTL", 24 * 3600))
+# robots.txt that could not be fetched is retried sooner.
+ROBOTS_ERROR_TTL = 600
+ROBOTS_MAX_BYTES = 512 * 1024
+
+MAX_RETRIES = int(os.getenv("FETCH_MAX_RETRIES", 3))
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+# A Retry-After longer than this is not waited out; the response is returned.
+MAX_RETRY_AFTER = 60.0
+TRANSIENT_STATUSES = {429, 500, 502, 503, 504}
+THROTTLE_STATUSES = {429, 503}
+TRANSIENT_ERRORS = (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError)
+# A response this many times slower than the host's running average counts
+# as a sign of overload, unless it still came back within SLOW_MIN seconds.
+SLOW_FACTOR = 3.0
+SLOW_MIN = 1.0
+
+
+class RobotsDisallowed(Exception):
+    """robots.txt does not allow fetching this URL."""
+
+
+def origin(url):
+    parts = urlparse(url)
+    return f"{parts.scheme}://{parts.netloc.lower()}"
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_crawl_delay(lines, user_agent):
+    """Crawl-delay for ``user_agent`` in robots.txt ``lines``.
+
+    RobotFileParser only understands whole seconds, and fractional delays
+    are common, so the groups are read here. A group naming the agent wins
+    over the ``*`` group.
+    """
+    agent = user_agent.split("/")[0].lower()
+    delays = {}
+    group, in_rules = [], False
+    for line in lines:
+        field, _, value = line.split("#", 1)[0].partition(":")
+        field, value = field.strip().lower(), value.strip()
+        if field == "user-agent":
+            if in_rules:
+                group, in_rules = [], False
+            group.append(value.lower())
+        elif field:
+            in_rules = True
+            if field == "crawl-delay":
+                try:
+                    delay = float(value)
+                except ValueError:
+                    continue
+                for name in group:
+                    delays.setdefault(name, delay)
+    for name, delay in delays.items():
+        if name != "*" and agent != "*" and name in agent:
+            return delay
+    return delays.get("*", 0.0)
+
+
+def backoff_delay(attempt):
+    # Exponential, with jitter so retries from many workers don't line up.
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+# ---------------------- robots.txt ----------------------
+class RobotsCache:
+    """Parsed robots.txt per origin, kept for ``ttl`` seconds.
+
+    Shared across runs and threads; each lookup that misses fetches the file
+    on the caller's session.
+    """
+
+    def __init__(self, ttl=ROBOTS_TTL, user_agent=ROBOTS_USER_AGENT):
+        self.ttl = ttl
+        self.user_agent = user_agent
+        self.lock = threading.Lock()
+        self.entries = {}  # origin -> (RobotFileParser, crawl delay, expires)
+
+    def cached(self, url):
+        with self.lock:
+            entry = self.entries.get(origin(url))
+        if entry and entry[2] > time.time():
+            return entry[:2]
+        return None
+
+    async def get(self, session, url):
+        """(RobotFileParser, crawl delay) for the site ``url`` is on."""
+        entry = self.cached(url)
+        if entry is None:
+            parser, delay, ttl = await self.fetch(session, origin(url))
+            entry = parser, delay
+            with self.lock:
+                self.entries[origin(url)] = (parser, delay, time.time() + ttl)
+        return entry
+
+    async def fetch(self, session, site):
+        parser = RobotFileParser(site + "/robots.txt")
+        try:
+            async with session.get(site + "/robots.txt", timeout=aiohttp.ClientTimeout(total=10)) as res:
+                if res.status == 200:
+                    body = bytearray()
+                    async for chunk in res.content.iter_chunked(64 * 1024):
+                        body += chunk
+                        if len(body) >= ROBOTS_MAX_BYTES:
+                            # Rules past the cap are ignored, and so is the
+                            # line it cuts through.
+                            del body[body.rfind(b"\n", 0, ROBOTS_MAX_BYTES) + 1:]
+                            break
+                    lines = body.decode("utf-8", "replace").splitlines()
+                    parser.parse(lines)
+                    return parser, parse_crawl_delay(lines, self.user_agent), self.ttl
+                # No robots.txt (or not ours to read): everything is allowed.
+                parser.allow_all = True
+                return parser, 0.0, self.ttl if res.status < 500 else ROBOTS_ERROR_TTL
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            parser.allow_all = True
+            return parser, 0.0, ROBOTS_ERROR_TTL
+
+    async def allowed(self, session, url):
+        parser, _ = await self.get(session, url)
+        return parser.can_fetch(self.user_agent, url)
+
+    async def crawl_delay(self, session, url):
+        _, delay = await self.get(session, url)
+        return delay
+
+
+_default_robots = None
+_default_robots_lock = threading.Lock()
+
+
+def default_robots():
+    global _default_robots
+    with _default_robots_lock:
+        if _default_robots is None:
+            _default_robots = RobotsCache()
+        return _default_robots
+
+
+# ---------------------- Per-host Rate Control ----------------------
+class HostState:
+    """Request slots for one host.
+
+    The number of simultaneous requests follows AIMD: +1/limit per healthy
+    response, halved on throttling, errors or a latency spike. Request
+    starts are spaced by the host's Crawl-delay and held back while a
+    Retry-After is in effect.
+    """
+
+    def __init__(self, limit, max_limit, min_interval=0.0):
+        self.max_limit = max_limit
+        self.limit = float(min(limit, max_limit))
+        self.min_interval = min_interval
+        self.active = 0
+        self.next_start = 0.0
+        self.avg_latency = None
+        self.changed = asyncio.Condition()
+
+    def ready_in(self):
+        # Seconds until a request may start, or None while all slots are busy.
+        if self.active >= int(self.limit):
+            return None
+        return max(0.0, self.next_start - time.monotonic())
+
+    async def acquire(self):
+        async with self.changed:
+            while True:
+                wait = self.ready_in()
+                if wait == 0:
+                    self.active += 1
+                    self.next_start = time.monotonic() + self.min_interval
+                    return
+                try:
+                    await asyncio.wait_for(self.changed.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def release(self):
+        # Freed before taking the lock, so a cancelled release still frees it.
+        self.active -= 1
+        async with self.changed:
+            self.changed.notify_all()
+
+    def pause(self, seconds):
+        self.next_start = max(self.next_start, time.monotonic() + seconds)
+
+    def record(self, latency, ok):
+        slow = self.avg_latency is not None and latency > max(SLOW_MIN, SLOW_FACTOR * self.avg_latency)
+        if ok and not slow:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        else:
+            self.limit = max(1.0, self.limit / 2)
+        if ok:
+            self.avg_latency = latency if self.avg_latency is None else 0.8 * self.avg_latency + 0.2 * latency
+
+
+class Politeness:
+    """Per-host scheduling for every request a crawl or scrape makes.
+
+    get() checks robots.txt, waits for a slot on the host, and retries
+    transient failures (connection errors, timeouts, 429/5xx) with jittered
+    exponential backoff, or after Retry-After when the server gives one.
+    Host state lives on the event loop of one run; the robots.txt cache is
+    shared.
+    """
+
+    def __init__(self, max_concurrency=8, initial_concurrency=None, robots=None,
+                 respect_robots=RESPECT_ROBOTS, retries=MAX_RETRIES):
+        self.max_concurrency = max_concurrency
+        self.initial_concurrency = initial_concurrency or max_concurrency
+        self.robots = robots or default_robots()
+        self.respect_robots = respect_robots
+        self.retries = retries
+        self.hosts = {}
+        self.host_locks = {}
+        self.stats = {"requests": 0, "retries": 0, "throttled": 0, "disallowed": 0}
+
+    async def host(self, session, url):
+        site = origin(url)
+        if site not in self.hosts:
+            lock = self.host_locks.setdefault(site, asyncio.Lock())
+            async with lock:
+                if site not in self.hosts:
+                    delay = await self.robots.crawl_delay(session, url) if self.respect_robots else 0.0
+                    self.hosts[site] = HostState(self.initial_concurrency, self.max_concurrency, delay)
+        return self.hosts[site]
+
+    @contextlib.asynccontextmanager
+    async def get(self, session, url, **kwargs):
+        if self.respect_robots and not await self.robots.allowed(session, url):
+            self.stats["disallowed"] += 1
+            raise RobotsDisallowed("disallowed by robots.txt")
+        host = await self.host(session, url)
+
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            await host.acquire()
+            start = time.monotonic()
+            self.stats["requests"] += 1
+            try:
+                res = await session.get(url, **kwargs)
+            except TRANSIENT_ERRORS:
+                host.record(time.monotonic() - start, ok=False)
+                await host.release()
+                if last:
+                    raise
+                self.stats["retries"] += 1
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+            except BaseException:
+                # Redirect loops, invalid URLs, cancellation: not retried,
+                # but the slot must be given back or the host stalls.
+                host.record(time.monotonic() - start, ok=False)
+                await host.release()
+                raise
+            latency = time.monotonic() - start
+
+            retry_after = parse_retry_after(res.headers.get("Retry-After"))
+            # A Retry-After longer than we are willing to wait ends the
+            # retries: the caller gets this response and its status.
+            if (res.status in TRANSIENT_STATUSES and not last
+                    and (retry_after is None or retry_after <= MAX_RETRY_AFTER)):
+                if res.status in THROTTLE_STATUSES:
+                    self.stats["throttled"] += 1
+                res.release()
+                host.record(latency, ok=False)
+                if retry_after is not None:
+                    host.pause(retry_after)
+                await host.release()
+                self.stats["retries"] += 1
+                await asyncio.sleep(backoff_delay(attempt) if retry_after is None else retry_after)
+                continue
+
+            try:
+                yield res
+            finally:
+                res.release()
+                host.record(latency, ok=res.status not in TRANSIENT_STATUSES)
+                await host.release()
+            return
@@ -0,0 +1,160 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict, defaultdict
+
+from urlnorm import canonicalize_url
+
+STAGES = ["crawl", "scrape", "summary", "classification"]
+
+# Seconds each stage's result stays fresh; override with RESULT_CACHE_TTL_<STAGE>.
+DEFAULT_TTLS = {
+    "crawl": 6 * 3600,
+    "scrape": 6 * 3600,
+    "summary": 24 * 3600,
+    "classification": 7 * 24 * 3600,
+}
+
+
+def cache_key(url, max_pages):
+    return f"{canonicalize_url(url)}|{max_pages}"
+
+
+class LRUCache:
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, expires_at):
+        self.entries[key] = (expires_at, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def delete(self, key):
+        self.entries.pop(key, None)
+
+
+class SQLiteCache:
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def get(self, key):
+        row = self.conn.execute("SELECT value, expires_at FROM results WHERE key = ?", (key,)).fetchone()
+        if not row:
+            return None, None
+        value, expires_at = row
+        if expires_at < time.time():
+            self.delete(key)
+            return None, None
+        return json.loads(value), expires_at
+
+    def set(self, key, value, expires_at):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO results (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), expires_at)
+        )
+        self.conn.commit()
+
+    def delete(self, key):
+        self.conn.execute("DELETE FROM results WHERE key = ?", (key,))
+        self.conn.commit()
+
+    def purge_expired(self):
+        self.conn.execute("DELETE FROM results WHERE expires_at < ?", (time.time(),))
+        self.conn.commit()
+
+
+class ResultCache:
+    """Two-tier (in-process LRU + SQLite) cache of per-stage analysis results.
+
+    Entries are keyed by stage and canonical URL, each stage with its own TTL.
+    """
+
+    def __init__(self, path=None, ttls=None, max_entries=256):
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.memory = LRUCache(max_entries)
+        self.disk = SQLiteCache(path) if path else None
+        self.lock = threading.Lock()
+        self.counters = defaultdict(lambda: {"memoryHits": 0, "diskHits": 0, "misses": 0, "writes": 0})
+
+    def get(self, stage, key):
+        full_key = f"{stage}:{key}"
+        with self.lock:
+            value = self.memory.get(full_key)
+            if value is not None:
+                self.counters[stage]["memoryHits"] += 1
+                return value
+            if self.disk:
+                value, expires_at = self.disk.get(full_key)
+                if value is not None:
+                    self.memory.set(full_key, value, expires_at)
+                    self.counters[stage]["diskHits"] += 1
+                    return value
+            self.counters[stage]["misses"] += 1
+            return None
+
+    def set(self, stage, key, value):
+        # Failed stages ({"error": ...}) are never cached.
+        if value is None or (isinstance(value, dict) and "error" in value):
+            return
+        full_key = f"{stage}:{key}"
+        expires_at = time.time() + self.ttls[stage]
+        with self.lock:
+            self.memory.set(full_key, value, expires_at)
+            if self.disk:
+                self.disk.set(full_key, value, expires_at)
+            self.counters[stage]["writes"] += 1
+
+    def invalidate(self, key):
+        with self.lock:
+            for stage in STAGES:
+                self.memory.delete(f"{stage}:{key}")
+                if self.disk:
+                    self.disk.delete(f"{stage}:{key}")
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.memory.entries),
+                "ttls": dict(self.ttls),
+                "stages": {stage: dict(self.counters[stage]) for stage in STAGES}
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def default_cache():
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            ttls = {
+                stage: int(os.environ[f"RESULT_CACHE_TTL_{stage.upper()}"])
+                for stage in STAGES if f"RESULT_CACHE_TTL_{stage.upper()}" in os.environ
+            }
+            _default_cache = ResultCache(
+                path=os.getenv("RESULT_CACHE_PATH", "result_cache.sqlite3"),
+                ttls=ttls,
+                max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", 256))
+            )
+        return _default_cache
@@ -0,0 +1,124 @@
+import re
+import json
+import math
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Common English words plus the field labels format_crawl_text() writes for
+# every page; neither says anything about the merchant's line of business.
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is',
+    'it', 'of', 'on', 'or', 'our', 'the', 'to', 'we', 'with', 'you', 'your',
+    'all', 'any', 'not', 'other', 'except', 'etc', 'including', 'no', 'nor',
+    'classified', 'elsewhere', 'http', 'https', 'www', 'com', 'html',
+    'url', 'title', 'page', 'type', 'status', 'sku', 'count', 'metadata',
+    'true', 'false', 'general', 'untitled', 'hasaboutus', 'hasterms', 'hasprivacy',
+    'hascontact', 'hasservices', 'hasproducts',
+}
+
+K1 = 1.2
+B = 0.75
+
+
+def stem(token):
+    if len(token) > 4 and token.endswith('ies'):
+        return token[:-3] + 'y'
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+STOPWORDS = {stem(w) for w in STOPWORDS}
+
+
+def tokenize(text):
+    tokens = (stem(t) for t in TOKEN_RE.findall(text.lower()))
+    return [t for t in tokens if len(t) > 1 and t not in STOPWORDS]
+
+
+def normalize(text):
+    return re.sub(r"\s+", " ", str(text).strip())
+
+
+def entry_line(entry):
+    return f"{normalize(entry['Category'])} - {normalize(entry['Sub_Category'])} (MCC: {entry['MCC_Code']})"
+
+
+def classification_result(entry, confidence, indicators, reasoning, decision_process):
+    # Same shape as the JSON the classification prompt asks the LLM for.
+    return {
+        "category": normalize(entry['Category']),
+        "subcategory": normalize(entry['Sub_Category']),
+        "MCC_Code": entry['MCC_Code'],
+        "Risk_Level": entry['Risk_Level'],
+        "Risk_Score": entry['Risk_Score'],
+        "confidence": confidence,
+        "reasoning": reasoning,
+        "evidence": {
+            "keyIndicators": indicators,
+            "productTypes": [],
+            "businessModel": "",
+            "targetMarket": "",
+            "primaryActivity": normalize(entry['Sub_Category'])
+        },
+        "decisionProcess": decision_process,
+        "source": "local"
+    }
+
+
+class RiskMatrixIndex:
+    """BM25 index over risk_matrix.json entries.
+
+    Each entry is indexed on its sub-category (counted twice) and category, so
+    the site text can be ranked against all ~300 entries without an LLM.
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.lines = [entry_line(e) for e in entries]
+        self.postings = defaultdict(list)
+        self.doc_lengths = []
+        for i, entry in enumerate(entries):
+            terms = tokenize(entry['Sub_Category']) * 2 + tokenize(entry['Category'])
+            self.doc_lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                self.postings[term].append((i, tf))
+        n = len(entries)
+        self.avg_length = sum(self.doc_lengths) / n if n else 0
+        self.idf = {
+            term: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def scores(self, text):
+        scores = [0.0] * len(self.entries)
+        for term, qtf in Counter(tokenize(text)).items():
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            # Long site texts repeat words a lot; damp the query side.
+            weight = self.idf[term] * (1 + math.log(qtf))
+            for i, tf in docs:
+                norm = K1 * (1 - B + B * self.doc_lengths[i] / self.avg_length)
+                scores[i] += weight * tf * (K1 + 1) / (tf + norm)
+        return scores
+
+    def top_k(self, text, k=25):
+        scores = self.scores(text)
+        ranked = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+        return [(self.entries[i], scores[i]) for i in ranked[:k] if scores[i] > 0]
+
+    def candidate_lines(self, text, k=25):
+        # The full list for k <= 0, or when nothing in the text matches.
+        top = self.top_k(text, k) if k > 0 else None
+        if not top:
+            return list(self.lines)
+        return [entry_line(entry) for entry, _ in top]
+
+
+@lru_cache(maxsize=None)
+def load_risk_index(path="risk_matrix.json"):
+    with open(path, "r", encoding="utf-8") as f:
+        return RiskMatrixIndex(json.load(f))
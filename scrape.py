@@ -1,184 +1,232 @@
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import aiohttp
+from html_parser import parse_html
 from urllib.parse import urlparse
 import re
 import json
 from collections import Counter
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from pymongo import MongoClient
-from dotenv import load_dotenv
 import os
 import sys
-def scrape_website(url: str):
-    headers_list = [
-        {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'},
-        {'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'},
-        {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'},
-        {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0'},
-        {'User-Agent': 'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)'},
-        {'User-Agent': 'facebookexternalhit/1.1 (+http://www.facebook.com/externalhit_uatext.php)'}
-    ]
-
+from keywords import KeywordMatcher
+from fetch import read_html_async, NotHTMLError
+from fetch_profiles import default_profiles, BLOCKED_STATUSES
+from politeness import Politeness, RobotsDisallowed
+from db import default_repository
+# Simultaneous requests to one host; pages share keep-alive connections.
+SCRAPE_PER_HOST = int(os.getenv("SCRAPE_PER_HOST", 4))
+SCRAPE_TIMEOUT = aiohttp.ClientTimeout(total=10)
+
+async def scrape_website_async(session, url: str, html: str = None, politeness=None, profiles=None):
     if not url.startswith(('http://', 'https://')):
         url = 'https://' + url
 
-    response = None
-    for headers in headers_list:
-        try:
-            response = requests.get(url, headers=headers, timeout=10)
-            if response.status_code == 200:
-                break
-        except requests.RequestException:
-            continue
-
-    if not response or response.status_code != 200:
-        return {"url": url, "error": "Failed to retrieve page"}
-
-    soup = BeautifulSoup(response.text, 'html.parser')
-
-    for tag in soup(['script', 'style', 'noscript', 'iframe']):
-        tag.decompose()
-    for cls in ['popup', 'modal', 'overlay', 'cookie-banner', 'cookie-consent', 'ad', 'ads', 'advertisement']:
-        for tag in soup.select(f'.{cls}, #{cls}'):
-            tag.decompose()
-
-    title = (soup.title.string if soup.title else '').strip()
-    description = ''
-    if soup.find("meta", attrs={"name": "description"}):
-        description = soup.find("meta", attrs={"name": "description"}).get("content", '')
-
-    nav_text = ' '.join([el.get_text(strip=True) for el in soup.select('nav, .nav, .menu, .navbar, header')])
-    about_text = ' '.join([el.get_text(strip=True) for el in soup.select('[href*="about"], .about, #about')])
-    services_text = ' '.join([el.get_text(strip=True) for el in soup.select('[href*="service"], .services, #services')])
-    products_text = ' '.join([el.get_text(strip=True) for el in soup.select('[href*="product"], .products, #products')])
+    # Pages the crawler already downloaded are passed in; only fetch the rest.
+    if html is None:
+        profiles = profiles or default_profiles()
+        politeness = politeness or Politeness(max_concurrency=SCRAPE_PER_HOST)
+        # The header profile known to work for this host goes first; the
+        # others are only tried when it gets blocked.
+        for index in profiles.order(url):
+            try:
+                async with politeness.get(session, url, headers=profiles.headers(index), timeout=SCRAPE_TIMEOUT) as response:
+                    if response.status in BLOCKED_STATUSES:
+                        profiles.failed(url, index)
+                        continue
+                    if response.status != 200:
+                        break
+                    profiles.succeeded(url, index)
+                    html, _ = await read_html_async(response)
+                    url = str(response.url)
+                    break
+            except (NotHTMLError, RobotsDisallowed) as e:
+                return {"url": url, "error": str(e)}
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # Politeness has already retried; other headers won't
+                # reach a host that is down. Only a blocking status makes
+                # the next profile worth a try.
+                return {"url": url, "error": str(e) or type(e).__name__}
+        if html is None:
+            return {"url": url, "error": "Failed to retrieve page"}
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, extract_page, html, url)
+
+def scrape_website(url: str, html: str = None):
+    async def run():
+        async with aiohttp.ClientSession() as session:
+            return await scrape_website_async(session, url, html)
+    return asyncio.run(run())
+
+# Everything extract_page() looks at, so one scan of the page collects it all.
+REMOVE_SELECTORS = ['script, style, noscript, iframe'] + [
+    f'.{cls}, #{cls}'
+    for cls in ['popup', 'modal', 'overlay', 'cookie-banner', 'cookie-consent', 'ad', 'ads', 'advertisement']
+]
+CONTENT_SELECTORS = [
+    ('Navigation', 'nav, .nav, .menu, .navbar, header'),
+    ('About', '[href*="about"], .about, #about'),
+    ('Services', '[href*="service"], .services, #services'),
+    ('Products', '[href*="product"], .products, #products')
+]
+MAIN_CONTENT_SELECTORS = ['main', '.main-content', '#main-content', '.content', '#content', 'article']
+PAGE_TYPE_SELECTORS = ['.product, .add-to-cart', 'article', '.gallery, .portfolio', '.services', '.about']
+SECTION_SELECTORS = [
+    ('Header', 'header, .header'),
+    ('Navigation', 'nav, .nav, .menu'),
+    ('Main Content', 'main, .main, .content'),
+    ('Sidebar', '.sidebar, aside'),
+    ('Footer', 'footer, .footer'),
+    ('Hero/Banner', '.hero, .banner'),
+    ('Testimonials', '.testimonial'),
+    ('Gallery', '.gallery, .portfolio'),
+    ('Forms', 'form')
+]
+HEADING_SELECTORS = ['h1', 'h2', 'h3', 'nav a', '.nav a', '.menu a', '.section-title', '.title', '.heading']
+PRODUCT_HINT_SELECTOR = '[class*="product"], .price, .shop'
+PAGE_TYPE_KEYWORDS = {
+    'E-commerce': ['shop', 'buy', 'cart', 'checkout', 'price'],
+    'Blog/News': ['blog', 'news', 'article', 'post'],
+    'Portfolio': ['portfolio', 'gallery', 'project'],
+    'Services': ['services', 'consulting'],
+    'Corporate': ['about us', 'company', 'contact']
+}
+PAGE_TYPE_MATCHER = KeywordMatcher([kw for kws in PAGE_TYPE_KEYWORDS.values() for kw in kws])
+SCAN_SELECTORS = (
+    [selector for _, selector in CONTENT_SELECTORS] + MAIN_CONTENT_SELECTORS +
+    PAGE_TYPE_SELECTORS + [selector for _, selector in SECTION_SELECTORS] +
+    HEADING_SELECTORS + [PRODUCT_HINT_SELECTOR, 'img', 'a']
+)
+
+def extract_page(html: str, url: str, parser: str = None):
+    doc = parse_html(html, parser)
+    scan = doc.scan(SCAN_SELECTORS, remove=REMOVE_SELECTORS)
+
+    title = (doc.title or '').strip()
+    description = doc.meta("description") or ''
 
     content = ''
-    if nav_text:
-        content += f"Navigation: {nav_text}\n"
-    if about_text:
-        content += f"About: {about_text}\n"
-    if services_text:
-        content += f"Services: {services_text}\n"
-    if products_text:
-        content += f"Products: {products_text}\n"
+    for label, selector in CONTENT_SELECTORS:
+        text = ' '.join([el.text(strip=True) for el in scan.select(selector)])
+        if text:
+            content += f"{label}: {text}\n"
 
     main_content = ''
-    for selector in ['main', '.main-content', '#main-content', '.content', '#content', 'article']:
-        el = soup.select_one(selector)
-        if el and len(el.get_text(strip=True)) > 100:
-            main_content = el.get_text(separator=' ', strip=True)
+    for selector in MAIN_CONTENT_SELECTORS:
+        el = scan.select_one(selector)
+        if el and len(el.text(strip=True)) > 100:
+            main_content = el.text(separator=' ', strip=True)
             break
 
     if not main_content:
-        text = soup.get_text(separator=' ', strip=True)
+        text = scan.text(separator=' ', strip=True)
         lines = [line for line in text.splitlines() if len(line) > 10 and all(bad not in line.lower() for bad in ['cookie', 'google', 'facebook'])]
         main_content = ' '.join(lines[:50])
 
     content += main_content.strip()
     content = ' '.join(content.split())[:5000]
 
-    metadata = analyze_metadata(soup, content, url)
+    metadata = analyze_metadata(doc, scan, content, url)
 
     return {
         "title": title or 'Untitled',
         "description": description or '',
         "content": content,
-        "url": response.url,
+        "url": url,
         "metadata": metadata
     }
 
-def analyze_metadata(soup, content, url):
+def analyze_metadata(doc, scan, content, url):
+    text = scan.text()
     return {
-        "pageType": detect_page_type(soup, content),
-        "hasProducts": bool(soup.select('[class*="product"], .price, .shop')),
-        "hasServices": bool(re.search(r'service|consultation|support', soup.get_text(), re.IGNORECASE)),
-        "contactInfo": bool(re.search(r'@|\+\d|\(\d{3}\)', soup.get_text())),
-        "socialLinks": list({a['href'] for a in soup.select('a[href]') if any(x in a['href'] for x in ['facebook', 'linkedin', 'twitter'])}),
-        "images": len(soup.find_all('img')),
-        "links": len(soup.find_all('a')),
-        "keywords": extract_keywords(soup, content),
-        "contentSections": identify_sections(soup),
-        "pageHeadings": extract_headings(soup)
+        "pageType": detect_page_type(doc, scan, content),
+        "hasProducts": scan.exists(PRODUCT_HINT_SELECTOR),
+        "hasServices": bool(re.search(r'service|consultation|support', text, re.IGNORECASE)),
+        "contactInfo": bool(re.search(r'@|\+\d|\(\d{3}\)', text)),
+        "socialLinks": list(dict.fromkeys(href for href, _ in scan.links() if any(x in href for x in ['facebook', 'linkedin', 'twitter']))),
+        "images": scan.count('img'),
+        "links": scan.count('a'),
+        "keywords": extract_keywords(doc, content),
+        "contentSections": identify_sections(scan),
+        "pageHeadings": extract_headings(scan)
     }
 
-def detect_page_type(soup, content):
-    content_lower = content.lower()
-    title = (soup.title.string or '').lower()
-    meta_description = soup.find('meta', attrs={'name': 'description'})
-    meta_description = meta_description['content'].lower() if meta_description else ''
-    all_text = f"{content_lower} {title} {meta_description}"
+def detect_page_type(doc, scan, content):
+    title = doc.title or ''
+    meta_description = doc.meta('description') or ''
+    hits = PAGE_TYPE_MATCHER.scan(f"{content} {title} {meta_description}")
 
     scores = {
-        'E-commerce': sum(kw in all_text for kw in ['shop', 'buy', 'cart', 'checkout', 'price']) + len(soup.select('.product, .add-to-cart')),
-        'Blog/News': sum(kw in all_text for kw in ['blog', 'news', 'article', 'post']) + len(soup.select('article')),
-        'Portfolio': sum(kw in all_text for kw in ['portfolio', 'gallery', 'project']) + len(soup.select('.gallery, .portfolio')),
-        'Services': sum(kw in all_text for kw in ['services', 'consulting']) + len(soup.select('.services')),
-        'Corporate': sum(kw in all_text for kw in ['about us', 'company', 'contact']) + len(soup.select('.about'))
+        'E-commerce': sum(kw in hits for kw in PAGE_TYPE_KEYWORDS['E-commerce']) + scan.count('.product, .add-to-cart'),
+        'Blog/News': sum(kw in hits for kw in PAGE_TYPE_KEYWORDS['Blog/News']) + scan.count('article'),
+        'Portfolio': sum(kw in hits for kw in PAGE_TYPE_KEYWORDS['Portfolio']) + scan.count('.gallery, .portfolio'),
+        'Services': sum(kw in hits for kw in PAGE_TYPE_KEYWORDS['Services']) + scan.count('.services'),
+        'Corporate': sum(kw in hits for kw in PAGE_TYPE_KEYWORDS['Corporate']) + scan.count('.about')
     }
     best = max(scores.items(), key=lambda x: x[1])
     return best[0] if best[1] > 0 else 'Landing Page'
 
-def extract_keywords(soup, content):
-    if meta := soup.find('meta', attrs={'name': 'keywords'}):
-        return [kw.strip() for kw in meta['content'].split(',')][:10]
+def extract_keywords(doc, content):
+    if (meta := doc.meta('keywords')) is not None:
+        return [kw.strip() for kw in meta.split(',')][:10]
     words = re.findall(r'\b\w{5,}\b', content.lower())
     freq = Counter(words)
     return [word for word, _ in freq.most_common(8)]
 
-def identify_sections(soup):
-    sections = []
-    for label, selector in [
-        ('Header', 'header, .header'),
-        ('Navigation', 'nav, .nav, .menu'),
-        ('Main Content', 'main, .main, .content'),
-        ('Sidebar', '.sidebar, aside'),
-        ('Footer', 'footer, .footer'),
-        ('Hero/Banner', '.hero, .banner'),
-        ('Testimonials', '.testimonial'),
-        ('Gallery', '.gallery, .portfolio'),
-        ('Forms', 'form')
-    ]:
-        if soup.select(selector):
-            sections.append(label)
-    return sections
-
-def extract_headings(soup):
-    tags = ['h1', 'h2', 'h3', 'nav a', '.nav a', '.menu a', '.section-title', '.title', '.heading']
-    texts = set()
-    for selector in tags:
-        for el in soup.select(selector):
-            text = el.get_text(strip=True)
+def identify_sections(scan):
+    return [label for label, selector in SECTION_SELECTORS if scan.exists(selector)]
+
+def extract_headings(scan):
+    # dict keeps first-seen order, so the output is stable across runs
+    texts = {}
+    for selector in HEADING_SELECTORS:
+        for el in scan.select(selector):
+            text = el.text(strip=True)
             if text and 0 < len(text) < 100:
-                texts.add(text)
+                texts[text] = None
     return list(texts)[:20]
 
 def extract_urls_from_mongodb(crawl_id: int):
-    load_dotenv()
-    mongo_uri = os.getenv("MONGO_URI")
-    client = MongoClient(mongo_uri)
-    db = client["website_crawler"]
-    collection = db["crawl_results"]
-
-    crawl_data = collection.find_one({"result_id": crawl_id})
-    if not crawl_data or "result_{}".format(crawl_id) not in crawl_data:
+    urls = default_repository().crawl_urls(crawl_id)
+    if not urls:
         raise ValueError(f"No crawl result found for result_id = {crawl_id}")
-
-    return [page["url"] for page in crawl_data[f"result_{crawl_id}"]["pages"] if "url" in page]
-
-def scrape_all_concurrently(urls, max_workers=10):
-    results = []
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_url = {executor.submit(scrape_website, url): url for url in urls}
-        for future in as_completed(future_to_url):
-            url = future_to_url[future]
+    return urls
+
+def load_content_store(crawl_id: int):
+    return default_repository().content_store(crawl_id)
+
+async def scrape_all_async(urls, session=None, content_store=None, max_concurrency=10, per_host=SCRAPE_PER_HOST,
+                           profiles=None, politeness=None, page_sink=None):
+    """Scrape ``urls`` on one pooled aiohttp session; results come back in
+    the order of ``urls``, failures as {"url", "error"} entries. Requests to
+    each host are paced by ``politeness``, up to ``per_host`` at a time.
+    ``page_sink`` (a db.PageWriter) gets each result as soon as it is ready."""
+    if session is None:
+        connector = aiohttp.TCPConnector(limit=max_concurrency, limit_per_host=per_host)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            return await scrape_all_async(urls, session, content_store, max_concurrency, per_host, profiles,
+                                          politeness, page_sink)
+
+    slots = asyncio.Semaphore(max_concurrency)
+    politeness = politeness or Politeness(max_concurrency=per_host)
+
+    async def scrape_one(n, url):
+        final_url, html = content_store.get_page(url) if content_store else (None, None)
+        target = final_url or url
+        async with slots:
             try:
-                result = future.result()
+                result = await scrape_website_async(session, target, html, politeness, profiles)
                 print(f"✅ Scraped: {url}")
-                results.append(result)
             except Exception as e:
                 print(f"❌ Error scraping {url}: {e}")
-                results.append({"url": url, "error": str(e)})
-    return results
+                result = {"url": url, "error": str(e)}
+        if page_sink is not None:
+            page_sink.add(result, n=n)
+        return result
+
+    return list(await asyncio.gather(*(scrape_one(n, url) for n, url in enumerate(urls))))
+
+def scrape_all_concurrently(urls, max_workers=10, content_store=None):
+    return asyncio.run(scrape_all_async(urls, content_store=content_store, max_concurrency=max_workers))
 
 if __name__ == "__main__":
     # Accept crawl_id from command-line if passed
@@ -192,23 +240,12 @@ if __name__ == "__main__":
         crawl_id = int(input("🔢 Enter the Crawl ID to scrape from MongoDB: "))
 
     urls = extract_urls_from_mongodb(crawl_id)
-    print(f"🔎 Found {len(urls)} URLs to scrape from crawl ID = {crawl_id}...")
-
-    all_results = scrape_all_concurrently(urls, max_workers=10)
+    content_store = load_content_store(crawl_id)
+    print(f"🔎 Found {len(urls)} URLs to scrape from crawl ID = {crawl_id} ({len(content_store)} already fetched by the crawler)...")
 
-    load_dotenv()
-    mongo_uri = os.getenv("MONGO_URI")
-    client = MongoClient(mongo_uri)
-    db = client["website_crawler"]
-    collection = db["scrape_results"]
-
-    scrape_document = {
-        "_id": crawl_id,
-        "crawl_id": crawl_id,
-        "compliance_sections": all_results
-    }
+    all_results = scrape_all_concurrently(urls, max_workers=10, content_store=content_store)
 
-    collection.replace_one({"_id": crawl_id}, scrape_document, upsert=True)
+    default_repository().save_scrape(crawl_id, all_results)
     print(f"🎉 All scraping completed. Results saved in MongoDB with ID = {crawl_id}")
 
 # if __name__ == "__main__":
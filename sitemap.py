@@ -0,0 +1,240 @@
+import os
+import re
+import zlib
+import heapq
+import asyncio
+from urllib.parse import urlparse
+from xml.etree.ElementTree import XMLPullParser, ParseError
+
+import aiohttp
+
+from politeness import Politeness, RobotsDisallowed, origin
+from urlnorm import canonicalize_url
+
+# Sitemap files read per site, index files included; big catalogs split
+# their URLs over many files and the rest are left unread.
+SITEMAP_MAX_FILES = int(os.getenv("SITEMAP_MAX_FILES", 20))
+# The sitemap protocol caps a file at 50 MB uncompressed.
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024
+# Budget for all of a site's sitemaps together: seconds and uncompressed
+# bytes. The crawl runs alongside; whatever is unread by then is skipped.
+SITEMAP_BUDGET = float(os.getenv("SITEMAP_BUDGET", 15))
+SITEMAP_BUDGET_BYTES = int(os.getenv("SITEMAP_BUDGET_MB", 20)) * 1024 * 1024
+# Sitemap files fetched at once.
+SITEMAP_CONCURRENCY = int(os.getenv("SITEMAP_CONCURRENCY", 4))
+SITEMAP_TIMEOUT = aiohttp.ClientTimeout(total=60)
+CHUNK_SIZE = 64 * 1024
+GZIP_MAGIC = b"\x1f\x8b"
+# Key pages kept as candidates before ranking; only the best few are crawled.
+MAX_KEY_CANDIDATES = 1000
+
+# Matched against the raw <loc>: product URLs are only counted, and on a
+# big catalog parsing each one would cost more than reading the sitemap.
+PRODUCT_URL_RE = re.compile(r"^[a-z][a-z0-9+.-]*://[^/]+(?:/[^?#]*)?/(?:products?|items?|shop|store)/[^/?#]+",
+                            re.IGNORECASE)
+
+
+def local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def is_product_sitemap(sitemap_url):
+    # Shops usually list products in their own sitemap (Shopify's
+    # sitemap_products_1.xml, WooCommerce's product-sitemap.xml, ...).
+    return "product" in urlparse(sitemap_url).path.rsplit("/", 1)[-1].lower()
+
+
+def path_depth(url):
+    return len([part for part in urlparse(url).path.split("/") if part])
+
+
+class SitemapSummary:
+    """What a site's sitemaps list, without keeping every URL.
+
+    Product URLs are only counted. Of the rest, those ``accept`` lets
+    through are kept: key pages (per ``is_key``) for ranking shallowest
+    first, other pages only the ``limit`` with the highest <priority>.
+    """
+
+    def __init__(self, accept, is_key, limit):
+        self.accept = accept
+        self.is_key = is_key
+        self.limit = limit
+        self.key_pages = set()
+        self.others = []  # heap of (priority, -depth, url)
+        self.urls = 0
+        self.product_urls = 0
+        self.files = 0
+        self.bytes = 0
+        self.complete = True
+
+    def add(self, loc, priority, product_sitemap=False):
+        self.urls += 1
+        if product_sitemap or PRODUCT_URL_RE.match(loc):
+            self.product_urls += 1
+            return
+        url = canonicalize_url(loc)
+        if not self.accept(url):
+            return
+        if self.is_key(url):
+            if len(self.key_pages) < MAX_KEY_CANDIDATES:
+                self.key_pages.add(url)
+        elif self.limit:
+            entry = (priority, -path_depth(url), url)
+            if len(self.others) < self.limit:
+                heapq.heappush(self.others, entry)
+            else:
+                heapq.heappushpop(self.others, entry)
+
+    def ranked_key_pages(self, count):
+        return sorted(self.key_pages, key=lambda url: (path_depth(url), len(url), url))[:count]
+
+    def ranked_pages(self):
+        return [url for _, _, url in sorted(self.others, reverse=True)]
+
+    def stats(self):
+        return {
+            "files": self.files,
+            "urls": self.urls,
+            "productUrls": self.product_urls,
+            # False when some sitemap files were left unread: counts are then
+            # lower bounds.
+            "complete": self.complete
+        }
+
+
+async def sitemap_urls(session, site, robots):
+    """Sitemaps a site declares in robots.txt, else its /sitemap.xml."""
+    parser, _ = await robots.get(session, site)
+    return list(parser.site_maps() or []) or [origin(site) + "/sitemap.xml"]
+
+
+async def read_sitemap(session, url, politeness, on_url, on_sitemap, on_bytes=None):
+    """Stream one sitemap (or sitemap index, gzipped or not), calling
+    on_url(loc, priority) per page and on_sitemap(loc) per child sitemap.
+    on_bytes(n) is told how much was read each time; reading stops when it
+    returns False."""
+    parser = XMLPullParser(events=("start", "end"))
+    root = None
+    inflate = None
+    size = 0
+
+    def handle(events):
+        nonlocal root
+        for event, elem in events:
+            if event == "start":
+                if root is None:
+                    root = elem
+                continue
+            name = local_name(elem.tag)
+            if name not in ("url", "sitemap"):
+                continue
+            fields = {local_name(child.tag): (child.text or "").strip() for child in elem}
+            if fields.get("loc"):
+                if name == "sitemap":
+                    on_sitemap(fields["loc"])
+                else:
+                    try:
+                        priority = float(fields.get("priority") or 0.5)
+                    except ValueError:
+                        priority = 0.5
+                    on_url(fields["loc"], priority)
+            # Drop what has been read so memory stays flat on huge files.
+            root.clear()
+
+    async with politeness.get(session, url, timeout=SITEMAP_TIMEOUT) as res:
+        if res.status != 200:
+            return False
+        async for chunk in res.content.iter_chunked(CHUNK_SIZE):
+            if inflate is None:
+                # .xml.gz files come as raw gzip, not Content-Encoding.
+                inflate = zlib.decompressobj(16 + zlib.MAX_WBITS) if chunk.startswith(GZIP_MAGIC) else False
+            while chunk:
+                # Inflated a piece at a time: gzip expands many times over.
+                if inflate:
+                    data = inflate.decompress(chunk, min(CHUNK_SIZE, SITEMAP_MAX_BYTES - size))
+                    chunk = inflate.unconsumed_tail
+                else:
+                    data, chunk = chunk, b""
+                size += len(data)
+                parser.feed(data)
+                handle(parser.read_events())
+                if size >= SITEMAP_MAX_BYTES or (on_bytes is not None and on_bytes(len(data)) is False):
+                    return True
+                # Buffered data comes without a suspension point; let the
+                # crawl's workers (and the budget timeout) run between pieces.
+                await asyncio.sleep(0)
+    return True
+
+
+async def read_sitemaps(session, base_url, politeness, accept, is_key, limit, max_files=SITEMAP_MAX_FILES,
+                        budget=SITEMAP_BUDGET, max_bytes=SITEMAP_BUDGET_BYTES, concurrency=SITEMAP_CONCURRENCY,
+                        summary=None, on_file=None):
+    """Read a site's sitemaps, following indexes breadth-first, and
+    summarize the pages ``accept`` lets through.
+
+    Up to ``concurrency`` files are read at once, product sitemaps last:
+    they only add to the product count, the others hold the key pages.
+    Reading stops after ``budget`` seconds or ``max_bytes``, leaving the
+    summary marked incomplete. ``await on_file(summary)`` runs after each
+    file, so a crawl can use what has been found so far.
+
+    Files are fetched under ``politeness``'s robots.txt rules and
+    Crawl-delay, but with one slot per host of their own: a sitemap can
+    stream for a minute, and must not hold the crawl's page slots meanwhile.
+    """
+    summary = summary or SitemapSummary(accept, is_key, limit)
+    files = Politeness(max_concurrency=1, robots=politeness.robots,
+                       respect_robots=politeness.respect_robots, retries=politeness.retries)
+    queue = []
+    queued = set()
+
+    def enqueue(loc):
+        if loc not in queued:
+            queued.add(loc)
+            queue.append(loc)
+
+    deadline = asyncio.get_running_loop().time() + budget
+
+    def on_bytes(n):
+        summary.bytes += n
+        if summary.bytes >= max_bytes or asyncio.get_running_loop().time() >= deadline:
+            summary.complete = False
+            return False
+        return True
+
+    async def read_one(current):
+        products = is_product_sitemap(current)
+        summary.files += 1
+        try:
+            await read_sitemap(session, current, files,
+                               lambda loc, priority: summary.add(loc, priority, products), enqueue, on_bytes)
+        except ParseError:
+            # Keep what was read before the file went bad.
+            pass
+        except (aiohttp.ClientError, asyncio.TimeoutError, RobotsDisallowed, zlib.error) as e:
+            print(f"Sitemap skipped: {current} ({e})")
+        if on_file is not None:
+            await on_file(summary)
+
+    async def read_all():
+        for loc in await sitemap_urls(session, base_url, politeness.robots):
+            enqueue(loc)
+        while queue:
+            if summary.files >= max_files or not summary.complete:
+                summary.complete = False
+                return
+            queue.sort(key=is_product_sitemap)  # stable: breadth-first otherwise
+            count = min(concurrency, max_files - summary.files)
+            batch, queue[:count] = queue[:count], []
+            await asyncio.gather(*(read_one(url) for url in batch))
+
+    try:
+        await asyncio.wait_for(read_all(), budget)
+    except asyncio.TimeoutError:
+        print(f"Sitemaps: {budget:g}s budget used up after {summary.files} files")
+        summary.complete = False
+    except asyncio.CancelledError:
+        summary.complete = False
+        raise
+    return summary
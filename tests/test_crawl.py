@@ -0,0 +1,112 @@
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from crawl import SiteCrawler, make_parse_executor
+from politeness import Politeness
+from urlnorm import url_fingerprint
+
+
+def crawler(max_pages, **kwargs):
+    kwargs.setdefault("sitemaps", False)
+    return SiteCrawler("https://example.com/", max_pages=max_pages,
+                       politeness=Politeness(respect_robots=False), **kwargs)
+
+
+def test_claim_reserves_page_slots():
+    async def main():
+        c = crawler(2)
+        c.in_flight = 0
+        c.frontier_changed = asyncio.Condition()
+        for path in ("a", "b", "c"):
+            c.frontier.add(f"https://example.com/{path}")
+
+        claimed = [c.claim_next_url(), c.claim_next_url()]
+        # Both slots are taken by pages in flight, with URLs still queued.
+        assert c.claim_next_url() is None
+        # A failed page gives its slot back; a successful one keeps it.
+        await c.finish_page(None)
+        claimed.append(c.claim_next_url())
+        await c.finish_page({"url": claimed[1]})
+        assert c.claim_next_url() is None
+        return claimed
+
+    claimed = asyncio.run(main())
+    assert claimed == ["https://example.com/", "https://example.com/a", "https://example.com/b"]
+
+
+def test_claim_skips_crawled_and_external_urls():
+    c = crawler(10)
+    c.in_flight = 0
+    c.frontier.add("https://other.com/a")
+    assert c.claim_next_url() == "https://example.com/"
+    # Already crawled under another URL that declared it canonical.
+    c.crawled.add(url_fingerprint("https://example.com/a"))
+    c.frontier.add("https://example.com/a")
+    c.frontier.add("https://example.com/b")
+    assert c.claim_next_url() == "https://example.com/b"
+    assert c.claim_next_url() is None
+    assert c.in_flight == 2
+
+
+def serve_and_crawl(handler, max_pages, timeout=10, **kwargs):
+    async def main():
+        app = web.Application()
+        app.router.add_get("/{path:.*}", handler)
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            c = SiteCrawler(str(server.make_url("/")), max_pages=max_pages,
+                            politeness=Politeness(respect_robots=False), **kwargs)
+            return await asyncio.wait_for(c.async_crawl(), timeout)
+        finally:
+            await server.close()
+
+    return asyncio.run(main())
+
+
+async def endless_site(request):
+    # Every page links to two more: the frontier never runs dry.
+    n = int(request.path.strip("/") or 0)
+    return web.Response(text=f'<a href="/{2 * n + 1}">a</a><a href="/{2 * n + 2}">b</a>',
+                        content_type="text/html")
+
+
+def test_workers_stop_at_max_pages():
+    report = serve_and_crawl(endless_site, max_pages=7, concurrency=5, sitemaps=False)
+    assert report["totalPages"] == 7
+
+
+def test_workers_stop_at_max_pages_with_parse_executor():
+    executor = make_parse_executor(2, "thread")
+    try:
+        report = serve_and_crawl(endless_site, max_pages=7, concurrency=5, sitemaps=False,
+                                 parse_executor=executor, parse_backlog=2)
+    finally:
+        executor.shutdown()
+    assert report["totalPages"] == 7
+
+
+def test_workers_stop_when_frontier_runs_dry():
+    async def site(request):
+        if request.path == "/":
+            return web.Response(text='<a href="/a">a</a><a href="/missing">m</a>', content_type="text/html")
+        if request.path == "/a":
+            return web.Response(text="<p>leaf</p>", content_type="text/html")
+        return web.Response(status=404)
+
+    report = serve_and_crawl(site, max_pages=50, concurrency=5, sitemaps=False)
+    assert report["totalPages"] == 2
+    assert report["crawlStats"]["failed"] == 1
+
+
+def test_workers_stop_at_max_pages_while_sitemaps_are_read():
+    async def site(request):
+        if request.path == "/sitemap.xml":
+            await asyncio.sleep(30)
+        return await endless_site(request)
+
+    report = serve_and_crawl(site, max_pages=3, concurrency=2, sitemaps=True)
+    assert report["totalPages"] == 3
+    assert report["sitemap"]["complete"] is False
@@ -0,0 +1,67 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pymongo import ASCENDING
+
+from content_store import ContentStore
+from db import Repository, ensure_indexes
+
+mongomock = pytest.importorskip("mongomock")
+
+
+@pytest.fixture
+def repository():
+    return Repository(mongomock.MongoClient(), "test")
+
+
+def crawl(*urls):
+    return {"baseUrl": "https://example.com/", "pages": [
+        {"url": url, "title": url, "pageType": "General", "status": 200, "productCount": 0, "metadata": {}}
+        for url in urls
+    ]}
+
+
+def store(*urls):
+    content = ContentStore()
+    for url in urls:
+        content.put(url, f"<p>{url}</p>")
+    return content
+
+
+def test_saving_a_crawl_id_again_replaces_its_pages(repository):
+    crawl_id = repository.new_crawl_id()
+    repository.save_crawl(crawl_id, crawl("https://example.com/a", "https://example.com/b"),
+                          store("https://example.com/a", "https://example.com/b"))
+    repository.save_crawl(crawl_id, crawl("https://example.com/a"), store("https://example.com/a"))
+    assert repository.crawl_urls(crawl_id) == ["https://example.com/a"]
+    assert repository.db["page_content"].count_documents({"crawl_id": crawl_id}) == 1
+    assert len(repository.content_store(crawl_id)) == 1
+
+
+def test_duplicate_page_content_is_removed_before_the_unique_index(repository):
+    collection = repository.client["legacy"]["page_content"]
+    collection.create_index([("crawl_id", ASCENDING), ("url", ASCENDING)])
+    for html in (b"old", b"new"):
+        collection.insert_one({"crawl_id": 1, "url": "https://example.com/", "html": html})
+    ensure_indexes(repository.client["legacy"])
+    assert [doc["html"] for doc in collection.find()] == [b"new"]
+    assert collection.index_information()["crawl_id_1_url_1"].get("unique")
+
+
+def test_scrape_pages_round_trip(repository):
+    crawl_id = repository.new_crawl_id()
+    repository.save_scrape(crawl_id, [{"url": "https://example.com/a", "text": "x"}])
+    repository.save_scrape(crawl_id, [{"url": "https://example.com/b", "text": "y"}])
+    assert list(repository.scrape_pages(crawl_id)) == [{"url": "https://example.com/b", "text": "y"}]
+
+
+def test_page_writer_inserts_on_executor(repository):
+    crawl_id = repository.new_crawl_id()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        writer = repository.scrape_writer(crawl_id, executor)
+        writer.batch_size = 2
+        for i in range(5):
+            writer.add({"url": f"https://example.com/{i}"}, n=i)
+        writer.close()
+        assert not writer.pending
+    assert [page["url"] for page in repository.scrape_pages(crawl_id)] == [f"https://example.com/{i}" for i in range(5)]
@@ -0,0 +1,35 @@
+from frontier import URLFrontier
+
+
+def test_urls_are_queued_once():
+    frontier = URLFrontier(["https://example.com/"])
+    assert not frontier.add("https://example.com/")
+    assert frontier.add("https://example.com/a")
+    assert not frontier.add("https://example.com/a", priority=True)
+    assert len(frontier) == 2
+
+
+def test_popped_urls_stay_seen():
+    frontier = URLFrontier(["https://example.com/"])
+    assert frontier.pop() == "https://example.com/"
+    assert not frontier
+    assert "https://example.com/" in frontier
+    assert not frontier.add("https://example.com/")
+    assert frontier.pop() is None
+
+
+def test_priority_lane_drains_first():
+    frontier = URLFrontier(["https://example.com/", "https://example.com/a"])
+    frontier.add("https://example.com/about", priority=True)
+    frontier.add("https://example.com/b")
+    frontier.add("https://example.com/terms", priority=True)
+    popped = [frontier.pop() for _ in range(len(frontier))]
+    assert popped == ["https://example.com/about", "https://example.com/terms",
+                      "https://example.com/", "https://example.com/a", "https://example.com/b"]
+
+
+def test_mark_seen_blocks_later_adds():
+    frontier = URLFrontier()
+    frontier.mark_seen("https://example.com/canonical")
+    assert not frontier.add("https://example.com/canonical")
+    assert len(frontier) == 0
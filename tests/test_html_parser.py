@@ -0,0 +1,121 @@
+import pytest
+from bs4 import BeautifulSoup
+
+from html_parser import parse_html, available_parsers, parse_compound
+from crawl import PRODUCT_SELECTORS
+from scrape import SCAN_SELECTORS, REMOVE_SELECTORS
+from benchmarks.fixtures import product_page
+
+PAGE = """<!DOCTYPE html>
+<html><head><title>Shop &amp; More</title>
+<meta name="description" content="Things">
+<link rel="canonical stylesheet" href="https://example.com/shop">
+<style>.a { color: red }</style>
+<script>var hidden = "<p class='title'>not text</p>";</script>
+</head>
+<body>
+<header class="header"><nav class="nav main-nav" id="top">
+  <a href="/">Home</a> <a href="/about-us" class="menu-link">About <b>us</b></a>
+  <a href="/services">Services</a> <a>no href</a>
+</nav></header>
+<div class="menu"><ul><li><a href="/shop?page=2" lang="en-US">Shop</a></li></ul></div>
+<main id="main-content" class="content">
+  <h1>Welcome</h1>
+  <!-- a comment with <a href="/fake">markup</a> -->
+  <div class="hero banner" data-x="alpha-beta">Hero text</div>
+  <section class="products">
+    <div class="product product-card" data-product="1"><h2 class="product-title">One</h2><span class="price">$1</span></div>
+    <div class="product-item" data-product="2"><h3 class="item-title">Two</h3><button class="add-to-cart">Add</button></div>
+    <div class="shop-item featured"><p>Three</p></div>
+  </section>
+  <article><h2 class="section-title">News</h2><p>Body <a href="https://other.com/x">out</a></p></article>
+  <div class="popup">Sign up!</div>
+  <div id="ads"><a href="/ad">Ad link</a></div>
+  <aside class="sidebar"><div class="testimonial">Great</div></aside>
+  <form><input name="q"></form>
+  <div class="gallery"><img src="a.png" alt="a"><img src="b.png"></div>
+  <noscript>Enable JS</noscript>
+</main>
+<footer class="footer"><a href="/privacy-policy" class="title">Privacy</a></footer>
+</body></html>"""
+
+EXTRA_SELECTORS = [
+    '*', 'div', 'a[href]', '[data-product]', '[data-product="2"]', '[data-x^="alpha"]', '[data-x$=beta]',
+    '[class~="featured"]', '[lang|="en"]', '[href*="about"]', 'div.product.product-card', 'nav#top.nav',
+    'main a', 'section div', 'header a[href]', 'li a', 'h1, h2, h3', '#missing', 'span.nothing',
+]
+SELECTORS = list(dict.fromkeys(SCAN_SELECTORS + PRODUCT_SELECTORS + EXTRA_SELECTORS))
+# What scan() leaves out of the page text.
+NON_TEXT = "script, style, template"
+
+
+def soup_for(html, remove=()):
+    soup = BeautifulSoup(html, "html.parser")
+    for selector in remove:
+        for tag in soup.select(selector):
+            tag.decompose()
+    for tag in soup.select(NON_TEXT):
+        tag.clear()
+    return soup
+
+
+def expected(soup, selector):
+    return [(tag.name, tag.get_text(" ", strip=True)) for tag in soup.select(selector)]
+
+
+def found(scan, selector):
+    return [node.text(" ", strip=True) for node in scan.select(selector)]
+
+
+@pytest.fixture(params=available_parsers())
+def parser(request):
+    return request.param
+
+
+@pytest.mark.parametrize("html", [PAGE, product_page(20, seed=1)], ids=["page", "listing"])
+@pytest.mark.parametrize("remove", [(), tuple(REMOVE_SELECTORS)], ids=["keep", "remove"])
+def test_scan_matches_soup_select(parser, html, remove):
+    scan = parse_html(html, parser).scan(SELECTORS, remove=list(remove))
+    soup = soup_for(html, remove)
+    for selector in SELECTORS:
+        want = expected(soup, selector)
+        assert found(scan, selector) == [text for _, text in want], selector
+        assert scan.count(selector) == len(want), selector
+        assert scan.exists(selector) == bool(want), selector
+        first = scan.select_one(selector)
+        assert (first.text(" ", strip=True) if first else None) == (want[0][1] if want else None), selector
+
+
+def test_scan_text_and_links(parser):
+    scan = parse_html(PAGE, parser).scan([], remove=REMOVE_SELECTORS)
+    soup = soup_for(PAGE, REMOVE_SELECTORS)
+    assert scan.text(" ", strip=True) == soup.get_text(" ", strip=True)
+    assert "not text" not in scan.text(" ")
+    assert "Sign up!" not in scan.text(" ")
+    assert scan.links() == [(a["href"], a.get_text(strip=True)) for a in soup.select("a[href]")]
+
+
+def test_scan_node_attributes(parser):
+    scan = parse_html(PAGE, parser).scan(['[data-product]', 'img'])
+    assert [node.get("data-product") for node in scan.select('[data-product]')] == ["1", "2"]
+    assert [node.get("alt") for node in scan.select('img')] == ["a", None]
+
+
+def test_document_helpers(parser):
+    doc = parse_html(PAGE, parser)
+    assert doc.title == "Shop & More"
+    assert doc.canonical() == "https://example.com/shop"
+    assert doc.meta("description") == "Things"
+
+
+@pytest.mark.parametrize("selector", ['a > b', 'a + b', 'div ~ p', 'a:hover', 'ul li a', 'p::before'])
+def test_unsupported_selectors_are_rejected(parser, selector):
+    with pytest.raises(ValueError):
+        parse_html(PAGE, parser).scan([selector])
+
+
+def test_parse_compound():
+    assert parse_compound('div.a.b#c[href*="x"][data-y]') == (
+        "div", ("c",), ("a", "b"), (("href", "*=", "x"), ("data-y", None, ""))
+    )
+    assert parse_compound('.x')[0] == "*"
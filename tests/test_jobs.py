@@ -0,0 +1,40 @@
+import threading
+
+import pytest
+
+from jobs import JobManager, validate_max_pages
+
+
+@pytest.mark.parametrize("value, expected", [(20, 20), ("5", 5), (1, 1)])
+def test_valid_max_pages(value, expected):
+    assert validate_max_pages(value) == expected
+
+
+@pytest.mark.parametrize("value", ["abc", "", 0, -3, True, 2.5, None, [1], {"n": 1}])
+def test_invalid_max_pages(value):
+    with pytest.raises(ValueError):
+        validate_max_pages(value)
+
+
+def test_submit_rejects_bad_max_pages_before_queueing():
+    manager = JobManager(lambda *args, **kwargs: {})
+    with pytest.raises(ValueError):
+        manager.submit("https://example.com", "abc")
+    assert not manager.jobs
+
+
+def test_same_site_is_deduplicated_while_running():
+    release = threading.Event()
+
+    def runner(url, max_pages, progress=None, refresh=False):
+        release.wait(5)
+        return {"url": url}
+
+    manager = JobManager(runner, max_workers=1)
+    first, created = manager.submit("https://example.com/", 10)
+    second, created_again = manager.submit("https://EXAMPLE.com", "10")
+    release.set()
+    manager.executor.shutdown(wait=True)
+    assert created and not created_again
+    assert first["id"] == second["id"]
+    assert manager.get(first["id"])["status"] == "done"
@@ -0,0 +1,25 @@
+import json
+
+import light
+from llm_memo import PromptMemo
+
+
+def test_summary_prompt_uses_the_memo_key_order(tmp_path, monkeypatch):
+    memo = PromptMemo(str(tmp_path / "memo.sqlite3"))
+    prompts = []
+
+    def complete(calls):
+        prompts.append(calls)
+        return "openai", '{"summary": "shoes"}'
+
+    monkeypatch.setattr(light, "default_memo", lambda: memo)
+    monkeypatch.setattr(light.llm, "complete", complete)
+    monkeypatch.setattr(light.llm, "call_openai", lambda prompt, *a, **kw: prompt)
+    scrape = [{"url": "https://example.com/b"}, {"url": "https://example.com/a"}]
+
+    first = light.summarize_with_openai_or_claude("crawl", scrape, 0, 2)
+    again = light.summarize_with_openai_or_claude("crawl", list(reversed(scrape)), 0, 2)
+    assert first == again == {"summary": "shoes"}
+    assert len(prompts) == 1
+    prompt = prompts[0][0][1]()
+    assert json.dumps(light.normalize_scrape_json(scrape)) in prompt
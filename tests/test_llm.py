@@ -0,0 +1,59 @@
+import threading
+import time
+
+import pytest
+
+import llm
+
+
+@pytest.fixture
+def short_timeouts(monkeypatch):
+    monkeypatch.setitem(llm.PROVIDER_TIMEOUTS, "a", 0.3)
+    monkeypatch.setitem(llm.PROVIDER_TIMEOUTS, "b", 0.3)
+
+
+def slow(seconds, answer):
+    def call():
+        time.sleep(seconds)
+        return answer
+    return call
+
+
+def failing():
+    raise RuntimeError("down")
+
+
+def test_primary_answers(short_timeouts):
+    assert llm.complete([("a", slow(0, "A")), ("b", slow(0, "B"))]) == ("a", "A")
+
+
+def test_falls_back_on_failure(short_timeouts):
+    assert llm.complete([("a", failing), ("b", slow(0, "B"))]) == ("b", "B")
+
+
+def test_falls_back_on_deadline(short_timeouts):
+    assert llm.complete([("a", slow(1, "A")), ("b", slow(0, "B"))]) == ("b", "B")
+
+
+def test_all_fail(short_timeouts):
+    with pytest.raises(llm.AllProvidersFailed):
+        llm.complete([("a", failing), ("b", failing)])
+
+
+def test_hedge(short_timeouts):
+    assert llm.complete([("a", slow(0.25, "A")), ("b", slow(0, "B"))], hedge_after=0.05) == ("b", "B")
+
+
+def test_deadline_counts_from_start_not_queueing(short_timeouts):
+    # Every worker is busy for longer than the deadline; the call only
+    # starts once one frees up and must not be timed out while queued.
+    release = threading.Event()
+    busy = [llm._executor.submit(release.wait, 5) for _ in range(llm._executor._max_workers)]
+    timer = threading.Timer(0.6, release.set)
+    timer.start()
+    try:
+        assert llm.complete([("a", slow(0.05, "A")), ("b", slow(0, "B"))]) == ("a", "A")
+    finally:
+        release.set()
+        for future in busy:
+            future.result()
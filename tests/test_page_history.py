@@ -0,0 +1,133 @@
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from crawl import SiteCrawler
+from page_history import PageHistory, SiteHistory, content_hash, site_digest
+from politeness import Politeness
+
+
+def test_content_hash_ignores_volatile_markup():
+    page = '<form><input name="csrf" value="{}"><script nonce="{}">var t = {};</script></form><p>Hi</p>'
+    assert content_hash(page.format("a", "b", 1)) == content_hash(page.format("c", "d", 2))
+
+
+def test_content_hash_keeps_page_text():
+    # The same words outside a tag are part of the page.
+    assert content_hash('<p>value="1"</p>') != content_hash('<p>value="2"</p>')
+    assert content_hash('<p>nonce=1 <b>x</b></p>') != content_hash('<p>nonce=2 <b>x</b></p>')
+
+
+def test_content_hash_keeps_description_meta():
+    page = '<meta name="description" content="{}"><meta name="csrf-token" content="{}">'
+    assert content_hash(page.format("Shoes", "a")) == content_hash(page.format("Shoes", "b"))
+    assert content_hash(page.format("Shoes", "a")) != content_hash(page.format("Hats", "a"))
+
+
+def test_site_digest_tracks_pages_and_hashes():
+    digest = site_digest({"https://a/": "1", "https://a/b": "2"})
+    assert digest == site_digest({"https://a/b": "2", "https://a/": "1"})
+    assert digest != site_digest({"https://a/": "1", "https://a/b": "3"})
+    assert digest != site_digest({"https://a/": "1"})
+
+
+def extracted(url):
+    return {"url": url}, None, [], []
+
+
+def test_site_history_records_pages():
+    site = SiteHistory("https://example.com/")
+    assert site.conditional_headers("https://example.com/a") == {}
+    site.record("https://example.com/a", "https://example.com/a/", "<p>a</p>",
+                {"etag": '"v1"', "last_modified": None, "hash": "h1"}, extracted("https://example.com/a"))
+    assert site.conditional_headers("https://example.com/a") == {"If-None-Match": '"v1"'}
+    assert site.page("https://example.com/a") == ("<p>a</p>", "https://example.com/a/")
+    assert site.extraction("https://example.com/a", "h1") == extracted("https://example.com/a")
+    assert site.extraction("https://example.com/a", "h2") is None
+
+
+def test_site_history_results_need_the_same_digest():
+    site = SiteHistory("https://example.com/")
+    site.remember("d1", {"scrape": [], "summary": {"ok": 1}, "classification": {"error": "failed"}})
+    assert site.results_for("d1") == {"scrape": [], "summary": {"ok": 1}}
+    assert site.results_for("d2") == {}
+    assert site.results_for(None) == {}
+
+
+def test_page_history_keeps_recent_sites():
+    history = PageHistory(max_sites=2)
+    a = history.site("example.com")
+    assert history.site("https://example.com/") is a
+    history.site("https://b.example/")
+    history.site("https://c.example/")
+    assert history.site("https://example.com/") is not a
+
+
+def test_unchanged_pages_come_from_history():
+    # A 304 answers from the stored copy; same HTML reuses its extraction.
+    pages = {"/": '<a href="/about">About us</a>', "/about": "<p>We sell shoes.</p>"}
+    history = PageHistory()
+
+    async def main():
+        async def handler(request):
+            if request.path not in pages:
+                return web.Response(status=404)
+            if request.path == "/" and request.headers.get("If-None-Match") == '"home"':
+                return web.Response(status=304)
+            return web.Response(text=pages[request.path], content_type="text/html", headers={"ETag": '"home"'})
+
+        app = web.Application()
+        app.router.add_get("/{path:.*}", handler)
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            reports = []
+            for _ in range(2):
+                crawler = SiteCrawler(str(server.make_url("/")), max_pages=5, history=history,
+                                      politeness=Politeness(respect_robots=False), sitemaps=False)
+                reports.append(await crawler.async_crawl())
+            return reports
+        finally:
+            await server.close()
+
+    first, second = asyncio.run(main())
+    assert first["crawlStats"]["unchanged"] == 0
+    assert second["crawlStats"]["unchanged"] == 2
+    assert second["totalPages"] == 2
+    assert second["contentDigest"] == first["contentDigest"]
+
+
+def test_text_only_change_alters_the_digest():
+    pages = {"/": '<title>Home</title><a href="/about">About us</a>', "/about": "<p>We sell shoes.</p>"}
+    history = PageHistory()
+
+    async def main():
+        async def handler(request):
+            if request.path not in pages:
+                return web.Response(status=404)
+            return web.Response(text=pages[request.path], content_type="text/html")
+
+        app = web.Application()
+        app.router.add_get("/{path:.*}", handler)
+        server = TestServer(app)
+        await server.start_server()
+
+        async def crawl():
+            crawler = SiteCrawler(str(server.make_url("/")), max_pages=5, concurrency=2, history=history,
+                                  politeness=Politeness(respect_robots=False), sitemaps=False)
+            return await crawler.async_crawl()
+
+        try:
+            first = await crawl()
+            again = await crawl()
+            pages["/about"] = "<p>We sell hats.</p>"
+            changed = await crawl()
+        finally:
+            await server.close()
+        return first, again, changed
+
+    first, again, changed = asyncio.run(main())
+    assert first["totalPages"] == 2
+    assert again["contentDigest"] == first["contentDigest"]
+    assert changed["contentDigest"] != first["contentDigest"]
@@ -0,0 +1,65 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from page_history import PageHistory
+from pipeline import Pipeline
+
+
+@pytest.mark.parametrize("offload", [False, True])
+def test_unchanged_site_reuses_downstream_results(monkeypatch, offload):
+    pages = {"/": '<title>Home</title><a href="/about">About us</a>', "/about": "<p>We sell shoes.</p>"}
+    calls = {"summarize": 0, "classify": 0}
+
+    async def summarize(self, crawl_text, scrape_results):
+        calls["summarize"] += 1
+        return {"summary": calls["summarize"]}
+
+    async def classify(self, crawl_text):
+        calls["classify"] += 1
+        return {"MCC_Code": 5661}
+
+    monkeypatch.setattr(Pipeline, "summarize", summarize)
+    monkeypatch.setattr(Pipeline, "classify", classify)
+    history = PageHistory()
+
+    async def main():
+        async def handler(request):
+            if request.path not in pages:
+                return web.Response(status=404)
+            return web.Response(text=pages[request.path], content_type="text/html")
+
+        app = web.Application()
+        app.router.add_get("/{path:.*}", handler)
+        server = TestServer(app)
+        await server.start_server()
+
+        async def run():
+            pipeline = Pipeline(history=history, io_executor=io_executor)
+            return await pipeline.run_async(str(server.make_url("/")), max_pages=5)
+
+        try:
+            first = await run()
+            again = await run()
+            pages["/about"] = "<p>We sell hats.</p>"
+            changed = await run()
+        finally:
+            await server.close()
+        return first, again, changed
+
+    io_executor = ThreadPoolExecutor(max_workers=2) if offload else None
+    try:
+        first, again, changed = asyncio.run(main())
+    finally:
+        if io_executor is not None:
+            io_executor.shutdown()
+    assert first["totalPages"] == 2
+    # Same pages and HTML: the earlier scrape, summary and classification
+    # are reused instead of computed again.
+    assert again["analysis"] == first["analysis"] == {"summary": 1}
+    assert again["scrape"] == first["scrape"]
+    assert changed["analysis"] == {"summary": 2}
+    assert calls == {"summarize": 2, "classify": 2}
@@ -0,0 +1,158 @@
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from politeness import Politeness, HostState, RobotsCache, parse_crawl_delay, parse_retry_after, origin
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def serve(routes):
+    app = web.Application()
+    app.add_routes(routes)
+    server = TestServer(app)
+    await server.start_server()
+    return server
+
+
+def polite(**kwargs):
+    kwargs.setdefault("respect_robots", False)
+    return Politeness(**kwargs)
+
+
+def test_origin():
+    assert origin("https://Example.com/a?b") == "https://example.com"
+    assert origin("http://example.com:8080/") == "http://example.com:8080"
+
+
+def test_parse_crawl_delay():
+    lines = ["User-agent: other", "Crawl-delay: 10", "", "User-agent: *", "Crawl-delay: 0.5"]
+    assert parse_crawl_delay(lines, "*") == 0.5
+    assert parse_crawl_delay(["User-agent: *", "Disallow: /x"], "*") == 0.0
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("7") == 7
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+
+
+def test_aimd_limits():
+    host = HostState(4, 8)
+    host.record(0.1, ok=False)
+    assert host.limit == 2
+    for _ in range(10):
+        host.record(0.1, ok=True)
+    assert 2 < host.limit <= 8
+
+
+def test_retries_transient_status():
+    calls = []
+
+    async def flaky(request):
+        calls.append(1)
+        return web.Response(status=503 if len(calls) < 3 else 200, text="ok")
+
+    async def main():
+        server = await serve([web.get("/", flaky)])
+        politeness = polite(retries=3)
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with politeness.get(session, str(server.make_url("/"))) as res:
+                    assert res.status == 200
+        finally:
+            await server.close()
+        return politeness
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("politeness.backoff_delay", lambda attempt: 0)
+        politeness = run(main())
+    assert len(calls) == 3
+    assert politeness.stats["retries"] == 2
+
+
+def test_slot_released_after_non_transient_error():
+    # A redirect loop raises TooManyRedirects, which is not retried; the
+    # host's slot must still be freed or the next request waits forever.
+    async def loop(request):
+        raise web.HTTPFound("/loop")
+
+    async def ok(request):
+        return web.Response(text="ok")
+
+    async def main():
+        server = await serve([web.get("/loop", loop), web.get("/ok", ok)])
+        politeness = polite(max_concurrency=1)
+        try:
+            async with aiohttp.ClientSession() as session:
+                async def fetch(path, **kwargs):
+                    async with politeness.get(session, str(server.make_url(path)), **kwargs) as res:
+                        return res.status
+
+                for _ in range(3):
+                    with pytest.raises(aiohttp.TooManyRedirects):
+                        await asyncio.wait_for(fetch("/loop", max_redirects=2), 5)
+                assert politeness.hosts[origin(str(server.make_url("/")))].active == 0
+                return await asyncio.wait_for(fetch("/ok"), 5)
+        finally:
+            await server.close()
+
+    assert run(main()) == 200
+
+
+def test_slot_released_on_cancel():
+    async def slow(request):
+        await asyncio.sleep(5)
+        return web.Response(text="late")
+
+    async def main():
+        server = await serve([web.get("/", slow)])
+        politeness = polite(max_concurrency=1)
+        url = str(server.make_url("/"))
+        try:
+            async with aiohttp.ClientSession() as session:
+                async def fetch():
+                    async with politeness.get(session, url):
+                        pass
+                task = asyncio.create_task(fetch())
+                await asyncio.sleep(0.2)
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+                return politeness.hosts[origin(url)].active
+        finally:
+            await server.close()
+
+    assert run(main()) == 0
+
+
+def test_robots_read_to_the_end_when_streamed_in_chunks():
+    # Rules after the first chunk (a long Allow list here) still apply.
+    lines = ["User-agent: *"] + [f"Allow: /page-{i}" for i in range(5000)] + ["Disallow: /private"]
+    body = ("\n".join(lines) + "\n").encode()
+
+    async def robots(request):
+        res = web.StreamResponse(headers={"Content-Type": "text/plain"})
+        await res.prepare(request)
+        for start in range(0, len(body), 8192):
+            await res.write(body[start:start + 8192])
+            await asyncio.sleep(0.001)
+        await res.write_eof()
+        return res
+
+    async def main():
+        server = await serve([web.get("/robots.txt", robots)])
+        try:
+            async with aiohttp.ClientSession() as session:
+                cache = RobotsCache()
+                return (await cache.allowed(session, str(server.make_url("/private/a"))),
+                        await cache.allowed(session, str(server.make_url("/page-1"))))
+        finally:
+            await server.close()
+
+    assert run(main()) == (False, True)
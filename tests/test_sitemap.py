@@ -0,0 +1,120 @@
+import asyncio
+import gzip
+import time
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from politeness import Politeness, RobotsCache
+from sitemap import read_sitemaps
+
+
+def urlset(*entries):
+    urls = "".join(f"<url><loc>{loc}</loc><priority>{priority}</priority></url>" for loc, priority in entries)
+    return f'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+
+
+def index(*locs):
+    sitemaps = "".join(f"<sitemap><loc>{loc}</loc></sitemap>" for loc in locs)
+    return f'<?xml version="1.0"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{sitemaps}</sitemapindex>'
+
+
+def read(files, **kwargs):
+    """Serve ``files`` (path -> body, or a function of the server's base
+    URL returning one) and read the site's sitemaps."""
+    async def main():
+        async def handler(request):
+            body = files.get(request.path)
+            if body is None:
+                return web.Response(status=404)
+            return web.Response(body=body(base) if callable(body) else body)
+
+        app = web.Application()
+        app.router.add_get("/{path:.*}", handler)
+        server = TestServer(app)
+        await server.start_server()
+        nonlocal base
+        base = str(server.make_url("")).rstrip("/")
+        politeness = Politeness(robots=RobotsCache(), respect_robots=False)
+        try:
+            async with aiohttp.ClientSession() as session:
+                return await read_sitemaps(session, base + "/", politeness, accept=lambda url: True,
+                                           is_key=lambda url: "about" in url, **kwargs)
+        finally:
+            await server.close()
+
+    base = None
+    return asyncio.run(main())
+
+
+def test_reads_index_and_gzipped_children():
+    files = {
+        "/sitemap.xml": lambda base: index(base + "/pages.xml.gz", base + "/sitemap_products_1.xml"),
+        "/pages.xml.gz": lambda base: gzip.compress(urlset(
+            (base + "/about-us", 0.5), (base + "/blog/a", 0.9), (base + "/blog/b", 0.1)).encode()),
+        "/sitemap_products_1.xml": lambda base: urlset(*((f"{base}/p/{i}", 0.5) for i in range(3))),
+    }
+    summary = read(files, limit=1)
+    assert summary.files == 3
+    assert summary.urls == 6
+    assert summary.product_urls == 3
+    assert [url.rsplit("/", 1)[-1] for url in summary.key_pages] == ["about-us"]
+    # Only the highest-priority other page is kept.
+    assert [url.rsplit("/", 1)[-1] for url in summary.ranked_pages()] == ["a"]
+    assert summary.complete
+
+
+def test_stops_at_max_files():
+    files = {"/sitemap.xml": lambda base: index(*(f"{base}/s{i}.xml" for i in range(5)))}
+    files.update({f"/s{i}.xml": (lambda i: lambda base: urlset((f"{base}/page-{i}", 0.5)))(i) for i in range(5)})
+    summary = read(files, limit=10, max_files=3, concurrency=1)
+    assert summary.files == 3
+    assert summary.urls == 2
+    assert not summary.complete
+
+
+def test_stops_at_byte_budget():
+    files = {"/sitemap.xml": lambda base: urlset(*((f"{base}/page-{i}", 0.5) for i in range(20000)))}
+    summary = read(files, limit=10, max_bytes=64 * 1024)
+    assert 0 < summary.urls < 20000
+    assert summary.bytes < 200 * 1024
+    assert not summary.complete
+
+
+def test_sitemaps_do_not_hold_page_slots():
+    # A slow sitemap streams while the crawl's only page slot stays free.
+    async def main():
+        async def slow_sitemap(request):
+            res = web.StreamResponse()
+            await res.prepare(request)
+            await res.write(b'<?xml version="1.0"?><urlset>')
+            await asyncio.sleep(1)
+            await res.write(b"</urlset>")
+            await res.write_eof()
+            return res
+
+        async def page(request):
+            return web.Response(text="ok")
+
+        app = web.Application()
+        app.add_routes([web.get("/sitemap.xml", slow_sitemap), web.get("/page", page)])
+        server = TestServer(app)
+        await server.start_server()
+        politeness = Politeness(max_concurrency=1, robots=RobotsCache(), respect_robots=False)
+        try:
+            async with aiohttp.ClientSession() as session:
+                reading = asyncio.create_task(read_sitemaps(
+                    session, str(server.make_url("/")), politeness, accept=lambda url: True,
+                    is_key=lambda url: False, limit=0))
+                await asyncio.sleep(0.2)
+                start = time.monotonic()
+                async with politeness.get(session, str(server.make_url("/page"))) as res:
+                    assert res.status == 200
+                waited = time.monotonic() - start
+                await reading
+        finally:
+            await server.close()
+        return waited
+
+    assert asyncio.run(main()) < 0.5
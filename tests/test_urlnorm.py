@@ -0,0 +1,67 @@
+import pytest
+
+from urlnorm import canonicalize_url, url_fingerprint, is_tracking_param
+
+
+@pytest.mark.parametrize("url, expected", [
+    # Scheme and host case, default ports
+    ("HTTP://Example.COM/", "http://example.com/"),
+    ("http://example.com:80/a", "http://example.com/a"),
+    ("https://example.com:443/a", "https://example.com/a"),
+    ("https://example.com:8443/a", "https://example.com:8443/a"),
+    ("http://example.com:443/a", "http://example.com:443/a"),
+    ("https://example.com./a", "https://example.com/a"),
+    ("https://example.com", "https://example.com/"),
+    # Fragments
+    ("https://example.com/a#section", "https://example.com/a"),
+    ("https://example.com/#", "https://example.com/"),
+    # Trailing and doubled slashes, dot segments
+    ("https://example.com/a/b/", "https://example.com/a/b"),
+    ("https://example.com//a//b", "https://example.com/a/b"),
+    ("https://example.com/a/./b/../c", "https://example.com/a/c"),
+    ("https://example.com/../a", "https://example.com/a"),
+    ("https://example.com/a/..", "https://example.com/"),
+    ("https://example.com/.well-known/security.txt", "https://example.com/.well-known/security.txt"),
+    # Percent-encoding
+    ("https://example.com/caf%c3%a9", "https://example.com/caf%C3%A9"),
+    ("https://example.com/café", "https://example.com/caf%C3%A9"),
+    ("https://example.com/%7Euser", "https://example.com/~user"),
+    ("https://example.com/a%2fb", "https://example.com/a%2Fb"),
+    ("https://example.com/a b", "https://example.com/a%20b"),
+    ("https://example.com/?q=a%20b", "https://example.com/?q=a+b"),
+    # Tracking parameters and query order
+    ("https://example.com/p?utm_source=x&b=2&a=1", "https://example.com/p?a=1&b=2"),
+    ("https://example.com/p?gclid=1&fbclid=2", "https://example.com/p"),
+    ("https://example.com/p?UTM_Medium=x&page=2", "https://example.com/p?page=2"),
+    ("https://example.com/p?a=&b", "https://example.com/p?a=&b="),
+    # Other schemes are left alone
+    ("mailto:Someone@Example.com", "mailto:Someone@Example.com"),
+    ("javascript:void(0)", "javascript:void(0)"),
+])
+def test_canonicalize(url, expected):
+    assert canonicalize_url(url) == expected
+
+
+def test_resolves_against_base():
+    assert canonicalize_url("../c?utm_source=x#top", base="https://example.com/a/b/") == "https://example.com/a/c"
+    assert canonicalize_url("//cdn.example.com/x", base="https://example.com/") == "https://cdn.example.com/x"
+
+
+def test_idempotent():
+    for url in ["https://example.com/caf%c3%a9?b=2&a=1#x", "http://Example.com:80/a/./b/", "https://e.com/a b"]:
+        once = canonicalize_url(url)
+        assert canonicalize_url(once) == once
+
+
+def test_equivalent_urls_share_a_fingerprint():
+    a = canonicalize_url("https://Example.com:443/shop/?utm_campaign=x#reviews")
+    b = canonicalize_url("https://example.com/shop")
+    assert url_fingerprint(a) == url_fingerprint(b)
+    assert url_fingerprint(a) != url_fingerprint(canonicalize_url("https://example.com/shop?page=2"))
+
+
+def test_tracking_params():
+    assert is_tracking_param("utm_source")
+    assert is_tracking_param("fbclid")
+    assert not is_tracking_param("page")
+    assert not is_tracking_param("id")
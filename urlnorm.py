@@ -0,0 +1,86 @@
+import re
+import hashlib
+import posixpath
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode, quote
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Query parameters that only carry campaign/click tracking and never change
+# what the server returns.
+TRACKING_PARAMS = {
+    'gclid', 'dclid', 'fbclid', 'msclkid', 'yclid', 'igshid', 'twclid',
+    'mc_cid', 'mc_eid', '_ga', '_gl', '_hsenc', '_hsmi', 'srsltid',
+    'ref', 'ref_src', 'spm',
+}
+TRACKING_PREFIXES = ('utm_', 'pk_', 'hsa_')
+
+# Characters a path may carry unescaped (RFC 3986 pchar and "/"), plus "%"
+# so existing escapes are left for PERCENT_RE.
+PATH_SAFE = "/:@!$&'()*+,;=-._~%"
+UNRESERVED = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+PERCENT_RE = re.compile(r'%([0-9A-Fa-f]{2})')
+
+
+def is_tracking_param(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def normalize_escape(match):
+    char = chr(int(match.group(1), 16))
+    return char if char in UNRESERVED else '%' + match.group(1).upper()
+
+
+def canonicalize_url(url, base=None):
+    """Return the canonical form of ``url`` (resolved against ``base``).
+
+    Lower-cases scheme and host, drops default ports, fragments and tracking
+    parameters, sorts the remaining query and strips trailing slashes (except
+    for the root path). In the path, "." and ".." segments are resolved and
+    percent-escapes normalized: unreserved characters decoded, the rest in
+    upper case, and characters that need escaping escaped. Non-http(s) URLs
+    are returned unchanged.
+    """
+    url = url.strip()
+    if base:
+        url = urljoin(base, url)
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS:
+        return url
+
+    host = (parts.hostname or '').rstrip('.')
+    if ':' in host:
+        host = f"[{host}]"
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host
+    if parts.username:
+        userinfo = parts.username + (f":{parts.password}" if parts.password else '')
+        netloc = f"{userinfo}@{netloc}"
+    if port and port != DEFAULT_PORTS[scheme]:
+        netloc = f"{netloc}:{port}"
+
+    path = parts.path or '/'
+    while '//' in path:
+        path = path.replace('//', '/')
+    path = PERCENT_RE.sub(normalize_escape, quote(path, safe=PATH_SAFE))
+    if '.' in path:
+        path = posixpath.normpath(path)
+    if len(path) > 1:
+        path = path.rstrip('/') or '/'
+
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not is_tracking_param(k)
+    ))
+
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+def url_fingerprint(url):
+    # 64-bit fingerprint of an already canonical URL; small enough to keep
+    # millions of them in a visited set.
+    return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'big')